@@ -2,8 +2,7 @@
 # Hoofdportaal (Launcher) + Slimme zoekfunctie met resultaten in de hoofd-GUI
 
 # [SECTION: Imports]
-import sys, csv, logging, re
-from pathlib import Path
+import os, sys, logging, re
 from typing import List, Dict, Any, Optional, Tuple
 
 from PyQt6.QtWidgets import (
@@ -14,102 +13,29 @@ from PyQt6.QtGui import QStandardItemModel, QStandardItem
 from PyQt6.QtCore import Qt
 
 from gui.Launcher import Ui_LauncherWindow  # UI→PY uit Launcher.ui
+from core.products import DEFAULT_CSV, DEFAULT_XLSX, search_rows
+from core.columnar import SEARCH_COLUMNS, ROUTE_COLUMNS
+from core.partitions import load_default_catalog, stock_col
+from core.query import QueryError, parse_query
+from core.snapshot import Snapshot, SnapshotStore
+from core.api import CatalogAPI, ApiThread, DEFAULT_HOST, DEFAULT_PORT
 
 # [END: Imports]
-DATA_DIR = Path("resources")
-DEFAULT_CSV = DATA_DIR / "products.csv"
-DEFAULT_XLSX = DATA_DIR / "products.xlsx"
-
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s [%(levelname)s] %(message)s",
     handlers=[logging.FileHandler("log.txt", encoding="utf-8"), logging.StreamHandler(sys.stdout)],
 )
 
-PREF_COLS: Dict[str, List[str]] = {
-    "id": ["id", "ID"],
-    "name": ["name", "Naam", "Productnaam"],
-    "default_code": ["default_code", "Interne referentie", "Nummer"],
-    "barcode": ["barcode", "Barcode"],
-    "list_price": ["list_price", "Verkoopprijs"],
-    "standard_price": ["standard_price", "Kostprijs"],
-    "qty_available": ["qty_available", "Aantal op voorraad", "Aanwezige voorraad"],
-    "virtual_available": ["virtual_available", "Beschikbaar aantal", "Virtuele voorraad"],
-}
+# Lokale JSON-API (core/api.py) voor labelprinters/webshop-sync; standaard uit,
+# aanzetten met omgevingsvariabele PORTAAL_API=1 (poort via PORTAAL_API_PORT)
+API_ENABLED = os.environ.get("PORTAAL_API", "").strip().lower() in ("1", "true", "ja", "yes")
+API_PORT = int(os.environ.get("PORTAAL_API_PORT") or DEFAULT_PORT)
 
-# [FUNC: first_present]
-def first_present(cands: List[str], header: List[str]) -> Optional[str]:
-    for c in cands:
-        if c in header:
-            return c
-    return None
+# kolommen die het portaal gebruikt (zoeken, zoektaal, API); bij een products.parquet/.arrow
+# worden enkel deze gelezen
+PORTAL_COLUMNS = SEARCH_COLUMNS + ["Productcategorie", "Productsoort", "Leveranciers", ROUTE_COLUMNS]
 
-# [END: first_present]
-# [FUNC: try_load_xlsx]
-def try_load_xlsx(path: Path) -> List[Dict[str, Any]]:
-    try:
-        import openpyxl  # type: ignore
-    except ImportError:
-        raise RuntimeError("openpyxl niet geïnstalleerd. Installeer met 'pip install openpyxl' of gebruik CSV.")
-    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
-    ws = wb.active
-    rows = list(ws.iter_rows(values_only=True))
-    if not rows:
-        return []
-    header = [str(h).strip() if h is not None else "" for h in rows[0]]
-    data = []
-    for r in rows[1:]:
-        rec = {}
-        for i, h in enumerate(header):
-            rec[h] = r[i]
-        data.append(rec)
-    logging.info(f"XLSX geladen: {path}  rijen={len(data)}")
-    return data
-
-# [END: try_load_xlsx]
-# [FUNC: read_csv_smart]
-def read_csv_smart(path: Path) -> List[Dict[str, Any]]:
-    encodings = ["utf-8", "utf-8-sig", "cp1252", "latin-1"]
-    for enc in encodings:
-        try:
-            with path.open("r", encoding=enc, newline="") as f:
-                sample = f.read(4096); f.seek(0)
-                try:
-                    dialect = csv.Sniffer().sniff(sample, delimiters=[",",";","|","\t"])
-                    delim = dialect.delimiter
-                except Exception:
-                    delim = ";"
-                rows = list(csv.DictReader(f, delimiter=delim))
-                logging.info(f"CSV geladen met encoding={enc}, delimiter='{delim}', rijen={len(rows)}")
-                return rows
-        except UnicodeDecodeError:
-            continue
-    with path.open("r", encoding="cp1252", errors="replace", newline="") as f:
-        rows = list(csv.DictReader(f, delimiter=";"))
-        logging.warning(f"CSV geladen met cp1252 (met vervangtekens), rijen={len(rows)}")
-        return rows
-
-# [END: read_csv_smart]
-# [FUNC: load_any_products]
-def load_any_products(path_csv: Path, path_xlsx: Path) -> List[Dict[str, Any]]:
-    if path_csv.exists():
-        logging.info(f"CSV laden: {path_csv}")
-        return read_csv_smart(path_csv)
-    if path_xlsx.exists():
-        logging.info(f"XLSX laden: {path_xlsx}")
-        return try_load_xlsx(path_xlsx)
-    raise FileNotFoundError(f"Geen productbestand gevonden in {DATA_DIR}. Plaats 'products.csv' of 'products.xlsx'.")
-
-# [END: load_any_products]
-# [FUNC: normalize_number]
-def normalize_number(val) -> float:
-    if val is None: return 0.0
-    if isinstance(val, (int, float)): return float(val)
-    s = str(val).replace("€", "").replace(" ", "").replace("\xa0", "").replace(",", ".").replace("%", "")
-    try: return float(s)
-    except: return 0.0
-
-# [END: normalize_number]
 # sleutelwoorden → intent
 INTENT_KEYWORDS = {
     "stock": ["voorraad", "stock", "qty", "aantal"],
@@ -174,35 +100,19 @@ class AppPortaal(QMainWindow):
 
         self._build_smart_ui()
 
+        # dataset als onveranderlijke versie (core/snapshot.py): rijen, zoekindexen, magazijnen
+        # en weergavetekst; een zoekopdracht werkt op één versie van begin tot eind
+        self._store = SnapshotStore()
         try:
-            raw = load_any_products(DEFAULT_CSV, DEFAULT_XLSX)
+            catalog = load_default_catalog(DEFAULT_CSV, DEFAULT_XLSX, columns=PORTAL_COLUMNS)
+            self._store.publish(Snapshot(catalog))
         except Exception as e:
-            raw = []
             logging.error(f"Kon producten niet laden: {e}")
 
-        self.products: List[Dict[str, Any]] = []
-        self._header_map: Dict[str, str] = {}
-
-        if raw:
-            header = list(raw[0].keys())
-            for key, cands in PREF_COLS.items():
-                f = first_present(cands, header)
-                if f:
-                    self._header_map[key] = f
-
-            cleaned = []
-            for r in raw:
-                rec = dict(r)
-                rec["_id"]    = r.get(self._header_map.get("id",""), None) or r.get(self._header_map.get("default_code",""), None) or r.get(self._header_map.get("name",""), "")
-                rec["_name"]  = r.get(self._header_map.get("name",""), "")
-                rec["_sku"]   = r.get(self._header_map.get("default_code",""), "")
-                rec["_barcode"] = r.get(self._header_map.get("barcode",""), "")
-                rec["_price"] = normalize_number(r.get(self._header_map.get("list_price",""), 0))
-                rec["_cost"]  = normalize_number(r.get(self._header_map.get("standard_price",""), 0))
-                rec["_qty"]   = normalize_number(r.get(self._header_map.get("qty_available",""), 0))
-                rec["_vqty"]  = normalize_number(r.get(self._header_map.get("virtual_available",""), 0))
-                cleaned.append(rec)
-            self.products = cleaned
+        self._api_thread: Optional[ApiThread] = None
+        if API_ENABLED:
+            self._api_thread = ApiThread(CatalogAPI(self._store.current().rows), DEFAULT_HOST, API_PORT)
+            self._api_thread.start()
 
         VoorraadWin     = _load_app("voorraad",     "Voorraad")
         ContactenWin    = _load_app("contacten",    "Contacten")
@@ -262,29 +172,35 @@ class AppPortaal(QMainWindow):
         if not q:
             return
         intent, needle = parse_intent_and_needle(q)
-        matched = self._search_products(needle)
-        self._show_results(matched, intent, needle)
+        snap = self._store.current()
+        matched, label = self._search_products(snap, q, needle)
+        self._show_results(snap, matched, intent, label)
 
 # [END: _on_smart_search]
 # [FUNC: _search_products]
-    def _search_products(self, needle: str) -> List[Dict[str, Any]]:
-        if not self.products:
+    def _search_products(self, snap: Snapshot, text: str, needle: str) -> Tuple[List[Dict[str, Any]], str]:
+        """Geeft (rijen, omschrijving voor de samenvatting)."""
+        self.lblSummary.setToolTip("")
+        if not snap.rows:
             QMessageBox.information(self, "Geen data", "Kan geen producten laden (resources/products.csv?).")
-            return []
+            return [], needle
+        # velden (voorraad < 5, categorie:X, ...) → zoektaal uit core/query.py; losse woorden zijn vultekst
+        try:
+            query = parse_query(text, bare_words=False)
+        except QueryError:
+            query = None
+        if query is not None:
+            rows, explain = query.run(snap.query_index())
+            self.lblSummary.setToolTip(str(explain))
+            return rows, needle or str(query)
         if not needle:
             # als geen aanhalingstekens gegeven zijn, zoek op hele zin
-            needle = self.lineSmart.text().strip()
-        s = needle.lower()
-        return [
-            r for r in self.products
-            if s in str(r.get("_name","")).lower()
-            or s in str(r.get("_sku","")).lower()
-            or s in str(r.get("_barcode","")).lower()
-        ]
+            needle = text
+        return search_rows(snap.rows, needle), needle
 
 # [END: _search_products]
 # [FUNC: _show_results]
-    def _show_results(self, rows: List[Dict[str, Any]], intent: str, needle: str):
+    def _show_results(self, snap: Snapshot, rows: List[Dict[str, Any]], intent: str, needle: str):
         # kolommen afhankelijk van intent
         if intent == "stock":
             headers = ["Naam", "Interne referentie", "Aanwezige voorraad", "Virtuele voorraad", "Verkoopprijs"]
@@ -295,28 +211,25 @@ class AppPortaal(QMainWindow):
         else:
             headers = ["Naam", "Interne referentie", "Barcode", "Verkoopprijs"]
 
+        if intent == "stock":
+            keys = ["_name", "_sku", "_qty", "_qty_virtual", "_price"]
+            # voorraad per magazijn naast het totaal
+            wh_cols = [stock_col(n) for n in snap.partitions]
+            headers = headers[:3] + wh_cols + headers[3:]
+            keys = keys[:3] + wh_cols + keys[3:]
+        elif intent == "price":
+            keys = ["_name", "_sku", "_price", "_cost"]
+        elif intent == "cost":
+            keys = ["_name", "_sku", "_cost", "_price"]
+        else:
+            keys = ["_name", "_sku", "_barcode", "_price"]
+
         self.tblModel.clear()
         self.tblModel.setHorizontalHeaderLabels(headers)
 
+        fmt = snap.fmt
         for r in rows:
-            name = str(r.get("_name",""))
-            sku  = str(r.get("_sku",""))
-            bc   = str(r.get("_barcode",""))
-            price = f"{float(r.get('_price',0)):.2f}"
-            cost  = f"{float(r.get('_cost',0)):.2f}"
-            qty   = f"{float(r.get('_qty',0)):.2f}"
-            vqty  = f"{float(r.get('_vqty',0)):.2f}"
-
-            if intent == "stock":
-                values = [name, sku, qty, vqty, price]
-            elif intent == "price":
-                values = [name, sku, price, cost]
-            elif intent == "cost":
-                values = [name, sku, cost, price]
-            else:
-                values = [name, sku, bc, price]
-
-            items = [QStandardItem(v) for v in values]
+            items = [QStandardItem(v) for v in fmt.texts(r, keys)]
             for it in items: it.setEditable(False)
             self.tblModel.appendRow(items)
 
@@ -332,6 +245,13 @@ class AppPortaal(QMainWindow):
             self.lblSummary.setText(f'Resultaten: {n} voor "{needle}".')
 
 # [END: _show_results]
+# [FUNC: closeEvent]
+    def closeEvent(self, event):
+        if self._api_thread is not None:
+            self._api_thread.stop()
+        super().closeEvent(event)
+
+# [END: closeEvent]
 # [FUNC: open_window]
     def open_window(self, cls):
         win = cls()
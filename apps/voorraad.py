@@ -1,17 +1,34 @@
 # apps/voorraad.py
 # [SECTION: Imports]
-import sys, csv, logging
+import sys, logging
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable
 
 from PyQt6.QtWidgets import (
     QMainWindow, QFileDialog, QMessageBox, QApplication,
-    QWidget, QCheckBox, QPushButton, QGridLayout, QHBoxLayout
+    QWidget, QCheckBox, QPushButton, QGridLayout, QHBoxLayout,
+    QToolBar, QProgressDialog, QComboBox, QLabel, QVBoxLayout, QTreeView,
+    QDockWidget, QGroupBox, QListWidget, QListWidgetItem, QDoubleSpinBox, QTableWidget,
+    QTableWidgetItem, QTableView, QSplitter, QHeaderView
 )
-from PyQt6.QtGui import QStandardItemModel, QStandardItem, QColor, QBrush
-from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QColor, QBrush, QFont, QStandardItemModel, QStandardItem
+from PyQt6.QtCore import Qt, QThread, pyqtSignal, QAbstractTableModel, QModelIndex
 
 from gui.MainWindow import Ui_MainWindow  # zorg dat gui/MainWindow.py bestaat via UI→PY
+from core.formatting import (
+    price_delta, COMPARE_COLS, DELTA_COL, NUMERIC_COLS, NUMERIC_KEYS, NUMERIC_COL_KEYS,
+)
+from core.export import ExportCancelled, export_rows, cell_value
+from core.compression import dialog_patterns
+from core.products import DEFAULT_CSV, DEFAULT_XLSX, MIN_STOCK, has_stock_columns, stock_stats
+from core.partitions import ALL
+from core.query import QueryError, parse_query, text_query
+from core.facets import FACET_FIELDS
+from core.pivot import GROUP_FIELDS
+from core.replenish import (
+    ANY, DEFAULT_POLICY_PATH, PROPOSAL_COLUMNS, ReplenishPlan, ReplenishPolicy, load_policy, save_policy,
+)
+from core.snapshot import Snapshot, SnapshotStore, load_snapshot, compare_snapshot
 
 # [END: Imports]
 logging.basicConfig(
@@ -20,136 +37,461 @@ logging.basicConfig(
     handlers=[logging.FileHandler("log.txt", encoding="utf-8"), logging.StreamHandler(sys.stdout)],
 )
 
-DATA_DIR = Path("resources")
-DEFAULT_CSV = DATA_DIR / "products.csv"
-DEFAULT_XLSX = DATA_DIR / "products.xlsx"
-MIN_STOCK = 5
-
-# Herkenbare kernkolommen (mapping NL/EN) voor zoeken/prijs/voorraad
-PREF_COLS: Dict[str, List[str]] = {
-    "id": ["id", "ID"],
-    "name": ["name", "Naam", "Productnaam"],
-    "default_code": ["default_code", "Interne referentie", "Nummer"],
-    "barcode": ["barcode", "Barcode"],
-    "list_price": ["list_price", "Verkoopprijs"],
-    "standard_price": ["standard_price", "Kostprijs"],
-    "qty_available": ["qty_available", "Aantal op voorraad", "Aanwezige voorraad"],
-    "virtual_available": ["virtual_available", "Beschikbaar aantal", "Virtuele voorraad"],
-}
-
-# Volgorde van toonbare kolommen (GUI-checkboxes volgen deze volgorde)
-DISPLAY_ORDER = [
-    "Naam", "Kan verkocht worden", "Kan gekocht worden", "Productsoort",
-    "Facturatiebeleid", "Verkoopprijs", "Verkoop BTW", "Kostprijs",
-    "Productcategorie", "Interne referentie", "Barcode", "Maateenheid",
-    "Inkoop maateenheid/Maateenheid", "Inkoop maateenheid/ID",
-    "Leveranciers", "Inkoop BTW", "Controlebeleid", "Routes",
-    "Verantwoordelijke", "Aanwezige voorraad", "Virtuele voorraad",
-]
-
-ROUTES_FIELD_CANDIDATES = ["Routes"]  # pas aan als kolomnaam anders is
-
-# [FUNC: first_present]
-def first_present(cands: List[str], header: List[str]) -> Optional[str]:
-    for c in cands:
-        if c in header:
-            return c
-    return None
-
-# [END: first_present]
-# [FUNC: try_load_xlsx]
-def try_load_xlsx(path: Path) -> List[Dict[str, Any]]:
-    import openpyxl  # requires: pip install openpyxl
-    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
-    ws = wb.active
-    rows = list(ws.iter_rows(values_only=True))
-    if not rows:
-        return []
-    header = [str(h).strip() if h is not None else "" for h in rows[0]]
-    data = []
-    for r in rows[1:]:
-        rec = {}
-        for i, h in enumerate(header):
-            rec[h] = r[i]
-        data.append(rec)
-    logging.info(f"XLSX geladen: {path} rijen={len(data)}")
-    return data
-
-# [END: try_load_xlsx]
-# [FUNC: read_csv_smart]
-def read_csv_smart(path: Path) -> List[Dict[str, Any]]:
-    encodings = ["utf-8", "utf-8-sig", "cp1252", "latin-1"]
-    for enc in encodings:
+# [CLASS: ProductTableModel]
+class ProductTableModel(QAbstractTableModel):
+    """
+    Virtueel tabelmodel: cellen worden pas opgevraagd (en via DisplayCache geformatteerd)
+    als de view ze tekent. Luie rijen (core/lazycsv.py) worden zo enkel gedecodeerd
+    voor wat zichtbaar is. Rijen, weergavetekst en vergelijkingsprijzen komen uit één
+    Snapshot, zodat een herladen of vergelijking in de achtergrond de tabel niet raakt.
+    """
+# [FUNC: __init__]
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._snap = Snapshot(None)
+        self._rows: List[Dict[str, Any]] = []
+        self._headers: List[str] = []
+        self._red = QBrush(QColor("red"))
+        self._green = QBrush(QColor("green"))
+
+# [END: __init__]
+# [FUNC: set_rows]
+    def set_rows(self, rows: List[Dict[str, Any]], headers: List[str], snap: Snapshot):
+        self.beginResetModel()
+        self._snap = snap
+        self._rows = rows
+        self._headers = list(headers)
+        self.endResetModel()
+
+# [END: set_rows]
+# [FUNC: rowCount]
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._rows)
+
+# [END: rowCount]
+# [FUNC: columnCount]
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._headers)
+
+# [END: columnCount]
+# [FUNC: data]
+    def data(self, index: QModelIndex, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        r = self._rows[index.row()]
+        col = self._headers[index.column()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self._snap.fmt.text(r, col)
+        if role == Qt.ItemDataRole.BackgroundRole and col == DELTA_COL:
+            delta = price_delta(r, self._snap.new_prices)
+            if delta:
+                return self._red if delta > 0 else self._green
+        return None
+
+# [END: data]
+# [FUNC: headerData]
+    def headerData(self, section: int, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            if 0 <= section < len(self._headers):
+                return self._headers[section]
+        return super().headerData(section, orientation, role)
+
+# [END: headerData]
+# [FUNC: sort]
+    def sort(self, column: int, order=Qt.SortOrder.AscendingOrder):
+        if not (0 <= column < len(self._headers)) or not self._rows:
+            return
+        col = self._headers[column]
+        # float in de rij = al genormaliseerd getal (bv. voorraad per magazijn, bestelregels)
+        numeric = (col in NUMERIC_COLS or col in NUMERIC_KEYS or col in COMPARE_COLS
+                   or isinstance(self._rows[0].get(col), float))
+        fld = NUMERIC_COL_KEYS.get(col)
+        if fld is not None and fld in self._rows[0]:
+            # productrijen: het genormaliseerde veld (bestelregels hebben enkel de kolom zelf)
+            def key(r):
+                return float(r.get(fld, 0) or 0)
+        elif numeric:
+            new_prices = self._snap.new_prices
+            def key(r):
+                v = cell_value(r, col, new_prices)
+                return (v is None, v or 0.0)
+        else:
+            fmt = self._snap.fmt
+            def key(r):
+                return fmt.text(r, col).lower()
+        self.layoutAboutToBeChanged.emit()
+        # nieuwe lijst: de rijenlijst van de filter (of van de snapshot) blijft ongemoeid
+        self._rows = sorted(self._rows, key=key, reverse=(order == Qt.SortOrder.DescendingOrder))
+        self.layoutChanged.emit()
+
+# [END: sort]
+# [END: ProductTableModel]
+# [CLASS: ExportWorker]
+class ExportWorker(QThread):
+    """Schrijft een resultaatset weg buiten de GUI-thread."""
+    progress = pyqtSignal(int, int)
+    done = pyqtSignal(int)
+    cancelled = pyqtSignal(int)  # afgebroken na n rijen; er is niets weggeschreven
+    failed = pyqtSignal(str)
+
+# [FUNC: __init__]
+    def __init__(self, rows: List[Dict[str, Any]], cols: List[str], path: Path,
+                 new_prices: Optional[Dict[int, float]] = None, parent=None):
+        super().__init__(parent)
+        # eigen lijst-kopie (enkel referenties): filteren tijdens export raakt deze niet
+        self._rows = list(rows)
+        self._cols = list(cols)
+        self._path = path
+        self._new_prices = new_prices
+        self._cancel = False
+
+# [END: __init__]
+# [FUNC: cancel]
+    def cancel(self):
+        self._cancel = True
+
+# [END: cancel]
+# [FUNC: run]
+    def run(self):
+        try:
+            n = export_rows(self._rows, self._cols, self._path,
+                            progress=self.progress.emit,
+                            cancelled=lambda: self._cancel, new_prices=self._new_prices)
+        except ExportCancelled as e:
+            self.cancelled.emit(e.rows)
+            return
+        except Exception as e:
+            logging.exception("Export mislukt")
+            self.failed.emit(str(e))
+            return
+        self.done.emit(n)
+
+# [END: run]
+# [END: ExportWorker]
+# [CLASS: SnapshotWorker]
+class SnapshotWorker(QThread):
+    """Bouwt een nieuwe datasetversie (laden of prijsvergelijking) buiten de GUI-thread."""
+    ready = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+# [FUNC: __init__]
+    def __init__(self, task: Callable[[], Snapshot], parent=None):
+        super().__init__(parent)
+        self._task = task
+
+# [END: __init__]
+# [FUNC: run]
+    def run(self):
+        try:
+            snap = self._task()
+        except Exception as e:
+            logging.exception("Nieuwe datasetversie mislukt")
+            self.failed.emit(str(e))
+            return
+        self.ready.emit(snap)
+
+# [END: run]
+# [END: SnapshotWorker]
+# [CLASS: PivotWindow]
+class PivotWindow(QMainWindow):
+    """Draaitabel over de huidige weergave van Voorraad (zie core/pivot.py)."""
+    COLUMNS = [
+        ("Aantal", "count"), ("Aanwezig", "qty"), ("Virtueel", "qty_virtual"),
+        ("Waarde verkoop", "value"), ("Waarde kost", "cost_value"), ("Marge", "margin"), ("Marge %", "margin_pct"),
+    ]
+    MAX_LEVELS = 3
+
+# [FUNC: __init__]
+    def __init__(self, owner: "Window"):
+        super().__init__(owner)
+        self._owner = owner
+        self.setWindowTitle("Draaitabel – Voorraad")
+        self.resize(1000, 600)
+
+        central = QWidget(self)
+        vb = QVBoxLayout(central)
+        bar = QHBoxLayout()
+        self._level_boxes: List[QComboBox] = []
+        for i in range(self.MAX_LEVELS):
+            cb = QComboBox(central)
+            if i:
+                cb.addItem("(geen)", "")
+            for name in GROUP_FIELDS:
+                cb.addItem(name, name)
+            cb.currentIndexChanged.connect(self.refresh)
+            bar.addWidget(QLabel(f"Niveau {i + 1}:", central))
+            bar.addWidget(cb)
+            self._level_boxes.append(cb)
+        bar.addStretch(1)
+        vb.addLayout(bar)
+
+        self.tree = QTreeView(central)
+        self.model = QStandardItemModel(self)
+        self.tree.setModel(self.model)
+        self.tree.setEditTriggers(QTreeView.EditTrigger.NoEditTriggers)
+        vb.addWidget(self.tree, 1)
+        self.lblInfo = QLabel(" ", central)
+        vb.addWidget(self.lblInfo)
+        self.setCentralWidget(central)
+
+# [END: __init__]
+# [FUNC: levels]
+    def levels(self) -> List[str]:
+        out: List[str] = []
+        for cb in self._level_boxes:
+            name = cb.currentData()
+            if name and name not in out:
+                out.append(name)
+        return out
+
+# [END: levels]
+# [FUNC: _items]
+    def _items(self, label: str, m: Dict[str, float], bold: bool = False) -> List[QStandardItem]:
+        items = [QStandardItem(label)]
+        for _, key in self.COLUMNS:
+            v = m[key]
+            text = str(int(v)) if key == "count" else f"{v:.1f} %" if key == "margin_pct" else f"{v:.2f}"
+            it = QStandardItem(text)
+            it.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+            items.append(it)
+        if bold:
+            font = QFont()
+            font.setBold(True)
+            for it in items:
+                it.setFont(font)
+        return items
+
+# [END: _items]
+# [FUNC: refresh]
+    def refresh(self):
+        levels = self.levels()
+        if not levels:
+            return
+        res = self._owner.pivot(levels)
+
+        self.model.clear()
+        self.model.setHorizontalHeaderLabels([" → ".join(levels)] + [h for h, _ in self.COLUMNS])
+        root = self.model.invisibleRootItem()
+        parents: Dict[tuple, QStandardItem] = {(): root}
+        for g in res["groups"]:
+            items = self._items(g["label"], g)
+            parents[g["keys"][:-1]].appendRow(items)
+            parents[g["keys"]] = items[0]
+        root.appendRow(self._items("Totaal", res["total"], bold=True))
+
+        self.tree.expandToDepth(0)
+        for c in range(self.model.columnCount()):
+            self.tree.resizeColumnToContents(c)
+        note = " · routes overlappen (product met meerdere routes telt in elke route)" if "Route" in levels else ""
+        self.lblInfo.setText(f"{res['total']['count']} producten, {len(res['groups'])} groepen · "
+                             f"{res['ms']:.1f} ms{note}")
+
+# [END: refresh]
+# [END: PivotWindow]
+# [CLASS: ReplenishWindow]
+class ReplenishWindow(QMainWindow):
+    """
+    Bestelvoorstel over de huidige weergave van Voorraad (zie core/replenish.py). Elke
+    wijziging van min/max of een regel herrekent meteen; regels bewaren in resources/replenish.json.
+    """
+    SUMMARY = [("Regels", "lines"), ("Te bestellen", "qty"), ("Bestelwaarde", "value")]
+
+# [FUNC: __init__]
+    def __init__(self, owner: "Window"):
+        super().__init__(owner)
+        self._owner = owner
+        self._plan: Optional[ReplenishPlan] = None
+        self._loading = True
+        self.setWindowTitle("Bestelvoorstel – Voorraad")
+        self.resize(1200, 700)
+
+        try:
+            policy = load_policy()
+        except (OSError, ValueError) as e:
+            logging.error(f"Aanvulregels niet te lezen ({DEFAULT_POLICY_PATH}): {e}")
+            policy = ReplenishPolicy()
+
+        central = QWidget(self)
+        vb = QVBoxLayout(central)
+        bar = QHBoxLayout()
+        self.spinMin = self._spin(policy.default_min, central)
+        self.spinMax = self._spin(policy.default_max, central)
+        self.chkVirtual = QCheckBox("Virtuele voorraad (in/uit) meerekenen", central)
+        self.chkVirtual.setChecked(policy.use_virtual)
+        self.chkVirtual.toggled.connect(self.refresh)
+        btnExport = QPushButton("Exporteren…", central)
+        btnExport.clicked.connect(self.export_plan)
+        for w in (QLabel("Standaard min:", central), self.spinMin, QLabel("max:", central), self.spinMax,
+                  self.chkVirtual):
+            bar.addWidget(w)
+        bar.addStretch(1)
+        bar.addWidget(btnExport)
+        vb.addLayout(bar)
+
+        split = QSplitter(Qt.Orientation.Horizontal, central)
+
+        # regels: min/max per categorie (ook subcategorieën) en route; "*" = alle
+        rules_box = QGroupBox("Regels per categorie en route", split)
+        rb = QVBoxLayout(rules_box)
+        self.tblRules = QTableWidget(0, 4, rules_box)
+        self.tblRules.setHorizontalHeaderLabels(["Categorie", "Route", "Min", "Max"])
+        self.tblRules.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        for (cat, route), (mn, mx) in sorted(policy.rules.items()):
+            self._add_rule_row(cat, route, mn, mx)
+        self.tblRules.itemChanged.connect(self.refresh)
+        rb.addWidget(self.tblRules)
+        rbar = QHBoxLayout()
+        for text, slot in (("Regel toevoegen", lambda: self._add_rule_row(ANY, ANY, self.spinMin.value(),
+                                                                           self.spinMax.value())),
+                           ("Regel verwijderen", self._remove_rule_row), ("Opslaan", self.save_rules)):
+            b = QPushButton(text, rules_box)
+            b.clicked.connect(slot)
+            rbar.addWidget(b)
+        rb.addLayout(rbar)
+
+        # per leverancier, met de bestelregels van de gekozen leverancier eronder
+        right = QSplitter(Qt.Orientation.Vertical, split)
+        self.treeSuppliers = QTreeView(right)
+        self.supplierModel = QStandardItemModel(self)
+        self.treeSuppliers.setModel(self.supplierModel)
+        self.treeSuppliers.setRootIsDecorated(False)
+        self.treeSuppliers.setEditTriggers(QTreeView.EditTrigger.NoEditTriggers)
+        self.treeSuppliers.clicked.connect(lambda _i: self._show_lines())
+        self.tableLines = QTableView(right)
+        self.linesModel = ProductTableModel(self)
+        self.tableLines.setModel(self.linesModel)
+        self.tableLines.setSortingEnabled(True)
+        split.setStretchFactor(1, 1)
+        vb.addWidget(split, 1)
+
+        self.lblInfo = QLabel(" ", central)
+        vb.addWidget(self.lblInfo)
+        self.setCentralWidget(central)
+        self._loading = False
+
+# [END: __init__]
+# [FUNC: _spin]
+    def _spin(self, value: float, parent: QWidget) -> QDoubleSpinBox:
+        sb = QDoubleSpinBox(parent)
+        sb.setRange(-1e9, 1e9)
+        sb.setDecimals(0)
+        sb.setValue(value)
+        sb.valueChanged.connect(self.refresh)
+        return sb
+
+# [END: _spin]
+# [FUNC: _add_rule_row]
+    def _add_rule_row(self, cat: str, route: str, mn: float, mx: float):
+        r = self.tblRules.rowCount()
+        self.tblRules.insertRow(r)
+        for c, v in enumerate((cat, route, f"{mn:g}", f"{mx:g}")):
+            self.tblRules.setItem(r, c, QTableWidgetItem(v))
+
+# [END: _add_rule_row]
+# [FUNC: _remove_rule_row]
+    def _remove_rule_row(self):
+        rows = sorted({i.row() for i in self.tblRules.selectedIndexes()}, reverse=True)
+        for r in rows or [self.tblRules.rowCount() - 1]:
+            if r >= 0:
+                self.tblRules.removeRow(r)
+        self.refresh()
+
+# [END: _remove_rule_row]
+# [FUNC: policy]
+    def policy(self) -> ReplenishPolicy:
+        """Huidige instellingen; onvolledige of ongeldige regels (nog aan het typen) tellen niet mee."""
+        rules: Dict[tuple, tuple] = {}
+        for r in range(self.tblRules.rowCount()):
+            cells = [(self.tblRules.item(r, c).text().strip() if self.tblRules.item(r, c) else "") for c in range(4)]
+            try:
+                mn = float(cells[2].replace(",", "."))
+                mx = float(cells[3].replace(",", ".")) if cells[3] else mn
+            except ValueError:
+                continue
+            rules[(cells[0] or ANY, cells[1] or ANY)] = (mn, mx)
+        return ReplenishPolicy(self.spinMin.value(), self.spinMax.value(), rules, self.chkVirtual.isChecked())
+
+# [END: policy]
+# [FUNC: refresh]
+    def refresh(self, *_):
+        if self._loading:
+            return
+        plan = self._plan = self._owner.replenish(self.policy())
+        selected = self._selected_supplier()
+
+        self.supplierModel.clear()
+        self.supplierModel.setHorizontalHeaderLabels(["Leverancier"] + [h for h, _ in self.SUMMARY])
+        root = self.supplierModel.invisibleRootItem()
+        for name, m in plan.suppliers.items():
+            root.appendRow(self._items(name, m))
+        root.appendRow(self._items("Totaal", plan.totals, bold=True))
+        for c in range(self.supplierModel.columnCount()):
+            self.treeSuppliers.resizeColumnToContents(c)
+        if selected in plan.suppliers:
+            row = list(plan.suppliers).index(selected)
+            self.treeSuppliers.setCurrentIndex(self.supplierModel.index(row, 0))
+        self._show_lines()
+
+        t = plan.totals
+        self.lblInfo.setText(f"{int(t['lines'])} bestelregels bij {len(plan.suppliers)} leveranciers · "
+                             f"bestelwaarde €{t['value']:.2f} · {plan.considered} aanvulbare producten · "
+                             f"{plan.ms:.1f} ms")
+
+# [END: refresh]
+# [FUNC: _items]
+    def _items(self, label: str, m: Dict[str, float], bold: bool = False) -> List[QStandardItem]:
+        items = [QStandardItem(label)]
+        for _, key in self.SUMMARY:
+            it = QStandardItem(str(int(m[key])) if key != "value" else f"{m[key]:.2f}")
+            it.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+            items.append(it)
+        if bold:
+            font = QFont()
+            font.setBold(True)
+            for it in items:
+                it.setFont(font)
+        return items
+
+# [END: _items]
+# [FUNC: _selected_supplier]
+    def _selected_supplier(self) -> Optional[str]:
+        """Gekozen leverancier, None = alle (ook als de totaalregel gekozen is)."""
+        idx = self.treeSuppliers.currentIndex()
+        if not idx.isValid() or self._plan is None or idx.row() >= len(self._plan.suppliers):
+            return None
+        return self.supplierModel.item(idx.row(), 0).text()
+
+# [END: _selected_supplier]
+# [FUNC: _show_lines]
+    def _show_lines(self):
+        if self._plan is None:
+            return
+        # nieuwe regels per planning → eigen (lege) Snapshot, dus ook een verse weergavecache
+        self.linesModel.set_rows(self._plan.rows(self._selected_supplier()), PROPOSAL_COLUMNS, Snapshot(None))
+        self.tableLines.resizeColumnsToContents()
+
+# [END: _show_lines]
+# [FUNC: save_rules]
+    def save_rules(self):
         try:
-            with path.open("r", encoding=enc, newline="") as f:
-                sample = f.read(4096); f.seek(0)
-                try:
-                    dialect = csv.Sniffer().sniff(sample, delimiters=[",",";","|","\t"])
-                    delim = dialect.delimiter
-                except Exception:
-                    delim = ";"
-                rows = list(csv.DictReader(f, delimiter=delim))
-                logging.info(f"CSV geladen met encoding={enc}, delimiter='{delim}', rijen={len(rows)}")
-                return rows
-        except UnicodeDecodeError:
-            continue
-    with path.open("r", encoding="cp1252", errors="replace", newline="") as f:
-        rows = list(csv.DictReader(f, delimiter=";"))
-        logging.warning(f"CSV geladen met cp1252 (met vervangtekens), rijen={len(rows)}")
-        return rows
-
-# [END: read_csv_smart]
-# [FUNC: load_any_products]
-def load_any_products(path_csv: Path, path_xlsx: Path) -> List[Dict[str, Any]]:
-    if path_csv.exists():
-        logging.info(f"CSV laden: {path_csv}")
-        return read_csv_smart(path_csv)
-    if path_xlsx.exists():
-        logging.info(f"XLSX laden: {path_xlsx}")
-        return try_load_xlsx(path_xlsx)
-    raise FileNotFoundError(f"Geen productbestand in {DATA_DIR}")
-
-# [END: load_any_products]
-# [FUNC: normalize_number]
-def normalize_number(val) -> float:
-    if val is None: return 0.0
-    if isinstance(val, (int, float)): return float(val)
-    s = str(val).replace("€","").replace(" ","").replace("\xa0","").replace(",",".").replace("%","")
-    try: return float(s)
-    except: return 0.0
-
-# [END: normalize_number]
-# [FUNC: format_bool]
-def format_bool(v) -> str:
-    s = str(v).strip().lower()
-    if s in {"waar","true","1","yes","ja"}: return "✓"
-    if s in {"onwaar","false","0","no","nee"}: return "✗"
-    return str(v)
-
-# [END: format_bool]
-# [FUNC: _split_routes]
-def _split_routes(val: str) -> List[str]:
-    """Splits een routestring in losse items. Werkt ook als Odoo 1 route per rij geeft."""
-    if not val:
-        return []
-    txt = str(val).strip()
-    # meeste exports hebben 1 per rij; soms meerdere met ; of | of ,
-    if any(sep in txt for sep in [";", "|", ","]):
-        parts = []
-        for sep in [";", "|", ","]:
-            if sep in txt:
-                parts = [p.strip() for p in txt.split(sep)]
-                break
-    else:
-        parts = [txt]
-    # uniq + volgorde behouden
-    seen, out = set(), []
-    for p in parts:
-        if p and p not in seen:
-            seen.add(p); out.append(p)
-    return out
-
-# [END: _split_routes]
+            save_policy(self.policy())
+        except OSError as e:
+            QMessageBox.critical(self, "Opslaan mislukt", str(e))
+            return
+        self.statusBar().showMessage(f"Regels bewaard in {DEFAULT_POLICY_PATH}", 5000)
+
+# [END: save_rules]
+# [FUNC: export_plan]
+    def export_plan(self):
+        if self._plan is None or not self._plan.positions:
+            QMessageBox.information(self, "Niets te bestellen", "Het bestelvoorstel is leeg.")
+            return
+        supplier = self._selected_supplier()
+        self._owner.export_rows_async(self._plan.rows(supplier), PROPOSAL_COLUMNS, "bestelvoorstel.csv",
+                                      "Exporteer bestelvoorstel" + (f" – {supplier}" if supplier else ""))
+
+# [END: export_plan]
+# [END: ReplenishWindow]
 # [CLASS: Window]
 class Window(QMainWindow):
 # [FUNC: __init__]
@@ -158,9 +500,12 @@ class Window(QMainWindow):
         self.ui = Ui_MainWindow()
         self.ui.setupUi(self)
 
-        self._all_rows: List[Dict[str, Any]] = []
-        self._header_map: Dict[str, str] = {}
+        # dataset als onveranderlijke versies (core/snapshot.py): laden/vergelijken bouwt in een
+        # worker een nieuwe versie, filters en tabel lezen altijd één consistente versie
+        self._store = SnapshotStore()
+        self._snapshot_worker: Optional[SnapshotWorker] = None
         self._low_stock_mode = False
+        self._warehouse = ALL  # actieve partitie (magazijn/bedrijf); ALL = alles
 
         # kolomselector-state
         self._col_container: Optional[QWidget] = None
@@ -168,115 +513,157 @@ class Window(QMainWindow):
         self._visible_cols: List[str] = []   # actuele selectie
         self._default_cols: List[str] = []   # reset-doel
 
-        # dynamische route-kolommen (Route 1..N)
-        self._route_cols: List[str] = []
+        # huidige resultaatset + getoonde kolommen (bron voor export) en de versie waaruit ze komt
+        self._view_snap: Snapshot = self._store.current()
+        self._view_rows: List[Dict[str, Any]] = []
+        self._view_bits = 0  # _view_rows als facet-bitset (draaitabel)
+        self._view_cols: List[str] = []
+        self._export_worker: Optional[ExportWorker] = None
+
+        # plan van de laatste zoekopdracht (zoekindexen zelf horen bij de snapshot)
+        self._last_explain = ""
+
+        # draaitabel (core/pivot.py), venster lui aangemaakt
+        self._pivot_window: Optional[PivotWindow] = None
+        # bestelvoorstel (core/replenish.py), venster lui aangemaakt
+        self._replenish_window: Optional[ReplenishWindow] = None
+
+        # facetfilters (bitmaps per partitie in de snapshot) + gekozen waarden per veld
+        self._facet_selection: Dict[str, set] = {}
+        self._facet_dock: Optional[QDockWidget] = None
+        self._facet_lists: Dict[str, QListWidget] = {}
 
         # tabelmodel
-        self.model = QStandardItemModel(self)
+        self.model = ProductTableModel(self)
         self.ui.tableProducts.setModel(self.model)
         self.ui.tableProducts.setSortingEnabled(True)
+        # kolombreedtes op 100 rijen meten i.p.v. Qt's standaard 1000: resizeColumnsToContents
+        # na elke toets kostte bij een (bijna) volle tabel ~600 ms, ongeacht de catalogusgrootte
+        self.ui.tableProducts.horizontalHeader().setResizeContentsPrecision(100)
 
         # events
         self.ui.lineSearch.textChanged.connect(self.apply_filters)
         self.ui.btnLowStock.clicked.connect(self.toggle_low_stock)
         self.ui.btnCompare.clicked.connect(self.compare_prices)
+        self._build_actions_bar()
 
         # initial load
         self.load_products()
-        # kolom-selector opbouwen obv data
+        # kolom-selector en facetfilters opbouwen obv data
         self._build_column_selector()
+        self._build_facet_panel()
         self.apply_filters()
 
 # [END: __init__]
+# [FUNC: _build_actions_bar]
+    def _build_actions_bar(self):
+        self._actions_bar = QToolBar("Acties", self)
+        self._actions_bar.setMovable(False)
+        self._actions_bar.addAction("Exporteren…", self.export_view)
+        self._reload_action = self._actions_bar.addAction("Herladen", self.reload_products)
+        self._actions_bar.addAction("Zoekplan…", self.show_search_plan)
+        self._actions_bar.addAction("Draaitabel…", self.show_pivot)
+        self._actions_bar.addAction("Bestelvoorstel…", self.show_replenish)
+
+        # magazijnfilter, enkel zichtbaar bij meerdere exports (resources/magazijnen/)
+        self._actions_bar.addSeparator()
+        self.cmbWarehouse = QComboBox(self._actions_bar)
+        self.cmbWarehouse.currentIndexChanged.connect(self._on_warehouse_changed)
+        self._wh_label_action = self._actions_bar.addWidget(QLabel(" Magazijn: ", self._actions_bar))
+        self._wh_combo_action = self._actions_bar.addWidget(self.cmbWarehouse)
+        self._wh_label_action.setVisible(False)
+        self._wh_combo_action.setVisible(False)
+        self.addToolBar(self._actions_bar)
+
+# [END: _build_actions_bar]
+# [FUNC: _fill_warehouse_combo]
+    def _fill_warehouse_combo(self):
+        parts = self._store.current().partitions
+        self.cmbWarehouse.blockSignals(True)
+        self.cmbWarehouse.clear()
+        self.cmbWarehouse.addItem("Alle magazijnen", ALL)
+        for name in parts:
+            self.cmbWarehouse.addItem(name, name)
+        self.cmbWarehouse.blockSignals(False)
+        if self._warehouse not in parts:
+            self._warehouse = ALL
+        self.cmbWarehouse.setCurrentIndex(max(0, self.cmbWarehouse.findData(self._warehouse)))
+        self._wh_label_action.setVisible(bool(parts))
+        self._wh_combo_action.setVisible(bool(parts))
+
+# [END: _fill_warehouse_combo]
+# [FUNC: _on_warehouse_changed]
+    def _on_warehouse_changed(self, _index: int):
+        self._warehouse = self.cmbWarehouse.currentData() or ALL
+        self._build_facet_panel()  # andere partitie → andere waarden/aantallen
+        self.apply_filters()
+
+# [END: _on_warehouse_changed]
+# [FUNC: _available_columns]
+    def _available_columns(self) -> List[str]:
+        return self._store.current().catalog.available_columns()
+
+# [END: _available_columns]
 # [FUNC: load_products]
     def load_products(self):
+        """Eerste keer laden, synchroon (het venster heeft meteen data nodig)."""
         try:
-            rows = load_any_products(DEFAULT_CSV, DEFAULT_XLSX)
+            snap = load_snapshot(path_csv=DEFAULT_CSV, path_xlsx=DEFAULT_XLSX)
         except Exception as e:
             QMessageBox.critical(self, "Laden mislukt", str(e))
-            rows = []
-        if not rows:
-            self._all_rows = []; self.refresh_table([]); return
-
-        header = list(rows[0].keys())
-        hmap: Dict[str, str] = {}
-        for key, cands in PREF_COLS.items():
-            found = first_present(cands, header)
-            if found: hmap[key] = found
-        self._header_map = hmap
-
-        cleaned: List[Dict[str, Any]] = []
-        for r in rows:
-            rec = dict(r)  # originele CSV-kolommen + we voegen _-keys toe
-            id_val = r.get(hmap.get("id",""), None) or r.get(hmap.get("default_code",""), None) or r.get(hmap.get("name",""), "")
-            rec["_id"] = id_val
-            rec["_name"] = r.get(hmap.get("name",""), "")
-            rec["_sku"] = r.get(hmap.get("default_code",""), "")
-            rec["_barcode"] = r.get(hmap.get("barcode",""), "")
-            rec["_price"] = normalize_number(r.get(hmap.get("list_price",""), 0))
-            rec["_cost"]  = normalize_number(r.get(hmap.get("standard_price",""), 0))
-            rec["_qty"]   = normalize_number(r.get(hmap.get("qty_available",""), 0))
-            rec["_qty_virtual"] = normalize_number(r.get(hmap.get("virtual_available",""), 0))
-            cleaned.append(rec)
-
-        # voeg samen per product en explode de Routes-kolom naar Route 1..N
-        self._all_rows = self._group_and_explode_routes(cleaned)
-        logging.info(f"Ingeladen rijen (na groeperen): {len(self._all_rows)}")
+            snap = Snapshot(None)
+        self._store.publish(snap)
+        self._fill_warehouse_combo()
+        if not snap.rows:
+            self.refresh_table([], snap)
 
 # [END: load_products]
-# [FUNC: _group_and_explode_routes]
-    def _group_and_explode_routes(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Vouw vervolgregels samen per product en zet Routes naast elkaar als Route 1..N."""
-        if not rows:
-            self._route_cols = []
-            return rows
-
-        header = list(rows[0].keys())
-        routes_col = next((c for c in ROUTES_FIELD_CANDIDATES if c in header), None)
-        if not routes_col:
-            # geen Routes-kolom aanwezig
-            self._route_cols = []
-            return rows
-
-        def key_of(r: Dict[str, Any]) -> str:
-            return (str(r.get("_id") or "").strip()
-                    or str(r.get("_sku") or "").strip()
-                    or str(r.get("_name") or "").strip())
-
-        # groepeer basisrij + verzamel routes
-        groups: Dict[str, Dict[str, Any]] = {}
-        routes_map: Dict[str, List[str]] = {}
-        for r in rows:
-            k = key_of(r)
-            if not k:
-                # sla rijen zonder sleutel over
-                continue
-            groups.setdefault(k, dict(r))  # eerste rij als basis
-            vals = _split_routes(str(r.get(routes_col) or ""))
-            if vals:
-                acc = routes_map.setdefault(k, [])
-                for v in vals:
-                    if v not in acc:
-                        acc.append(v)
-
-        # bepaal max aantal routes over alle producten
-        max_routes = max((len(v) for v in routes_map.values()), default=0)
-        # NB: jij gaf aan dat er 4 elementen zijn -> dit vangt dat automatisch af.
-        self._route_cols = [f"Route {i}" for i in range(1, max_routes + 1)]
-
-        # bouw eindrijen: basis + Route 1..N (verwijder originele 'Routes')
-        out: List[Dict[str, Any]] = []
-        for k, base in groups.items():
-            routes = routes_map.get(k, [])
-            row = dict(base)
-            row.pop(routes_col, None)  # oorspronkelijke kolom weghalen
-            for i in range(max_routes):
-                row[f"Route {i+1}"] = routes[i] if i < len(routes) else ""
-            out.append(row)
+# [FUNC: reload_products]
+    def reload_products(self):
+        """Opnieuw inlezen in de achtergrond; zoeken blijft intussen op de huidige versie werken."""
+        base = self._store.current()
+        if self._start_snapshot_worker(lambda: load_snapshot(base, path_csv=DEFAULT_CSV, path_xlsx=DEFAULT_XLSX),
+                                       None, "Herladen…"):
+            self._reload_action.setEnabled(False)
 
-        return out
+# [END: reload_products]
+# [FUNC: _start_snapshot_worker]
+    def _start_snapshot_worker(self, task: Callable[[], Snapshot], base: Optional[Snapshot], busy: str) -> bool:
+        if self._snapshot_worker is not None:
+            QMessageBox.information(self, "Even geduld", "Er wordt al geladen of vergeleken.")
+            return False
+        worker = SnapshotWorker(task, self)
+        worker.ready.connect(lambda snap: self._install_snapshot(snap, base))
+        worker.failed.connect(lambda msg: QMessageBox.critical(self, "Fout bij inladen", msg))
+        worker.finished.connect(self._snapshot_finished)
+        self._snapshot_worker = worker
+        self.statusBar().showMessage(busy)
+        worker.start()
+        return True
+
+# [END: _start_snapshot_worker]
+# [FUNC: _install_snapshot]
+    def _install_snapshot(self, snap: Snapshot, base: Optional[Snapshot]):
+        """Nieuwe versie inwisselen; bij een andere catalogus ook kolommen, magazijnen en facetten."""
+        previous = self._store.current()
+        snap = self._store.publish(snap, base)
+        if snap.catalog is not previous.catalog:
+            self._fill_warehouse_combo()
+            self._build_column_selector()
+            self._build_facet_panel()
+        self.apply_filters()
+        self.statusBar().showMessage(f"{len(snap.rows)} producten (versie {snap.version})", 5000)
+
+# [END: _install_snapshot]
+# [FUNC: _snapshot_finished]
+    def _snapshot_finished(self):
+        if self._snapshot_worker is not None:
+            self._snapshot_worker.deleteLater()
+        self._snapshot_worker = None
+        self._reload_action.setEnabled(True)
+        self.ui.btnCompare.setEnabled(True)
 
-# [END: _group_and_explode_routes]
+# [END: _snapshot_finished]
 # [FUNC: _build_column_selector]
     def _build_column_selector(self):
         # verwijder bestaande selector (bij herladen)
@@ -286,14 +673,8 @@ class Window(QMainWindow):
             self._col_container = None
             self._col_checks.clear()
 
-        # bepaal welke kolommen beschikbaar zijn in de data
-        base = (self._all_rows[0] if self._all_rows else {})
-        # eerst vaste volgorde
-        available = [col for col in DISPLAY_ORDER if col in base]
-        # dan dynamische Route-kolommen erachter
-        for rc in self._route_cols:
-            if rc in base and rc not in available:
-                available.append(rc)
+        # beschikbare kolommen: vaste volgorde, dan Route 1..N (en voorraad per magazijn)
+        available = self._available_columns()
 
         # standaardselectie = alle beschikbare (zoals eerder gedrag)
         self._default_cols = available[:]
@@ -365,74 +746,190 @@ class Window(QMainWindow):
 # [END: _apply_checks]
 # [FUNC: apply_filters]
     def apply_filters(self):
-        q = self.ui.lineSearch.text().strip().lower()
-        rows = self._all_rows
-
-        if q:
-            rows = [
-                r for r in rows
-                if q in str(r.get("_name", "")).lower()
-                or q in str(r.get("_sku", "")).lower()
-                or q in str(r.get("_barcode", "")).lower()
-            ]
+        # één versie voor de hele doorgang, ook als er intussen een nieuwe klaarstaat
+        snap = self._store.current()
+        all_rows = snap.rows_for(self._warehouse)
+        positions = self._search(snap, self.ui.lineSearch.text())
         if self._low_stock_mode:
-            rows = [r for r in rows if r.get("_qty", 0) < MIN_STOCK]
+            qty_key = snap.qty_key(self._warehouse)
+            positions = [p for p in positions if all_rows[p].get(qty_key, 0) < MIN_STOCK]
 
-        self.refresh_table(rows)
+        # zoekresultaat als bitmap; facetten en hun aantallen zijn daarna enkel bitbewerkingen
+        facets = snap.facets(self._warehouse)
+        base = facets.from_positions(positions)
+        bits = base & facets.select(self._facet_selection)
+        rows = facets.rows_of(bits)
+        self._update_facet_counts(facets.counts(self._facet_selection, base))
+
+        self._view_snap = snap
+        self._view_rows = rows
+        self._view_bits = bits
+        self.refresh_table(rows, snap)
+        if self._pivot_window is not None and self._pivot_window.isVisible():
+            self._pivot_window.refresh()
+        if self._replenish_window is not None and self._replenish_window.isVisible():
+            self._replenish_window.refresh()
 
 # [END: apply_filters]
+# [FUNC: _search]
+    def _search(self, snap: Snapshot, text: str):
+        """
+        Zoekveld als zoekopdracht (core/query.py) → oplopende posities in de rijen van de
+        actieve partitie; ongeldig (bv. half getypt) → deeltekst op de volledige tekst zoals vroeger.
+        """
+        try:
+            query = parse_query(text, snap.qty_key(self._warehouse))
+            note = ""
+        except QueryError as e:
+            query = text_query(text)
+            note = f"Geen geldige zoekopdracht ({e}); gezocht op de volledige tekst.\n"
+        positions, explain = query.positions(snap.query_index(self._warehouse))
+        self._last_explain = note + str(explain)
+        self.ui.lineSearch.setToolTip(self._last_explain)
+        return positions
+
+# [END: _search]
+# [FUNC: _build_facet_panel]
+    def _build_facet_panel(self):
+        """Facetfilters in een dock links: één aanvinklijst per veld, aantallen volgen de filters."""
+        if self._facet_dock is None:
+            self._facet_dock = QDockWidget("Filters", self)
+            self._facet_dock.setObjectName("dockFacets")
+            self.addDockWidget(Qt.DockWidgetArea.LeftDockWidgetArea, self._facet_dock)
+        facets = self._store.current().facets(self._warehouse)
+        # selectie beperken tot waarden die in deze dataset/partitie bestaan
+        self._facet_selection = {
+            f: {v for v in chosen if v in facets.bitmaps.get(f, {})}
+            for f, chosen in self._facet_selection.items()
+        }
+
+        panel = QWidget(self._facet_dock)
+        vb = QVBoxLayout(panel)
+        self._facet_lists.clear()
+        for field in FACET_FIELDS:
+            values = facets.values(field)
+            if not values:
+                continue
+            box = QGroupBox(field, panel)
+            bl = QVBoxLayout(box)
+            lst = QListWidget(box)
+            chosen = self._facet_selection.get(field, set())
+            for v in values:
+                it = QListWidgetItem(v, lst)
+                it.setData(Qt.ItemDataRole.UserRole, v)
+                it.setFlags(it.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+                it.setCheckState(Qt.CheckState.Checked if v in chosen else Qt.CheckState.Unchecked)
+            lst.itemChanged.connect(lambda _it, f=field: self._on_facet_changed(f))
+            bl.addWidget(lst)
+            vb.addWidget(box)
+            self._facet_lists[field] = lst
+        btn_clear = QPushButton("Filters wissen", panel)
+        btn_clear.clicked.connect(self._clear_facets)
+        vb.addWidget(btn_clear)
+        vb.addStretch(1)
+        self._facet_dock.setWidget(panel)
+
+# [END: _build_facet_panel]
+# [FUNC: _on_facet_changed]
+    def _on_facet_changed(self, field: str):
+        lst = self._facet_lists[field]
+        self._facet_selection[field] = {
+            lst.item(i).data(Qt.ItemDataRole.UserRole) for i in range(lst.count())
+            if lst.item(i).checkState() == Qt.CheckState.Checked
+        }
+        self.apply_filters()
+
+# [END: _on_facet_changed]
+# [FUNC: _clear_facets]
+    def _clear_facets(self):
+        self._facet_selection.clear()
+        for lst in self._facet_lists.values():
+            lst.blockSignals(True)
+            for i in range(lst.count()):
+                lst.item(i).setCheckState(Qt.CheckState.Unchecked)
+            lst.blockSignals(False)
+        self.apply_filters()
+
+# [END: _clear_facets]
+# [FUNC: _update_facet_counts]
+    def _update_facet_counts(self, counts: Dict[str, Dict[str, int]]):
+        grey = QBrush(QColor(150, 150, 150))
+        for field, lst in self._facet_lists.items():
+            per_value = counts.get(field, {})
+            lst.blockSignals(True)  # setText zou anders itemChanged → apply_filters geven
+            for i in range(lst.count()):
+                it = lst.item(i)
+                v = it.data(Qt.ItemDataRole.UserRole)
+                n = per_value.get(v, 0)
+                it.setText(f"{v} ({n})")
+                it.setForeground(grey if n == 0 else QBrush())
+            lst.blockSignals(False)
+
+# [END: _update_facet_counts]
+# [FUNC: show_search_plan]
+    def show_search_plan(self):
+        QMessageBox.information(self, "Zoekplan", self._last_explain or "Nog geen zoekopdracht uitgevoerd.")
+
+# [END: show_search_plan]
+# [FUNC: pivot]
+    def pivot(self, levels: List[str]) -> Dict[str, Any]:
+        """Aggregatie van de huidige weergave; gecachet per filtertoestand (zoekterm, lage voorraad, facetten)."""
+        engine = self._view_snap.pivot_engine(self._warehouse)
+        facets = tuple(sorted((f, tuple(sorted(v))) for f, v in self._facet_selection.items() if v))
+        state = (self.ui.lineSearch.text(), self._low_stock_mode, facets)
+        flags = self._view_snap.facets(self._warehouse).flags(self._view_bits)
+        return engine.aggregate(self._view_rows, levels, state, flags)
+
+# [END: pivot]
+# [FUNC: show_pivot]
+    def show_pivot(self):
+        if self._pivot_window is None:
+            self._pivot_window = PivotWindow(self)
+        self._pivot_window.refresh()
+        self._pivot_window.show()
+        self._pivot_window.raise_()
+
+# [END: show_pivot]
+# [FUNC: replenish]
+    def replenish(self, policy: ReplenishPolicy) -> ReplenishPlan:
+        """Bestelvoorstel over de huidige weergave (zonder filter: de hele partitie)."""
+        return self._view_snap.replenish_planner(self._warehouse).plan(policy, self._view_rows)
+
+# [END: replenish]
+# [FUNC: show_replenish]
+    def show_replenish(self):
+        if not has_stock_columns(self._store.current().rows):
+            QMessageBox.information(
+                self, "Geen voorraadkolommen",
+                "Je CSV bevat geen 'Aanwezige voorraad' of 'Virtuele voorraad'."
+            )
+            return
+        if self._replenish_window is None:
+            self._replenish_window = ReplenishWindow(self)
+        self._replenish_window.refresh()
+        self._replenish_window.show()
+        self._replenish_window.raise_()
+
+# [END: show_replenish]
 # [FUNC: refresh_table]
-    def refresh_table(self, rows: List[Dict[str, Any]]):
+    def refresh_table(self, rows: List[Dict[str, Any]], snap: Snapshot):
         # aanwezige kolommen in data
-        base = rows[0] if rows else (self._all_rows[0] if self._all_rows else {})
-        # eerst vaste volgorde
-        available = [col for col in DISPLAY_ORDER if col in base]
-        # dan dynamische Route-kolommen erbij
-        for rc in self._route_cols:
-            if rc in base and rc not in available:
-                available.append(rc)
+        available = snap.catalog.available_columns()
 
         # te tonen kolommen = selectie (of default als leeg)
         present = [c for c in self._visible_cols if c in available] or available
 
         headers = present + ["Nieuwe prijs", "Δ prijs"]
+        self._view_cols = headers
 
-        self.model.clear()
-        self.model.setHorizontalHeaderLabels(headers)
-
-        for r in rows:
-            items: List[QStandardItem] = []
-            for col in present:
-                val = r.get(col, "")
-                if col in ("Kan verkocht worden", "Kan gekocht worden"):
-                    val = format_bool(val)
-                if col in ("Verkoopprijs", "Kostprijs", "Aanwezige voorraad", "Virtuele voorraad"):
-                    try:
-                        num = normalize_number(r.get(col))
-                        val = f"{num:.2f}"
-                    except Exception:
-                        pass
-                items.append(QStandardItem("" if val is None else str(val)))
-
-            new_price = r.get("_new_price")
-            delta = None
-            if new_price is not None:
-                delta = float(new_price) - float(r.get("_price", 0))
-            item_new = QStandardItem("" if new_price is None else f"{new_price:.2f}")
-            item_delta = QStandardItem("" if delta is None else f"{delta:+.2f}")
-            if delta is not None and delta != 0:
-                brush = QBrush(QColor("red" if delta > 0 else "green"))
-                item_delta.setData(brush, Qt.ItemDataRole.BackgroundRole)
-
-            for it in items + [item_new, item_delta]:
-                it.setEditable(False)
-            self.model.appendRow(items + [item_new, item_delta])
+        self.model.set_rows(rows, headers, snap)
 
-        total = len(rows)
-        avg_price = (sum(float(r.get("_price", 0)) for r in rows) / max(1, len(rows))) if rows else 0.0
-        total_value = sum(float(r.get("_price", 0)) * float(r.get("_qty", 0)) for r in rows) if rows else 0.0
+        st = snap.totals(self._warehouse) if rows is snap.rows_for(self._warehouse) else None
+        if st is None:
+            # gefilterd (of geen magazijnpartities): tellen over de weergave
+            st = stock_stats(rows, snap.qty_key(self._warehouse))
         self.ui.lblStats.setText(
-            f"Aantal: {total} | Gem. prijs: €{avg_price:.2f} | Voorraadwaarde: €{total_value:.2f}"
+            f"Aantal: {st['count']} | Gem. prijs: €{st['avg_price']:.2f} | Voorraadwaarde: €{st['stock_value']:.2f}"
         )
         self.ui.tableProducts.resizeColumnsToContents()
         self.ui.tableProducts.horizontalHeader().setStretchLastSection(True)
@@ -440,8 +937,7 @@ class Window(QMainWindow):
 # [END: refresh_table]
 # [FUNC: toggle_low_stock]
     def toggle_low_stock(self):
-        any_qty = any(r.get("_qty", 0) > 0 for r in self._all_rows) or any(r.get("_qty_virtual", 0) > 0 for r in self._all_rows)
-        if not any_qty:
+        if not has_stock_columns(self._store.current().rows):
             QMessageBox.information(
                 self, "Geen voorraadkolommen",
                 "Je CSV bevat geen 'Aanwezige voorraad' of 'Virtuele voorraad'."
@@ -460,59 +956,76 @@ class Window(QMainWindow):
     def compare_prices(self):
         path, _ = QFileDialog.getOpenFileName(
             self, "Kies tweede export (CSV/XLSX)", str(Path.cwd()),
-            "Spreadsheets (*.csv *.xlsx);;Alle bestanden (*.*)"
+            f"Spreadsheets ({dialog_patterns('.csv')} *.xlsx);;Alle bestanden (*.*)"
         )
         if not path:
             return
-        try:
-            if path.lower().endswith(".csv"):
-                rows2 = read_csv_smart(Path(path))
-            else:
-                rows2 = try_load_xlsx(Path(path))
-        except Exception as e:
-            QMessageBox.critical(self, "Fout bij inladen", str(e))
+        # inlezen + vergelijkingskolom in de achtergrond; de huidige versie blijft ongewijzigd
+        base = self._store.current()
+        if self._start_snapshot_worker(lambda: compare_snapshot(base, Path(path)), base, "Prijzen vergelijken…"):
+            self.ui.btnCompare.setEnabled(False)
+
+# [END: compare_prices]
+# [FUNC: export_view]
+    def export_view(self):
+        if not self._view_rows:
+            QMessageBox.information(self, "Niets te exporteren", "De huidige weergave bevat geen rijen.")
+            return
+        self.export_rows_async(self._view_rows, self._view_cols, "export.csv", "Exporteer huidige weergave",
+                               self._view_snap.new_prices)
+
+# [END: export_view]
+# [FUNC: export_rows_async]
+    def export_rows_async(self, rows: List[Dict[str, Any]], cols: List[str], default_name: str, title: str,
+                          new_prices: Optional[Dict[int, float]] = None):
+        """Bestandskeuze + ExportWorker met voortgang (weergave, bestelvoorstel)."""
+        if self._export_worker is not None:
+            QMessageBox.information(self, "Export bezig", "Er loopt al een export.")
             return
-        if not rows2:
-            QMessageBox.information(self, "Leeg bestand", "Geen rijen in tweede export.")
+        path, _ = QFileDialog.getSaveFileName(
+            self, title, str(Path.cwd() / default_name),
+            "CSV (*.csv);;Excel (*.xlsx);;Parquet (*.parquet);;Arrow (*.arrow)"
+        )
+        if not path:
             return
+        out = Path(path)
 
-        header2 = list(rows2[0].keys())
-        hmap2: Dict[str, str] = {}
-        for key, cands in PREF_COLS.items():
-            f = first_present(cands, header2)
-            if f:
-                hmap2[key] = f
-
-        def key_for(rec: Dict[str, Any]) -> str:
-            for k in ("id", "default_code", "name"):
-                col = hmap2.get(k)
-                if col:
-                    v = rec.get(col)
-                    if v is not None and str(v).strip():
-                        return str(v).strip()
-            return ""
-
-        price_by_key: Dict[str, float] = {}
-        for rec in rows2:
-            k = key_for(rec)
-            if not k:
-                continue
-            p = normalize_number(rec.get(hmap2.get("list_price", ""), 0))
-            price_by_key[k] = p
-
-        for r in self._all_rows:
-            k = (str(r.get("_id") or "").strip()
-                 or str(r.get("_sku") or "").strip()
-                 or str(r.get("_name") or "").strip())
-            new_price = price_by_key.get(k)
-            if new_price is not None:
-                r["_new_price"] = new_price
-            else:
-                r.pop("_new_price", None)
+        total = len(rows)
+        dlg = QProgressDialog("Exporteren…", "Annuleren", 0, total, self)
+        dlg.setWindowModality(Qt.WindowModality.WindowModal)
+        dlg.setMinimumDuration(300)
 
-        self.apply_filters()
+        worker = ExportWorker(rows, cols, out, new_prices, self)
+        worker.progress.connect(lambda n, t: dlg.setValue(n))
+        dlg.canceled.connect(worker.cancel)
 
-# [END: compare_prices]
+        def finished_ok(n: int):
+            dlg.reset()
+            self.statusBar().showMessage(f"{n} rijen geëxporteerd naar {out}", 8000)
+
+        def finished_cancelled(n: int):
+            dlg.reset()
+            self.statusBar().showMessage("Export geannuleerd", 5000)
+
+        def finished_err(msg: str):
+            dlg.reset()
+            QMessageBox.critical(self, "Export mislukt", msg)
+
+        worker.done.connect(finished_ok)
+        worker.cancelled.connect(finished_cancelled)
+        worker.failed.connect(finished_err)
+        worker.finished.connect(self._export_finished)
+        self._export_worker = worker
+        worker.start()
+
+# [END: export_rows_async]
+# [FUNC: _export_finished]
+    def _export_finished(self):
+        if self._export_worker is not None:
+            self._export_worker.deleteLater()
+        self._export_worker = None
+
+# [END: _export_finished]
 # [END: Window]
 # Optioneel: los draaien voor test
 # [SECTION: CLI / Entrypoint]
@@ -0,0 +1,415 @@
+# bench/gui_bench.py
+# Offscreen benchmark van wat gebruikers voelen in Voorraad en het portaal:
+#   voorraad.keystroke    toetsaanslag in lineSearch → tableProducts opnieuw getekend
+#   voorraad.apply_checks kolommen aan/uit + Toepassen → opnieuw getekend
+#   voorraad.compare      compare_prices met een tweede export → opnieuw getekend
+#   voorraad.open         Window() tot het eerste getekende venster
+#   portal.open           AppPortaal() tot het eerste getekende venster
+#
+# Per datasetgrootte draait een apart worker-proces (schone piekgeheugenmeting) met
+# QT_QPA_PLATFORM=offscreen op een gegenereerde export (vaste seed → telkens dezelfde data
+# en hetzelfde interactiescript). Per interactie: p50/p90/p95/max in ms; per grootte de
+# piek-RSS. Resultaat als JSON in bench/results/ (met commit), vergelijkbaar via --compare.
+# Exitcode 1 als een budget uit bench/budgets.json overschreden wordt.
+#
+#   python bench/gui_bench.py
+#   python bench/gui_bench.py --sizes 1000,20000 --repeat 5
+#   python bench/gui_bench.py --compare bench/results/<vorige>.json --max-regression 20
+#   Start_Main.bat bench\gui_bench.py
+
+# [SECTION: Imports]
+import os, sys, csv, gc, json, time, random, argparse, platform, subprocess, tempfile, shutil
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Callable
+
+# [END: Imports]
+ROOT = Path(__file__).resolve().parent.parent
+BENCH_DIR = ROOT / "bench"
+DEFAULT_BUDGETS = BENCH_DIR / "budgets.json"
+DEFAULT_RESULTS = BENCH_DIR / "results"
+DEFAULT_SIZES = [1000, 10000, 50000]
+DEFAULT_SEED = 20240601
+PAINT_TIMEOUT = 30.0  # s; venster dat nooit tekent = fout, geen oneindige lus
+
+# interactiescript: elke toets is één meting (halfgetypte zoekopdrachten horen erbij)
+SEARCH_SCRIPT = ["black eagle", "SKU0001", "voorraad<5 prijs>100", "categorie:Inkt route:Kopen"]
+
+COLUMNS = [
+    "ID", "Naam", "Kan verkocht worden", "Kan gekocht worden", "Productsoort", "Verkoopprijs",
+    "Kostprijs", "Productcategorie", "Interne referentie", "Barcode", "Leveranciers", "Routes",
+    "Aanwezige voorraad", "Virtuele voorraad",
+]
+CATEGORIES = ["All / Gereedschap", "All / Inkt", "All / Papier", "All / Machines", "All / Onderdelen"]
+SUPPLIERS = ["Acme", "Vio BV", "Papyrus", "Inktland", "Drukwerk NV"]
+WORDS = ["black", "eagle", "HD", "pro", "mini", "toner", "blad", "rol", "set", "kit"]
+
+# [FUNC: generate_export]
+def generate_export(path: Path, n: int, seed: int = DEFAULT_SEED, price_shift: float = 0.0):
+    """
+    Odoo-achtige productexport (;-gescheiden, komma als decimaalteken) met n producten.
+    Elk 7e product heeft een vervolgregel met een extra route. price_shift ≠ 0 verandert de
+    prijs van ~10% van de producten (tweede export voor compare_prices).
+    """
+    rnd = random.Random(seed)
+    shift_rnd = random.Random(seed + 1)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f, delimiter=";")
+        w.writerow(COLUMNS)
+        empty = [""] * len(COLUMNS)
+        for i in range(n):
+            qty = rnd.randint(0, 40)
+            price = rnd.uniform(1, 500)
+            if price_shift and shift_rnd.random() < 0.1:
+                price *= 1 + price_shift
+            name = " ".join(rnd.sample(WORDS, 3)) + f" {i}"
+            w.writerow([
+                f"__export__.product_{i}", name,
+                rnd.choice(["Waar", "Onwaar"]), rnd.choice(["Waar", "Onwaar"]),
+                rnd.choice(["Verbruiksartikel", "Opslagproduct", "Dienst"]),
+                f"{price:.2f}".replace(".", ","), f"{rnd.uniform(1, 300):.2f}".replace(".", ","),
+                rnd.choice(CATEGORIES), f"SKU{i:06d}", f"54{i:011d}", rnd.choice(SUPPLIERS),
+                rnd.choice(["Kopen", "Produceren"]), qty, qty + rnd.randint(-5, 10),
+            ])
+            if i % 7 == 0:
+                extra = empty[:]
+                extra[COLUMNS.index("ID")] = f"__export__.product_{i}"
+                extra[COLUMNS.index("Routes")] = "Dropship"
+                w.writerow(extra)
+
+# [END: generate_export]
+# [FUNC: percentiles]
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """Nearest-rank percentielen (geen interpolatie: zelfde metingen → zelfde getallen)."""
+    if not samples:
+        return {"n": 0}
+    s = sorted(samples)
+
+    def rank(p: float) -> float:
+        return s[max(0, min(len(s) - 1, int(-(-p * len(s) // 100)) - 1))]
+
+    return {"n": len(s), "p50": rank(50), "p90": rank(90), "p95": rank(95), "max": s[-1],
+            "mean": sum(s) / len(s)}
+
+# [END: percentiles]
+# [FUNC: peak_rss_mb]
+def peak_rss_mb() -> float:
+    """Piek-werkgeheugen van dit proces in MB (Linux/macOS via resource, Windows via psapi)."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        import ctypes
+        from ctypes import wintypes
+
+        class PMC(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+        pmc = PMC()
+        pmc.cb = ctypes.sizeof(PMC)
+        handle = ctypes.windll.kernel32.GetCurrentProcess()
+        ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(pmc), pmc.cb)
+        return pmc.PeakWorkingSetSize / (1024 * 1024)
+
+# [END: peak_rss_mb]
+# [SECTION: Worker]
+# [FUNC: run_worker]
+def run_worker(size: int, repeat: int, startup_repeat: int, workdir: Path) -> Dict[str, Any]:
+    """Draait in een eigen proces met cwd = workdir (resources/products.csv + compare.csv)."""
+    os.chdir(workdir)
+    sys.path.insert(0, str(ROOT))
+    from PyQt6.QtWidgets import QApplication, QMessageBox, QFileDialog
+    from PyQt6.QtCore import QObject, QEvent
+    from PyQt6.QtTest import QTest
+
+    app = QApplication.instance() or QApplication([])
+    samples: Dict[str, List[float]] = {}
+    errors: Dict[str, str] = {}
+    messages: List[str] = []
+
+    # dialogen mogen niet blokkeren: antwoorden vastleggen en doorgaan
+    for name in ("information", "warning", "critical"):
+        setattr(QMessageBox, name, staticmethod(lambda _parent, title, text, *a, **k: messages.append(f"{title}: {text}")))
+    compare_path = str(workdir / "compare.csv")
+    QFileDialog.getOpenFileName = staticmethod(lambda *a, **k: (compare_path, ""))
+
+    class PaintProbe(QObject):
+        def __init__(self, widget):
+            super().__init__(widget)
+            self.widget = widget
+            self.count = 0
+            widget.installEventFilter(self)
+
+        def eventFilter(self, obj, ev):
+            if ev.type() == QEvent.Type.Paint:
+                self.count += 1
+            return False
+
+    def until_painted(probe: "PaintProbe", before: int, force: bool):
+        app.processEvents()
+        deadline = time.perf_counter() + PAINT_TIMEOUT
+        while probe.count == before:
+            if force:
+                probe.widget.repaint()  # niets ingepland (bv. zelfde resultaat): toch één keer tekenen
+                break
+            if time.perf_counter() > deadline:
+                raise TimeoutError("venster niet getekend binnen de timeout")
+            app.processEvents()
+            time.sleep(0.001)
+
+    def measure(name: str, action: Callable[[], Any], probe_of: Callable[[Any], "PaintProbe"], force: bool = True):
+        gc.collect()
+        probe = probe_of(None)
+        before = probe.count if probe is not None else 0
+        t0 = time.perf_counter()
+        result = action()
+        if probe is None:
+            probe = probe_of(result)
+            before = 0
+        until_painted(probe, before, force)
+        samples.setdefault(name, []).append((time.perf_counter() - t0) * 1000.0)
+        return result
+
+    # 1) portaal: constructor (laadt de catalogus) tot het eerste getekende venster
+    try:
+        import app_portaal
+        for _ in range(startup_repeat):
+            def open_portal():
+                w = app_portaal.AppPortaal()
+                w._bench_probe = PaintProbe(w)
+                w.show()
+                return w
+            w = measure("portal.open", open_portal, lambda w: None if w is None else w._bench_probe, force=False)
+            w.close()
+            w.deleteLater()
+            app.processEvents()
+    except Exception as e:  # bv. gui/Launcher.py nog niet gegenereerd
+        errors["portal.open"] = f"{type(e).__name__}: {e}"
+
+    # 2) Voorraad
+    try:
+        from apps.voorraad import Window
+        win = None
+        for _ in range(startup_repeat):
+            if win is not None:
+                win.close()
+                win.deleteLater()
+                app.processEvents()
+
+            def open_window():
+                w = Window()
+                w._bench_probe = PaintProbe(w)
+                w.show()
+                return w
+            win = measure("voorraad.open", open_window, lambda w: None if w is None else w._bench_probe, force=False)
+
+        table_probe = PaintProbe(win.ui.tableProducts.viewport())
+        line = win.ui.lineSearch
+
+        for cycle in range(repeat + 1):  # eerste ronde = opwarmen (indexen, caches), niet meegeteld
+            name = "voorraad.keystroke" if cycle else "_warmup.keystroke"
+            for text in SEARCH_SCRIPT:
+                for ch in text:
+                    measure(name, lambda ch=ch: QTest.keyClick(line, ch), lambda _r: table_probe)
+                measure(name, line.clear, lambda _r: table_probe)
+
+        cols = list(win._col_checks)
+        half = set(cols[: max(1, len(cols) // 2)])
+        for i in range(2 * repeat):
+            for name, cb in win._col_checks.items():
+                cb.setChecked(i % 2 == 1 or name in half)
+            measure("voorraad.apply_checks", win._apply_checks, lambda _r: table_probe)
+
+        def compare_and_wait():
+            # vergelijken loopt in een SnapshotWorker; meten tot de nieuwe versie ingewisseld is
+            win.compare_prices()
+            deadline = time.perf_counter() + PAINT_TIMEOUT
+            while win._snapshot_worker is not None:
+                if time.perf_counter() > deadline:
+                    raise TimeoutError("vergelijking niet klaar binnen de timeout")
+                app.processEvents()
+                time.sleep(0.001)
+
+        for _ in range(repeat):
+            measure("voorraad.compare", compare_and_wait, lambda _r: table_probe)
+        win.close()
+    except Exception as e:
+        errors["voorraad"] = f"{type(e).__name__}: {e}"
+
+    return {
+        "size": size,
+        "metrics": {k: percentiles(v) for k, v in samples.items() if not k.startswith("_")},
+        "peak_mb": round(peak_rss_mb(), 1),
+        "errors": errors,
+        "messages": messages[:20],
+    }
+
+# [END: run_worker]
+# [END: Worker]
+# [FUNC: _git_info]
+def _git_info() -> Dict[str, Any]:
+    def git(*args) -> str:
+        try:
+            return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, timeout=30).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+    return {"commit": git("rev-parse", "--short", "HEAD") or "onbekend",
+            "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+# [END: _git_info]
+# [FUNC: _environment]
+def _environment() -> Dict[str, Any]:
+    try:
+        from PyQt6.QtCore import PYQT_VERSION_STR, QT_VERSION_STR
+        qt = {"pyqt": PYQT_VERSION_STR, "qt": QT_VERSION_STR}
+    except ImportError:
+        qt = {}
+    return {"python": platform.python_version(), "platform": platform.platform(),
+            "machine": platform.machine(), "cpus": os.cpu_count(), **qt}
+
+# [END: _environment]
+# [FUNC: check_budgets]
+def check_budgets(results: Dict[str, Any], budgets: Dict[str, Any]) -> List[str]:
+    """
+    budgets = {"<metric>": {"p95_ms": {"<grootte>": ms}, "p50_ms": ...}, "peak_mb": {"<grootte>": mb}};
+    groottes zonder budget worden niet gecontroleerd. Geeft de overschrijdingen terug.
+    """
+    failures: List[str] = []
+    for run in results["runs"]:
+        size = str(run["size"])
+        for err_key, err in run["errors"].items():
+            if any(k.startswith(err_key) for k in budgets):
+                failures.append(f"[{size}] {err_key}: kon niet gemeten worden ({err})")
+        limit = budgets.get("peak_mb", {}).get(size)
+        if limit is not None and run["peak_mb"] > limit:
+            failures.append(f"[{size}] peak_mb {run['peak_mb']:.0f} > budget {limit}")
+        for metric, spec in budgets.items():
+            if metric.startswith("_") or metric == "peak_mb":
+                continue
+            stats = run["metrics"].get(metric)
+            if not stats or not stats.get("n"):
+                continue
+            for stat_key, per_size in spec.items():
+                limit = per_size.get(size)
+                value = stats.get(stat_key.replace("_ms", ""))
+                if limit is not None and value is not None and value > limit:
+                    failures.append(f"[{size}] {metric} {stat_key} {value:.1f} ms > budget {limit} ms")
+    return failures
+
+# [END: check_budgets]
+# [FUNC: compare_results]
+def compare_results(new: Dict[str, Any], old: Dict[str, Any], max_regression: Optional[float]) -> List[str]:
+    """Druk p50/p95 naast elkaar af; geeft regressies groter dan max_regression (%) terug."""
+    old_runs = {r["size"]: r for r in old.get("runs", [])}
+    print(f"\nVergelijking met {old['git']['commit']} ({old['started']}):")
+    print(f"{'grootte':>8}  {'metric':<22} {'p50 oud':>9} {'p50 nieuw':>9} {'p95 oud':>9} {'p95 nieuw':>9} {'Δp95':>7}")
+    regressions: List[str] = []
+    for run in new["runs"]:
+        prev = old_runs.get(run["size"])
+        if prev is None:
+            continue
+        for metric, st in sorted(run["metrics"].items()):
+            ost = prev["metrics"].get(metric)
+            if not ost or not ost.get("n") or not st.get("n"):
+                continue
+            delta = (st["p95"] - ost["p95"]) / ost["p95"] * 100.0 if ost["p95"] else 0.0
+            print(f"{run['size']:>8}  {metric:<22} {ost['p50']:>9.1f} {st['p50']:>9.1f} "
+                  f"{ost['p95']:>9.1f} {st['p95']:>9.1f} {delta:>+6.0f}%")
+            if max_regression is not None and delta > max_regression:
+                regressions.append(f"[{run['size']}] {metric} p95 {delta:+.0f}% t.o.v. {old['git']['commit']}")
+        print(f"{run['size']:>8}  {'peak_mb':<22} {prev['peak_mb']:>9.0f} {run['peak_mb']:>9.0f}")
+    return regressions
+
+# [END: compare_results]
+# [FUNC: _print_run]
+def _print_run(run: Dict[str, Any]):
+    print(f"\n{run['size']} producten (piekgeheugen {run['peak_mb']:.0f} MB)")
+    for metric, st in sorted(run["metrics"].items()):
+        print(f"  {metric:<22} n={st['n']:<4} p50={st['p50']:8.1f}  p90={st['p90']:8.1f}  "
+              f"p95={st['p95']:8.1f}  max={st['max']:8.1f} ms")
+    for key, err in run["errors"].items():
+        print(f"  {key:<22} NIET GEMETEN: {err}")
+
+# [END: _print_run]
+# [FUNC: main]
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Offscreen GUI-benchmark (Voorraad + portaal).")
+    p.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="kommagescheiden aantallen producten")
+    p.add_argument("--repeat", type=int, default=3, help="rondes per interactie (na één opwarmronde)")
+    p.add_argument("--startup-repeat", type=int, default=3, help="aantal keer venster openen")
+    p.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    p.add_argument("--budgets", default=str(DEFAULT_BUDGETS), help="JSON met budgetten ('' = geen)")
+    p.add_argument("--out", type=Path, default=DEFAULT_RESULTS, help="map voor het resultaat-JSON")
+    p.add_argument("--compare", type=Path, help="vorig resultaat-JSON om mee te vergelijken")
+    p.add_argument("--max-regression", type=float, help="faal als p95 meer dan dit %% trager is dan --compare")
+    p.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    p.add_argument("--workdir", type=Path, help=argparse.SUPPRESS)
+    p.add_argument("--result-file", type=Path, help=argparse.SUPPRESS)
+    args = p.parse_args(argv)
+
+    if args.worker is not None:
+        res = run_worker(args.worker, args.repeat, args.startup_repeat, args.workdir)
+        args.result_file.write_text(json.dumps(res), encoding="utf-8")
+        return 0
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    results: Dict[str, Any] = {
+        "started": datetime.now().isoformat(timespec="seconds"), "git": _git_info(),
+        "environment": _environment(),
+        "config": {"sizes": sizes, "repeat": args.repeat, "startup_repeat": args.startup_repeat,
+                   "seed": args.seed, "script": SEARCH_SCRIPT},
+        "runs": [],
+    }
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen", PYTHONHASHSEED="0")
+    for size in sizes:
+        tmp = Path(tempfile.mkdtemp(prefix=f"gui_bench_{size}_"))
+        try:
+            generate_export(tmp / "resources" / "products.csv", size, args.seed)
+            generate_export(tmp / "compare.csv", size, args.seed, price_shift=0.05)
+            result_file = tmp / "result.json"
+            cmd = [sys.executable, str(Path(__file__).resolve()), "--worker", str(size), "--workdir", str(tmp),
+                   "--result-file", str(result_file), "--repeat", str(args.repeat),
+                   "--startup-repeat", str(args.startup_repeat)]
+            print(f"Meten: {size} producten …", file=sys.stderr)
+            proc = subprocess.run(cmd, env=env, capture_output=True, text=True)
+            if proc.returncode != 0 or not result_file.exists():
+                print(proc.stderr[-4000:], file=sys.stderr)
+                run = {"size": size, "metrics": {}, "peak_mb": 0.0,
+                       "errors": {"worker": f"exitcode {proc.returncode}"}, "messages": []}
+            else:
+                run = json.loads(result_file.read_text(encoding="utf-8"))
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        results["runs"].append(run)
+        _print_run(run)
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    stamp = results["started"].replace(":", "").replace("-", "")
+    out_file = args.out / f"{stamp}_{results['git']['commit']}{'-dirty' if results['git']['dirty'] else ''}.json"
+    out_file.write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\nResultaat: {out_file}")
+
+    failures: List[str] = []
+    if args.budgets:
+        failures += check_budgets(results, json.loads(Path(args.budgets).read_text(encoding="utf-8")))
+    if args.compare:
+        failures += compare_results(results, json.loads(args.compare.read_text(encoding="utf-8")),
+                                    args.max_regression)
+    if failures:
+        print("\nBENCHMARK GEFAALD:", file=sys.stderr)
+        for f in failures:
+            print(f"  {f}", file=sys.stderr)
+        return 1
+    print("\nAlle budgetten gehaald.")
+    return 0
+
+# [END: main]
+# [SECTION: CLI / Entrypoint]
+if __name__ == "__main__":
+    sys.exit(main())
+# [END: CLI / Entrypoint]
@@ -0,0 +1,338 @@
+# cli.py
+# Headless batch-modus: zoeken, lage voorraad, voorraadwaarde en prijsvergelijking vanuit de terminal.
+# Importeert enkel core.* (geen PyQt6), zodat dit snel start en via cron/taakplanner kan draaien.
+#
+# Voorbeelden:
+#   python cli.py search "black eagle" --format json
+#   python cli.py lowstock --min 3 -o lage_voorraad.csv
+#   python cli.py query "voorraad < 5 categorie:Gereedschap prijs>100" --explain
+#   python cli.py pivot --by Productcategorie,Route --format json
+#   python cli.py replenish --summary
+#   python cli.py replenish --min 10 --max 40 -o bestelvoorstel.csv
+#   python cli.py stats
+#   python cli.py compare nieuwe_export.csv --changed
+#   python cli.py serve --port 8765
+#   python cli.py convert resources/products.parquet
+#   python cli.py history ingest --csv resources/products.csv --date 2026-10-01
+#   python cli.py history series SKU000123 --fields price,qty
+#   python cli.py history changed --since 2026-09-01
+
+# [SECTION: Imports]
+import os, sys, argparse, asyncio, json, logging
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+from core.api import DEFAULT_HOST, DEFAULT_PORT
+from core.export import write_csv_rows, write_json_rows
+from core.formatting import price_delta, COMPARE_COLS, NewPrices
+from core.products import (
+    DEFAULT_CSV, DEFAULT_XLSX, MIN_STOCK, load_catalog, search_rows,
+    low_stock_rows, stock_stats, load_price_map, new_price_column,
+)
+
+# [END: Imports]
+DEFAULT_COLUMNS = [
+    "Naam", "Interne referentie", "Barcode", "Verkoopprijs", "Kostprijs",
+    "Aanwezige voorraad", "Virtuele voorraad",
+]
+
+# [FUNC: _write_rows]
+def _write_rows(rows: List[Dict[str, Any]], cols: List[str], fmt: str, out: Optional[Path],
+                new_prices: Optional[NewPrices] = None) -> int:
+    f = out.open("w", encoding="utf-8-sig" if fmt == "csv" else "utf-8", newline="") if out else sys.stdout
+    try:
+        if fmt == "json":
+            return write_json_rows(f, rows, cols, new_prices)
+        return write_csv_rows(f, rows, cols, new_prices=new_prices)
+    finally:
+        if out:
+            f.close()
+
+# [END: _write_rows]
+# [FUNC: _write_stats]
+def _write_stats(stats: Dict[str, float], fmt: str, out: Optional[Path]):
+    f = out.open("w", encoding="utf-8", newline="") if out else sys.stdout
+    try:
+        if fmt == "json":
+            json.dump(stats, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        else:
+            f.write(";".join(stats.keys()) + "\n")
+            f.write(";".join(f"{v:.2f}" if isinstance(v, float) else str(v) for v in stats.values()) + "\n")
+    finally:
+        if out:
+            f.close()
+
+# [END: _write_stats]
+# [FUNC: _write_pivot]
+def _write_pivot(res: Dict[str, Any], fmt: str, out: Optional[Path]):
+    from core.pivot import MEASURES
+    levels = res["levels"]
+    f = out.open("w", encoding="utf-8-sig" if fmt == "csv" else "utf-8", newline="") if out else sys.stdout
+    try:
+        if fmt == "json":
+            data = {"levels": levels, "total": res["total"],
+                    "groups": [{"level": g["level"], "keys": list(g["keys"]), **{m: g[m] for m in MEASURES}}
+                               for g in res["groups"]]}
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+            return
+        # csv: één regel per groep, lege niveaukolommen onder het eigen niveau
+        f.write(";".join(levels + list(MEASURES)) + "\n")
+        for g in res["groups"] + [{"keys": ("Totaal",), **res["total"]}]:
+            keys = list(g["keys"]) + [""] * (len(levels) - len(g["keys"]))
+            vals = [str(g[m]) if m == "count" else f"{g[m]:.2f}" for m in MEASURES]
+            f.write(";".join(keys + vals) + "\n")
+    finally:
+        if out:
+            f.close()
+
+# [END: _write_pivot]
+# [FUNC: _columns]
+def _columns(args, available: List[str]) -> List[str]:
+    if args.columns:
+        return [c.strip() for c in args.columns.split(",") if c.strip()]
+    return [c for c in DEFAULT_COLUMNS if c in available] or available
+
+# [END: _columns]
+# [FUNC: _serve]
+def _serve(rows: List[Dict[str, Any]], host: str, port: int):
+    from core.api import CatalogAPI, serve
+
+    async def run():
+        server = await serve(CatalogAPI(rows), host, port)
+        async with server:
+            await server.serve_forever()
+
+    print(f"Product-API op http://{host}:{port} (Ctrl+C om te stoppen)", file=sys.stderr)
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+# [END: _serve]
+# [FUNC: _replenish]
+def _replenish(args, catalog) -> int:
+    from core.replenish import (
+        DEFAULT_POLICY_PATH, PROPOSAL_COLUMNS, SUMMARY_COLUMNS, ReplenishPlanner, load_policy,
+    )
+    try:
+        policy = load_policy(args.rules or DEFAULT_POLICY_PATH)
+    except (OSError, ValueError) as e:
+        logging.error(f"Regels niet te lezen: {e}")
+        return 2
+    if args.min_stock is not None:
+        policy.default_min = args.min_stock
+    if args.max_stock is not None:
+        policy.default_max = args.max_stock
+    if args.on_hand:
+        policy.use_virtual = False
+    rows = catalog.rows
+    plan = ReplenishPlanner(rows, catalog.route_cols).plan(policy, search_rows(rows, args.needle))
+    out_rows, cols = (plan.summary_rows(), SUMMARY_COLUMNS) if args.summary else (plan.rows(args.supplier), PROPOSAL_COLUMNS)
+    if args.columns:
+        cols = [c.strip() for c in args.columns.split(",") if c.strip()]
+    _write_rows(out_rows, cols, args.format, args.output)
+    t = plan.totals
+    print(f"{int(t['lines'])} bestelregels bij {len(plan.suppliers)} leveranciers, "
+          f"bestelwaarde €{t['value']:.2f} ({plan.ms:.0f} ms)", file=sys.stderr)
+    return 0
+
+# [END: _replenish]
+# [FUNC: _history]
+def _history(args) -> int:
+    from core.history import HistoryStore, HISTORY_DIR
+    store = HistoryStore(args.store or HISTORY_DIR)
+    fields = [f.strip() for f in args.fields.split(",")] if args.fields else None
+    if args.action == "ingest":
+        try:
+            catalog = load_catalog(args.csv, args.xlsx)
+        except Exception as e:
+            logging.error(f"Laden mislukt: {e}")
+            return 2
+        source = args.csv.name if args.csv.exists() else args.xlsx.name
+        n = store.ingest(catalog.rows, args.date, source)
+        print(f"{n} wijzigingen bewaard (snapshot {len(store.snapshots) - 1})", file=sys.stderr)
+        return 0
+    if args.action == "series":
+        if not args.key:
+            logging.error("Geef een productsleutel op voor 'series'.")
+            return 2
+        data: Any = store.series(args.key, fields)
+    else:
+        if not args.since:
+            logging.error("Geef --since op voor 'changed'.")
+            return 2
+        data = store.changed_since(args.since, fields)
+    if args.format == "json":
+        json.dump(data, sys.stdout, ensure_ascii=False, indent=2)
+        sys.stdout.write("\n")
+    elif args.action == "series":
+        cols = ["date"] + (fields or [c for c in (data[0].keys() if data else []) if c != "date"])
+        sys.stdout.write(";".join(cols) + "\n")
+        for e in data:
+            sys.stdout.write(";".join(str(e.get(c, "")) for c in cols) + "\n")
+    else:
+        sys.stdout.write("sleutel;velden\n")
+        for k, flds in data.items():
+            sys.stdout.write(f"{k};{','.join(flds)}\n")
+    return 0
+
+# [END: _history]
+# [FUNC: build_parser]
+def build_parser() -> argparse.ArgumentParser:
+    # gemeenschappelijke opties, bruikbaar na elk subcommando
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--csv", type=Path, default=DEFAULT_CSV, help=f"productexport (standaard {DEFAULT_CSV})")
+    common.add_argument("--xlsx", type=Path, default=DEFAULT_XLSX, help="XLSX-fallback als de CSV ontbreekt")
+    common.add_argument("--format", choices=["csv", "json"], default="csv", help="uitvoerformaat")
+    common.add_argument("-o", "--output", type=Path, help="uitvoerbestand (standaard stdout)")
+    common.add_argument("--columns", help="kommagescheiden kolommen voor rij-uitvoer")
+    common.add_argument("-v", "--verbose", action="store_true", help="laadinformatie tonen op stderr")
+
+    p = argparse.ArgumentParser(prog="cli.py", description="Odoo-productexport zonder GUI verwerken.")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    s = sub.add_parser("search", parents=[common], help="zoek op naam, interne referentie of barcode")
+    s.add_argument("needle")
+    s.add_argument("--low-stock", action="store_true", help="enkel rijen onder de minimumvoorraad")
+    s.add_argument("--min", type=float, default=MIN_STOCK, dest="min_stock")
+
+    s = sub.add_parser("query", parents=[common], help="zoektaal: velden, bereiken, AND/OR/NOT (zie core/query.py)")
+    s.add_argument("expr", help='bv. "voorraad < 5 categorie:Gereedschap prijs>100"')
+    s.add_argument("--explain", action="store_true", help="gekozen plan en tijd per stap op stderr")
+
+    s = sub.add_parser("pivot", parents=[common], help="aantal, voorraad, waarde en marge per groep")
+    s.add_argument("--by", default="Productcategorie",
+                   help="kommagescheiden niveaus: Productcategorie, Productsoort, Route, Leveranciers")
+    s.add_argument("needle", nargs="?", default="", help="optioneel: enkel treffers van deze zoekterm")
+
+    s = sub.add_parser("replenish", parents=[common],
+                       help="bestelvoorstel per leverancier uit min/max-regels (zie core/replenish.py)")
+    s.add_argument("needle", nargs="?", default="", help="optioneel: enkel treffers van deze zoekterm")
+    s.add_argument("--rules", type=Path, default=None, help="min/max per categorie en route (standaard resources/replenish.json)")
+    s.add_argument("--min", type=float, default=None, dest="min_stock", help="standaardminimum (overschrijft --rules)")
+    s.add_argument("--max", type=float, default=None, dest="max_stock", help="standaardmaximum (overschrijft --rules)")
+    s.add_argument("--on-hand", action="store_true", help="enkel aanwezige voorraad, virtuele voorraad negeren")
+    s.add_argument("--supplier", help="enkel de regels van deze leverancier")
+    s.add_argument("--summary", action="store_true", help="één regel per leverancier i.p.v. per product")
+
+    s = sub.add_parser("lowstock", parents=[common], help="producten met aanwezige voorraad onder het minimum")
+    s.add_argument("--min", type=float, default=MIN_STOCK, dest="min_stock")
+
+    s = sub.add_parser("stats", parents=[common], help="aantal, gemiddelde prijs en voorraadwaarde")
+    s.add_argument("needle", nargs="?", default="", help="optioneel: enkel treffers van deze zoekterm")
+
+    s = sub.add_parser("compare", parents=[common], help="vergelijk verkoopprijzen met een tweede export")
+    s.add_argument("other", type=Path)
+    s.add_argument("--changed", action="store_true", help="enkel producten waarvan de prijs wijzigde")
+
+    s = sub.add_parser("convert", parents=[common],
+                       help="opgeschoonde catalogus als Parquet/Arrow wegschrijven (zie core/columnar.py)")
+    s.add_argument("target", type=Path, help="doelbestand: .parquet, .arrow of .feather")
+
+    s = sub.add_parser("serve", parents=[common], help="lokale JSON-API over de catalogus (zie core/api.py)")
+    s.add_argument("--host", default=DEFAULT_HOST)
+    s.add_argument("--port", type=int, default=DEFAULT_PORT)
+
+    s = sub.add_parser("history", parents=[common], help="prijs-/voorraadhistoriek (zie core/history.py)")
+    s.add_argument("action", choices=["ingest", "series", "changed"])
+    s.add_argument("key", nargs="?", help="productsleutel (ID, interne referentie of naam) voor 'series'")
+    s.add_argument("--store", type=Path, default=None, help="map van de historiek (standaard resources/history)")
+    s.add_argument("--date", help="snapshotdatum voor 'ingest' (ISO, standaard nu)")
+    s.add_argument("--since", help="ISO-datum voor 'changed'")
+    s.add_argument("--fields", help="kommagescheiden: price,cost,qty,qty_virtual,present")
+    return p
+
+# [END: build_parser]
+# [FUNC: main]
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+        stream=sys.stderr,
+    )
+    try:
+        rc = _run(args)
+        sys.stdout.flush()
+        return rc
+    except BrokenPipeError:
+        # lezer van stdout is gestopt (bv. `| head -1`): stil stoppen zoals andere Unix-tools;
+        # stdout naar devnull zodat het afsluiten van Python niet opnieuw faalt
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return 1
+
+# [END: main]
+# [FUNC: _run]
+def _run(args) -> int:
+    if args.command == "history":
+        return _history(args)
+    try:
+        catalog = load_catalog(args.csv, args.xlsx)
+    except Exception as e:
+        logging.error(f"Laden mislukt: {e}")
+        return 2
+    rows = catalog.rows
+    available = catalog.available_columns()
+
+    if args.command == "search":
+        rows = search_rows(rows, args.needle)
+        if args.low_stock:
+            rows = low_stock_rows(rows, args.min_stock)
+        _write_rows(rows, _columns(args, available), args.format, args.output)
+    elif args.command == "query":
+        from core.query import QueryIndex, QueryError, run_query
+        try:
+            rows, explain = run_query(QueryIndex(rows, catalog.route_cols), args.expr)
+        except QueryError as e:
+            logging.error(f"Ongeldige zoekopdracht: {e}")
+            return 2
+        if args.explain:
+            print(explain, file=sys.stderr)
+        _write_rows(rows, _columns(args, available), args.format, args.output)
+    elif args.command == "pivot":
+        from core.pivot import PivotEngine
+        levels = [f.strip() for f in args.by.split(",") if f.strip()]
+        try:
+            res = PivotEngine(rows, catalog.route_cols).aggregate(search_rows(rows, args.needle), levels)
+        except ValueError as e:
+            logging.error(str(e))
+            return 2
+        _write_pivot(res, args.format, args.output)
+    elif args.command == "replenish":
+        return _replenish(args, catalog)
+    elif args.command == "lowstock":
+        rows = low_stock_rows(rows, args.min_stock)
+        _write_rows(rows, _columns(args, available), args.format, args.output)
+    elif args.command == "stats":
+        _write_stats(stock_stats(search_rows(rows, args.needle)), args.format, args.output)
+    elif args.command == "compare":
+        try:
+            price_by_key = load_price_map(args.other)
+        except Exception as e:
+            logging.error(f"Fout bij inladen van {args.other}: {e}")
+            return 2
+        new_prices = new_price_column(rows, price_by_key)
+        rows = [r for r in rows if id(r) in new_prices]
+        if args.changed:
+            rows = [r for r in rows if price_delta(r, new_prices)]
+        _write_rows(rows, _columns(args, available) + list(COMPARE_COLS), args.format, args.output, new_prices)
+    elif args.command == "convert":
+        from core.columnar import write_catalog
+        try:
+            n = write_catalog(catalog, args.target)
+        except (RuntimeError, ValueError) as e:
+            logging.error(str(e))
+            return 2
+        print(f"{n} producten weggeschreven naar {args.target}", file=sys.stderr)
+    elif args.command == "serve":
+        _serve(rows, args.host, args.port)
+    return 0
+
+# [END: _run]
+# [SECTION: CLI / Entrypoint]
+if __name__ == "__main__":
+    sys.exit(main())
+# [END: CLI / Entrypoint]
@@ -0,0 +1,290 @@
+# core/api.py
+# Lokale HTTP/JSON-API (asyncio) over de ingeladen productcatalogus.
+# Geen externe dependencies en geen Qt: draait ingebed in het portaal (achtergrondthread)
+# of los via `python cli.py serve`.
+#
+# Endpoints (enkel GET):
+#   /products?q=...&limit=50&offset=0   zoeken op naam/referentie/barcode
+#   /products/sku/<referentie>          één product op interne referentie
+#   /products/barcode/<barcode>         één product op barcode
+#   /lowstock?min=5&limit=&offset=      producten onder de minimumvoorraad
+#   /stats?q=...                        aantal, gemiddelde prijs, voorraadwaarde
+#   /health                             datasetversie en aantal producten
+
+# [SECTION: Imports]
+import asyncio, json, logging, threading, zlib
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+from urllib.parse import urlsplit, parse_qs, unquote
+
+from core.products import MIN_STOCK, search_rows, low_stock_rows, stock_stats
+
+# [END: Imports]
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 1000
+CACHE_SIZE = 2048  # aantal gecachte antwoorden (per datasetversie)
+
+STATUS_TEXT = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found",
+               405: "Method Not Allowed", 500: "Internal Server Error"}
+
+# [FUNC: product_json]
+def product_json(r: Dict[str, Any]) -> Dict[str, Any]:
+    """Vaste projectie van een productrij naar JSON."""
+    return {
+        "id": r.get("_id"),
+        "name": r.get("_name"),
+        "sku": r.get("_sku"),
+        "barcode": r.get("_barcode"),
+        "price": r.get("_price", 0.0),
+        "cost": r.get("_cost", 0.0),
+        "qty": r.get("_qty", 0.0),
+        "qty_virtual": r.get("_qty_virtual", 0.0),
+        "category": r.get("Productcategorie"),
+    }
+
+# [END: product_json]
+# [FUNC: _int_arg]
+def _int_arg(qs: Dict[str, List[str]], name: str, default: int, lo: int = 0, hi: Optional[int] = None) -> int:
+    try:
+        v = int(qs.get(name, [default])[0])
+    except (TypeError, ValueError):
+        raise ValueError(f"ongeldige waarde voor '{name}'")
+    v = max(lo, v)
+    return min(hi, v) if hi is not None else v
+
+# [END: _int_arg]
+# [CLASS: CatalogAPI]
+class CatalogAPI:
+    """
+    Verwerkt requests tegen een vaste set productrijen.
+    - set_rows() vervangt de dataset en verhoogt de versie (ETag + cache volgen de versie)
+    - handle() is synchroon en zonder I/O, dus los testbaar; cached() beantwoordt enkel
+      wat zonder de rijen te doorlopen kan (de server draait de rest buiten de event loop)
+    """
+# [FUNC: __init__]
+    def __init__(self, rows: Optional[List[Dict[str, Any]]] = None):
+        self._lock = threading.Lock()
+        self.version = 0
+        self._cache: "OrderedDict[str, Tuple[int, bytes, str]]" = OrderedDict()
+        self.set_rows(rows or [])
+
+# [END: __init__]
+# [FUNC: set_rows]
+    def set_rows(self, rows: List[Dict[str, Any]]):
+        by_sku: Dict[str, Dict[str, Any]] = {}
+        by_barcode: Dict[str, Dict[str, Any]] = {}
+        for r in rows:
+            sku = str(r.get("_sku") or "").strip()
+            bc = str(r.get("_barcode") or "").strip()
+            if sku:
+                by_sku.setdefault(sku.lower(), r)
+            if bc:
+                by_barcode.setdefault(bc, r)
+        with self._lock:
+            self.version += 1
+            # één tuple zodat een request nooit een half vervangen dataset ziet
+            self._state = (self.version, rows, by_sku, by_barcode)
+            self._cache.clear()
+        logging.info(f"API-dataset versie {self.version}: {len(rows)} producten")
+
+# [END: set_rows]
+# [FUNC: cached]
+    def cached(self, method: str, target: str, if_none_match: Optional[str] = None) -> Optional[Tuple[int, bytes, str]]:
+        """Zoals handle(), maar None bij een cache-miss i.p.v. het antwoord te berekenen."""
+        if method not in ("GET", "HEAD"):
+            return 405, b'{"error": "enkel GET"}', ""
+        with self._lock:
+            cached = self._cache.get(target)
+            if cached is None:
+                return None
+            self._cache.move_to_end(target)
+        return _conditional(cached, if_none_match)
+
+# [END: cached]
+# [FUNC: handle]
+    def handle(self, method: str, target: str, if_none_match: Optional[str] = None) -> Tuple[int, bytes, str]:
+        """Geeft (status, body, etag) terug."""
+        if method not in ("GET", "HEAD"):
+            return 405, b'{"error": "enkel GET"}', ""
+        with self._lock:
+            state = self._state
+            version = state[0]
+            cached = self._cache.get(target)
+            if cached is not None:
+                self._cache.move_to_end(target)
+        if cached is None:
+            try:
+                status, payload = self._route(target, state)
+            except ValueError as e:
+                return 400, json.dumps({"error": str(e)}).encode("utf-8"), ""
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            etag = f'"v{version}-{zlib.crc32(body):08x}"'
+            cached = (status, body, etag)
+            if status == 200:
+                with self._lock:
+                    # alleen bewaren als de dataset intussen niet vervangen is
+                    if version == self.version:
+                        self._cache[target] = cached
+                        if len(self._cache) > CACHE_SIZE:
+                            self._cache.popitem(last=False)
+        return _conditional(cached, if_none_match)
+
+# [END: handle]
+# [FUNC: _route]
+    def _route(self, target: str, state: tuple) -> Tuple[int, Any]:
+        version, rows, by_sku, by_barcode = state
+        parts = urlsplit(target)
+        path = parts.path.rstrip("/") or "/"
+        qs = parse_qs(parts.query)
+
+        if path == "/health":
+            return 200, {"version": version, "count": len(rows)}
+        if path == "/products":
+            found = search_rows(rows, qs.get("q", [""])[0])
+            return 200, self._page(found, qs)
+        if path.startswith("/products/sku/"):
+            r = by_sku.get(unquote(path[len("/products/sku/"):]).strip().lower())
+            return (200, product_json(r)) if r else (404, {"error": "onbekende referentie"})
+        if path.startswith("/products/barcode/"):
+            r = by_barcode.get(unquote(path[len("/products/barcode/"):]).strip())
+            return (200, product_json(r)) if r else (404, {"error": "onbekende barcode"})
+        if path == "/lowstock":
+            try:
+                min_stock = float(qs.get("min", [MIN_STOCK])[0])
+            except ValueError:
+                raise ValueError("ongeldige waarde voor 'min'")
+            return 200, self._page(low_stock_rows(rows, min_stock), qs)
+        if path == "/stats":
+            return 200, stock_stats(search_rows(rows, qs.get("q", [""])[0]))
+        return 404, {"error": f"onbekend pad {path}"}
+
+# [END: _route]
+# [FUNC: _page]
+    def _page(self, rows: List[Dict[str, Any]], qs: Dict[str, List[str]]) -> Dict[str, Any]:
+        limit = _int_arg(qs, "limit", DEFAULT_LIMIT, 1, MAX_LIMIT)
+        offset = _int_arg(qs, "offset", 0)
+        page = rows[offset:offset + limit]
+        return {
+            "total": len(rows), "offset": offset, "limit": limit,
+            "items": [product_json(r) for r in page],
+        }
+
+# [END: _page]
+# [END: CatalogAPI]
+# [FUNC: _conditional]
+def _conditional(cached: Tuple[int, bytes, str], if_none_match: Optional[str]) -> Tuple[int, bytes, str]:
+    """304 als de client deze versie al heeft."""
+    status, body, etag = cached
+    if status == 200 and if_none_match and if_none_match == etag:
+        return 304, b"", etag
+    return status, body, etag
+
+# [END: _conditional]
+# [FUNC: _response]
+def _response(status: int, body: bytes, etag: str, keep_alive: bool, head: bool = False) -> bytes:
+    lines = [
+        f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+        "Content-Type: application/json; charset=utf-8",
+        f"Content-Length: {len(body)}",
+        "Cache-Control: no-cache",
+        "Connection: " + ("keep-alive" if keep_alive else "close"),
+    ]
+    if etag:
+        lines.append(f"ETag: {etag}")
+    head_bytes = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+    return head_bytes if head or status == 304 else head_bytes + body
+
+# [END: _response]
+# [FUNC: _serve_client]
+async def _serve_client(api: CatalogAPI, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            try:
+                method, target, version = request_line.decode("latin-1").split()
+            except ValueError:
+                writer.write(_response(400, b'{"error": "ongeldig request"}', "", False))
+                break
+            headers: Dict[str, str] = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            conn = headers.get("connection", "").lower()
+            keep_alive = conn != "close" if version == "HTTP/1.1" else conn == "keep-alive"
+            inm = headers.get("if-none-match")
+            try:
+                res = api.cached(method, target, inm)
+                if res is None:
+                    # zoeken/statistieken doorlopen alle rijen: niet op de event loop,
+                    # zodat andere verbindingen intussen bediend worden
+                    res = await loop.run_in_executor(None, api.handle, method, target, inm)
+                status, body, etag = res
+            except Exception as e:
+                logging.exception("API-fout")
+                status, body, etag = 500, json.dumps({"error": str(e)}).encode("utf-8"), ""
+            writer.write(_response(status, body, etag, keep_alive, head=(method == "HEAD")))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+# [END: _serve_client]
+# [FUNC: serve]
+async def serve(api: CatalogAPI, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> asyncio.AbstractServer:
+    server = await asyncio.start_server(lambda r, w: _serve_client(api, r, w), host, port)
+    logging.info(f"Product-API luistert op http://{host}:{port}")
+    return server
+
+# [END: serve]
+# [CLASS: ApiThread]
+class ApiThread(threading.Thread):
+    """Draait de API met een eigen event loop naast de GUI-thread."""
+# [FUNC: __init__]
+    def __init__(self, api: CatalogAPI, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+        super().__init__(name="product-api", daemon=True)
+        self.api = api
+        self.host = host
+        self.port = port
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopped: Optional[asyncio.Event] = None
+
+# [END: __init__]
+# [FUNC: run]
+    def run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._main())
+        except OSError as e:
+            logging.error(f"Product-API kon niet starten op poort {self.port}: {e}")
+        finally:
+            self._loop.run_until_complete(self._loop.shutdown_default_executor())
+            self._loop.close()
+
+# [END: run]
+# [FUNC: _main]
+    async def _main(self):
+        self._stopped = asyncio.Event()
+        server = await serve(self.api, self.host, self.port)
+        async with server:
+            await self._stopped.wait()
+
+# [END: _main]
+# [FUNC: stop]
+    def stop(self):
+        if self._loop is not None and self._stopped is not None:
+            self._loop.call_soon_threadsafe(self._stopped.set)
+
+# [END: stop]
+# [END: ApiThread]
@@ -0,0 +1,227 @@
+# core/columnar.py
+# Opgeschoonde, gegroepeerde catalogus als getypeerd kolombestand: Parquet (.parquet) of
+# Arrow IPC (.arrow/.feather). Vereist het optionele pakket 'pyarrow'.
+#
+# Het bestand bevat de rijen zoals Catalog ze kent (originele kolommen, _-velden, Route 1..N)
+# met getallen als float64, plus header_map en route_cols in de schema-metadata. Inlezen
+# slaat dus parsen, normalize_number, clean_rows en group_and_explode_routes over; met
+# columns= worden enkel de gevraagde kolommen van schijf gelezen (projectie).
+
+# [SECTION: Imports]
+import json, logging, time
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Sequence
+
+from core.formatting import COMPARE_COLS, NUMERIC_COLS, NUMERIC_KEYS, NewPrices, normalize_number
+from core.compression import find_export
+from core.products import COLUMNAR_SUFFIXES, Catalog
+
+# [END: Imports]
+PARQUET_SUFFIXES = (".parquet",)
+ARROW_SUFFIXES = (".arrow", ".feather")
+FORMAT_VERSION = "1"
+META_PREFIX = "odoo."
+
+# wat zoeken/prijs/voorraad nodig hebben; wordt bij elke projectie meegelezen
+SEARCH_COLUMNS = ["_id", "_name", "_sku", "_barcode", "_price", "_cost", "_qty", "_qty_virtual"]
+ROUTE_COLUMNS = "Route"  # in columns=: alle Route 1..N-kolommen
+
+# [FUNC: _pyarrow]
+def _pyarrow():
+    try:
+        import pyarrow  # type: ignore
+    except ImportError:
+        raise RuntimeError("pyarrow niet geïnstalleerd. Installeer met 'pip install pyarrow' of gebruik CSV.")
+    return pyarrow
+
+# [END: _pyarrow]
+# [FUNC: columnar_sibling]
+def columnar_sibling(path: Path, path_xlsx: Optional[Path] = None) -> Optional[Path]:
+    """
+    products.parquet/.arrow naast products.csv, als dat niet ouder is dan de export die anders
+    geladen zou worden: de CSV (ook gecomprimeerd, zie find_export), anders path_xlsx.
+    Een vergeten, verouderd kolombestand mag een nieuwere export niet verbergen.
+    """
+    source = find_export(path)
+    if source is None and path_xlsx is not None and path_xlsx.exists():
+        source = path_xlsx
+    for s in COLUMNAR_SUFFIXES:
+        p = path.with_suffix(s)
+        if not p.exists():
+            continue
+        if source is None or p.stat().st_mtime >= source.stat().st_mtime:
+            return p
+        logging.info(f"Kolombestand {p} is ouder dan {source}; de export wordt gelezen")
+    return None
+
+# [END: columnar_sibling]
+# [FUNC: _is_float_col]
+def _is_float_col(col: str, vals: List[Any]) -> bool:
+    """Gekende getalkolommen, of kolommen waarvan de eerste ingevulde waarde al een float is."""
+    if col in NUMERIC_KEYS or col in NUMERIC_COLS or col in COMPARE_COLS:
+        return True
+    first = next((v for v in vals if v is not None and v != ""), None)
+    return isinstance(first, float)
+
+# [END: _is_float_col]
+# [FUNC: rows_to_table]
+def rows_to_table(rows: Sequence[Dict[str, Any]], cols: List[str], metadata: Optional[Dict[str, str]] = None,
+                  values=None):
+    """
+    pyarrow.Table met één kolom per cols: float64 voor getallen, anders string ("" i.p.v. None,
+    zoals na het inlezen van een CSV). values(row, col) bepaalt de celwaarde (standaard row.get).
+    """
+    pa = _pyarrow()
+    get = values or (lambda r, c: r.get(c))
+    arrays, fields = [], []
+    for c in cols:
+        vals = [get(r, c) for r in rows]
+        arr = _to_array(pa, vals, _is_float_col(c, vals))
+        arrays.append(arr)
+        fields.append(pa.field(c, arr.type))
+    meta = {f"{META_PREFIX}{k}".encode(): v.encode() for k, v in (metadata or {}).items()}
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields, metadata=meta or None))
+
+# [END: rows_to_table]
+# [FUNC: _to_array]
+def _to_array(pa, vals: List[Any], is_float: bool):
+    if is_float:
+        return pa.array([None if v is None or v == "" else normalize_number(v) for v in vals], pa.float64())
+    return pa.array(["" if v is None else str(v) for v in vals], pa.string())
+
+# [END: _to_array]
+# [FUNC: write_table]
+def write_table(table, path: Path):
+    """Parquet of Arrow IPC volgens de extensie."""
+    if path.suffix.lower() in PARQUET_SUFFIXES:
+        import pyarrow.parquet as pq  # type: ignore
+        pq.write_table(table, path, compression="zstd")
+    elif path.suffix.lower() in ARROW_SUFFIXES:
+        import pyarrow.feather as feather  # type: ignore
+        # ongecomprimeerd: zo kan het bestand gememory-mapt en zonder kopie gelezen worden
+        feather.write_feather(table, path, compression="uncompressed")
+    else:
+        raise ValueError(f"onbekend kolomformaat: {path.suffix}")
+
+# [END: write_table]
+# [FUNC: write_catalog]
+def write_catalog(catalog: Catalog, path: Path) -> int:
+    """De volledige catalogus (alle kolommen + metadata) wegschrijven; geeft het aantal rijen."""
+    t0 = time.perf_counter()
+    rows = catalog.rows
+    cols: List[str] = []
+    for r in rows[:1]:
+        cols = list(r.keys())
+    meta = {"format_version": FORMAT_VERSION, "header_map": json.dumps(catalog.header_map),
+            "route_cols": json.dumps(catalog.route_cols)}
+    write_table(rows_to_table(rows, cols, meta), path)
+    logging.info(f"Catalogus weggeschreven: {path} rijen={len(rows)} kolommen={len(cols)} "
+                 f"in {time.perf_counter() - t0:.2f}s")
+    return len(rows)
+
+# [END: write_catalog]
+# [FUNC: _read_table]
+def _read_table(path: Path, columns: Optional[List[str]]):
+    _pyarrow()
+    if path.suffix.lower() in PARQUET_SUFFIXES:
+        import pyarrow.parquet as pq  # type: ignore
+        schema = pq.read_schema(path)
+        cols = _project(schema, columns)
+        return pq.read_table(path, columns=cols), schema
+    import pyarrow.feather as feather  # type: ignore
+    import pyarrow.ipc as ipc  # type: ignore
+    with ipc.open_file(path) as reader:
+        schema = reader.schema
+    return feather.read_table(path, columns=_project(schema, columns), memory_map=True), schema
+
+# [END: _read_table]
+# [FUNC: _project]
+def _project(schema, columns: Optional[List[str]]) -> Optional[List[str]]:
+    """Gevraagde kolommen + SEARCH_COLUMNS, in bestandsvolgorde; ontbrekende worden genegeerd."""
+    if columns is None:
+        return None
+    route_cols = json.loads((schema.metadata or {}).get(f"{META_PREFIX}route_cols".encode(), b"[]"))
+    wanted = set(SEARCH_COLUMNS) | set(columns)
+    if ROUTE_COLUMNS in wanted:
+        wanted |= set(route_cols)
+    return [n for n in schema.names if n in wanted]
+
+# [END: _project]
+# [FUNC: read_catalog]
+def read_catalog(path: Path, columns: Optional[List[str]] = None) -> Catalog:
+    """
+    Catalog uit een .parquet/.arrow-bestand. columns=None leest alles; anders enkel die
+    kolommen (plus SEARCH_COLUMNS, en "Route" = alle Route N-kolommen).
+    Een bestand zonder onze metadata (bv. rechtstreeks uit een ETL) wordt zoals een export
+    opgeschoond en gegroepeerd.
+    """
+    t0 = time.perf_counter()
+    table, schema = _read_table(path, columns)
+    meta = schema.metadata or {}
+    names = table.column_names
+    # kolom per kolom naar Python-lijsten (in C), dan rijen zippen
+    rows = [dict(zip(names, vals)) for vals in zip(*(c.to_pylist() for c in table.columns))]
+    if f"{META_PREFIX}format_version".encode() not in meta:
+        from core.products import catalog_from_rows
+        logging.info(f"Kolombestand zonder catalogusmetadata: {path} (opschonen + groeperen)")
+        return catalog_from_rows(rows)
+    header_map = json.loads(meta.get(f"{META_PREFIX}header_map".encode(), b"{}"))
+    route_cols = [c for c in json.loads(meta.get(f"{META_PREFIX}route_cols".encode(), b"[]")) if c in names]
+    logging.info(f"Kolombestand geladen: {path} rijen={len(rows)} kolommen={len(names)}/{len(schema.names)} "
+                 f"in {time.perf_counter() - t0:.2f}s")
+    return Catalog(rows, {k: v for k, v in header_map.items() if v in names}, route_cols)
+
+# [END: read_catalog]
+# [FUNC: _batch_writer]
+def _batch_writer(path: Path, schema):
+    """Schrijver die per record batch aanvult, met dezelfde instellingen als write_table."""
+    if path.suffix.lower() in PARQUET_SUFFIXES:
+        import pyarrow.parquet as pq  # type: ignore
+        return pq.ParquetWriter(path, schema, compression="zstd")
+    if path.suffix.lower() in ARROW_SUFFIXES:
+        import pyarrow.ipc as ipc  # type: ignore
+        # Arrow IPC-bestand = feather v2, ongecomprimeerd (memory-mapbaar)
+        return ipc.new_file(path, schema)
+    raise ValueError(f"onbekend kolomformaat: {path.suffix}")
+
+# [END: _batch_writer]
+# [FUNC: write_rows_columnar]
+def write_rows_columnar(rows: Sequence[Dict[str, Any]], cols: List[str], path: Path,
+                        new_prices: Optional[NewPrices] = None, progress=None, cancelled=None) -> int:
+    """
+    Een weergave (zichtbare kolommen, getypeerd zoals in XLSX) als Parquet/Arrow, per
+    PROGRESS_EVERY rijen als record batch: geheugen volgt de batch, niet de weergave, en
+    afbreken werkt zoals bij CSV (ExportCancelled, geen half bestand).
+    Het kolomtype volgt uit de eerste batch.
+    """
+    from core.export import PROGRESS_EVERY, ExportCancelled, cell_value
+    pa = _pyarrow()
+    total = len(rows)
+    n = 0
+    writer = schema = None
+    try:
+        while n < total or writer is None:
+            chunk = rows[n:n + PROGRESS_EVERY]
+            vals = [[cell_value(r, c, new_prices) for r in chunk] for c in cols]
+            if schema is None:
+                schema = pa.schema([pa.field(c, pa.float64() if _is_float_col(c, v) else pa.string())
+                                    for c, v in zip(cols, vals)])
+                writer = _batch_writer(path, schema)
+            if chunk:
+                arrays = [_to_array(pa, v, f.type == pa.float64()) for v, f in zip(vals, schema)]
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            n += len(chunk)
+            if progress: progress(n, total)
+            if cancelled and cancelled():
+                logging.info(f"{path.suffix[1:].capitalize()}-export afgebroken na {n} rijen")
+                raise ExportCancelled(n)
+    except BaseException:
+        if writer is not None:
+            writer.close()
+        path.unlink(missing_ok=True)  # geen half bestand laten staan
+        raise
+    writer.close()
+    logging.info(f"{path.suffix[1:].capitalize()} geëxporteerd: {path} rijen={n}")
+    return n
+
+# [END: write_rows_columnar]
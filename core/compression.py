@@ -0,0 +1,222 @@
+# core/compression.py
+# Gecomprimeerde exports (.csv.gz, .csv.bz2, .csv.xz en — met 'zstandard' — .csv.zst)
+# rechtstreeks inlezen, zonder eerst een uitgepakt bestand op schijf te zetten.
+#
+# Het uitpakken gebeurt in een achtergrondthread die blokken van CHUNK_BYTES in een
+# begrensde wachtrij zet; de CSV-parser leest daar tegelijk uit (zlib/bz2/lzma/zstd geven
+# de GIL vrij tijdens het uitpakken). Encoding en scheidingsteken worden bepaald op de
+# eerste uitgepakte bytes, zoals read_csv_smart dat op het bestand zelf doet.
+
+# [SECTION: Imports]
+import bz2, csv, gzip, io, logging, lzma, queue, threading, time
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Callable, BinaryIO
+
+# [END: Imports]
+CHUNK_BYTES = 1024 * 1024
+QUEUE_CHUNKS = 8          # max. uitgepakte blokken vooruit (begrenst het geheugen)
+SNIFF_BYTES = 4096
+ENCODINGS = ["utf-8", "cp1252", "latin-1"]
+
+# [FUNC: _open_zstd]
+def _open_zstd(path: Path) -> BinaryIO:
+    try:
+        import zstandard  # type: ignore
+    except ImportError:
+        raise RuntimeError("zstandard niet geïnstalleerd. Installeer met 'pip install zstandard' of gebruik .gz/.xz.")
+    return zstandard.ZstdDecompressor().stream_reader(path.open("rb"), closefd=True)
+
+# [END: _open_zstd]
+# extensie → opener van een binaire, uitgepakte stroom
+COMPRESSORS: Dict[str, Callable[[Path], BinaryIO]] = {
+    ".gz": lambda p: gzip.open(p, "rb"),
+    ".bz2": lambda p: bz2.open(p, "rb"),
+    ".xz": lambda p: lzma.open(p, "rb"),
+    ".zst": _open_zstd,
+}
+
+# [FUNC: zstd_available]
+def zstd_available() -> bool:
+    try:
+        import zstandard  # type: ignore  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+# [END: zstd_available]
+# [FUNC: compression_of]
+def compression_of(path: Path) -> Optional[str]:
+    """".gz"/".bz2"/".xz"/".zst" of None voor een gewoon bestand."""
+    s = path.suffix.lower()
+    return s if s in COMPRESSORS else None
+
+# [END: compression_of]
+# [FUNC: inner_suffix]
+def inner_suffix(path: Path) -> str:
+    """Extensie van de inhoud: products.csv.gz → ".csv", products.xlsx → ".xlsx"."""
+    if compression_of(path):
+        path = path.with_suffix("")
+    return path.suffix.lower()
+
+# [END: inner_suffix]
+# [FUNC: export_stem]
+def export_stem(path: Path) -> str:
+    """Naam zonder extensies: oost.csv.gz → "oost"."""
+    return (path.with_suffix("") if compression_of(path) else path).stem
+
+# [END: export_stem]
+# [FUNC: compressed_suffixes]
+def compressed_suffixes() -> List[str]:
+    """Compressies die hier te openen zijn (.zst enkel met het zstandard-pakket)."""
+    return [s for s in COMPRESSORS if s != ".zst" or zstd_available()]
+
+# [END: compressed_suffixes]
+# [FUNC: find_export]
+def find_export(path: Path) -> Optional[Path]:
+    """path zelf als die bestaat, anders de eerste gecomprimeerde variant (products.csv.gz, ...)."""
+    if path.exists():
+        return path
+    for s in compressed_suffixes():
+        p = path.with_name(path.name + s)
+        if p.exists():
+            return p
+    return None
+
+# [END: find_export]
+# [FUNC: dialog_patterns]
+def dialog_patterns(suffix: str = ".csv") -> str:
+    """Bestandsfilter voor een open-dialoog, bv. "*.csv *.csv.gz *.csv.bz2 *.csv.xz"."""
+    return " ".join([f"*{suffix}"] + [f"*{suffix}{s}" for s in compressed_suffixes()])
+
+# [END: dialog_patterns]
+# [CLASS: PrefetchReader]
+class PrefetchReader(io.RawIOBase):
+    """
+    Leest een (uitpakkende) bronstroom in een achtergrondthread vooruit. readinto() geeft de
+    blokken door in volgorde; een fout in de thread komt bij de lezer terug als exceptie.
+    """
+# [FUNC: __init__]
+    def __init__(self, source: BinaryIO, chunk: int = CHUNK_BYTES, depth: int = QUEUE_CHUNKS):
+        super().__init__()
+        self._source = source
+        self._chunk = chunk
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=depth)
+        self._stop = threading.Event()
+        self._pending = memoryview(b"")
+        self._eof = False
+        self._thread = threading.Thread(target=self._run, name="uitpakken", daemon=True)
+        self._thread.start()
+
+# [END: __init__]
+# [FUNC: _run]
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                block = self._source.read(self._chunk)
+                if not block:
+                    break
+                self._queue.put(block)
+            self._queue.put(None)
+        except BaseException as e:  # doorgeven aan de lezer
+            self._queue.put(e)
+
+# [END: _run]
+# [FUNC: readable]
+    def readable(self) -> bool:
+        return True
+
+# [END: readable]
+# [FUNC: readinto]
+    def readinto(self, b) -> int:
+        if not self._pending:
+            if self._eof:
+                return 0
+            item = self._queue.get()
+            if item is None:
+                self._eof = True
+                return 0
+            if isinstance(item, BaseException):
+                self._eof = True
+                raise item
+            self._pending = memoryview(item)
+        n = min(len(b), len(self._pending))
+        b[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+# [END: readinto]
+# [FUNC: close]
+    def close(self):
+        if not self.closed:
+            self._stop.set()
+            # wachtrij leegmaken zodat een geblokkeerde put() de thread laat eindigen
+            while self._thread.is_alive():
+                try:
+                    self._queue.get(timeout=0.05)
+                except queue.Empty:
+                    pass
+            self._source.close()
+        super().close()
+
+# [END: close]
+# [END: PrefetchReader]
+# [FUNC: open_decompressed]
+def open_decompressed(path: Path, threaded: bool = True) -> io.BufferedReader:
+    """Gebufferde binaire stroom met de uitgepakte inhoud (uitpakken in een thread als threaded)."""
+    comp = compression_of(path)
+    if comp is None:
+        raise ValueError(f"geen gecomprimeerd bestand: {path}")
+    source = COMPRESSORS[comp](path)
+    raw = PrefetchReader(source) if threaded else source
+    return io.BufferedReader(raw, buffer_size=CHUNK_BYTES)
+
+# [END: open_decompressed]
+# [FUNC: sniff_prefix]
+def sniff_prefix(prefix: bytes) -> Dict[str, str]:
+    """{"encoding", "delimiter"} uit de eerste uitgepakte bytes (BOM → utf-8-sig)."""
+    if prefix.startswith(b"\xef\xbb\xbf"):
+        enc_order = ["utf-8-sig"] + ENCODINGS[1:]
+    else:
+        enc_order = ENCODINGS
+    # tot de laatste volledige regel: een afgebroken UTF-8-teken is geen vals alarm
+    sample_bytes = prefix if len(prefix) < SNIFF_BYTES else prefix.rsplit(b"\n", 1)[0]
+    for enc in enc_order:
+        try:
+            sample = sample_bytes.decode(enc)
+            break
+        except UnicodeDecodeError:
+            continue
+    try:
+        delim = csv.Sniffer().sniff(sample, delimiters=[",", ";", "|", "\t"]).delimiter
+    except Exception:
+        delim = ";"
+    return {"encoding": enc, "delimiter": delim}
+
+# [END: sniff_prefix]
+# [FUNC: read_csv_compressed]
+def read_csv_compressed(path: Path, threaded: bool = True) -> List[Dict[str, Any]]:
+    """
+    Zelfde resultaat als read_csv_smart, maar streamend uit een .gz/.bz2/.xz/.zst-bestand.
+    Blijkt de gesnuffelde encoding verderop toch niet te kloppen, dan wordt opnieuw uitgepakt
+    met de volgende (zoals read_csv_smart het bestand opnieuw opent).
+    """
+    t0 = time.perf_counter()
+    f = open_decompressed(path, threaded)
+    sniffed = sniff_prefix(f.peek(SNIFF_BYTES)[:SNIFF_BYTES])
+    delim = sniffed["delimiter"]
+    encodings = [sniffed["encoding"]] + [e for e in ENCODINGS if e != sniffed["encoding"]]
+    for enc in encodings:
+        if f is None:
+            f = open_decompressed(path, threaded)
+        try:
+            with io.TextIOWrapper(f, encoding=enc, newline="") as text:
+                rows = list(csv.DictReader(text, delimiter=delim))
+            logging.info(f"CSV ({compression_of(path)}) geladen met encoding={enc}, delimiter='{delim}', "
+                         f"rijen={len(rows)} in {time.perf_counter() - t0:.2f}s")
+            return rows
+        except UnicodeDecodeError:
+            f = None  # TextIOWrapper heeft de stroom gesloten
+            continue
+    return []  # niet bereikbaar: latin-1 decodeert alles
+
+# [END: read_csv_compressed]
@@ -0,0 +1,147 @@
+# core/export.py
+# Streaming-export van een resultaatset (lijst rijen + kolommen) naar CSV of XLSX
+# (Parquet/Arrow via core/columnar.py: kolomsgewijs, per batch van PROGRESS_EVERY rijen)
+
+# [SECTION: Imports]
+import csv, json, logging
+from pathlib import Path
+from typing import List, Dict, Any, Callable, Optional, Sequence, TextIO
+
+from core.products import COLUMNAR_SUFFIXES
+from core.formatting import format_cell, normalize_number, NUMERIC_COLS, NUMERIC_KEYS, NEW_PRICE_COL, DELTA_COL, price_delta, NewPrices
+
+# [END: Imports]
+# om de hoeveel rijen de voortgang gemeld wordt
+PROGRESS_EVERY = 5000
+
+ProgressFn = Callable[[int, int], None]
+CancelFn = Callable[[], bool]
+
+# [CLASS: ExportCancelled]
+class ExportCancelled(Exception):
+    """De export werd afgebroken via cancelled(); er is geen (half) bestand achtergebleven."""
+# [FUNC: __init__]
+    def __init__(self, rows: int):
+        super().__init__(f"export afgebroken na {rows} rijen")
+        self.rows = rows
+
+# [END: __init__]
+# [END: ExportCancelled]
+
+# [FUNC: cell_value]
+def cell_value(row: Dict[str, Any], col: str, new_prices: Optional[NewPrices] = None):
+    """Getypeerde waarde voor XLSX: getallen als float, de rest als tekst."""
+    if col == NEW_PRICE_COL:
+        return new_prices.get(id(row)) if new_prices else None
+    if col == DELTA_COL:
+        return price_delta(row, new_prices)
+    if col in NUMERIC_KEYS:
+        return float(row.get(col, 0) or 0)
+    if col in NUMERIC_COLS:
+        return normalize_number(row.get(col))
+    val = row.get(col)
+    if isinstance(val, float):
+        return val
+    return format_cell(row, col, new_prices)
+
+# [END: cell_value]
+# [FUNC: write_csv_rows]
+def write_csv_rows(f: TextIO, rows: Sequence[Dict[str, Any]], cols: List[str],
+                   progress: Optional[ProgressFn] = None,
+                   cancelled: Optional[CancelFn] = None, delimiter: str = ";",
+                   new_prices: Optional[NewPrices] = None) -> int:
+    """Schrijft rij per rij naar een open tekststroom (bestand of stdout); ExportCancelled bij afbreken."""
+    total = len(rows)
+    n = 0
+    w = csv.writer(f, delimiter=delimiter)
+    w.writerow(cols)
+    for r in rows:
+        w.writerow([format_cell(r, c, new_prices) for c in cols])
+        n += 1
+        if n % PROGRESS_EVERY == 0:
+            if progress: progress(n, total)
+            if cancelled and cancelled():
+                logging.info(f"CSV-export afgebroken na {n} rijen")
+                raise ExportCancelled(n)
+    if progress: progress(n, total)
+    return n
+
+# [END: write_csv_rows]
+# [FUNC: write_json_rows]
+def write_json_rows(f: TextIO, rows: Sequence[Dict[str, Any]], cols: List[str],
+                    new_prices: Optional[NewPrices] = None) -> int:
+    """JSON-array van objecten, per rij geserialiseerd (geen volledige lijst in RAM)."""
+    n = 0
+    f.write("[")
+    for r in rows:
+        if n:
+            f.write(",\n")
+        f.write(json.dumps({c: cell_value(r, c, new_prices) for c in cols}, ensure_ascii=False))
+        n += 1
+    f.write("]\n")
+    return n
+
+# [END: write_json_rows]
+# [FUNC: write_csv_stream]
+def write_csv_stream(rows: Sequence[Dict[str, Any]], cols: List[str], path: Path,
+                     progress: Optional[ProgressFn] = None,
+                     cancelled: Optional[CancelFn] = None, delimiter: str = ";",
+                     new_prices: Optional[NewPrices] = None) -> int:
+    """Schrijft rij per rij weg; geheugengebruik is onafhankelijk van het aantal rijen."""
+    # utf-8-sig zodat Excel de €/Δ-tekens correct opent
+    try:
+        with path.open("w", encoding="utf-8-sig", newline="") as f:
+            n = write_csv_rows(f, rows, cols, progress, cancelled, delimiter, new_prices)
+    except ExportCancelled:
+        path.unlink(missing_ok=True)  # geen half bestand laten staan
+        raise
+    logging.info(f"CSV geëxporteerd: {path} rijen={n}")
+    return n
+
+# [END: write_csv_stream]
+# [FUNC: write_xlsx_stream]
+def write_xlsx_stream(rows: Sequence[Dict[str, Any]], cols: List[str], path: Path,
+                      progress: Optional[ProgressFn] = None,
+                      cancelled: Optional[CancelFn] = None,
+                      new_prices: Optional[NewPrices] = None) -> int:
+    """openpyxl write-only: rijen gaan direct naar het zip-bestand, niet in een werkblad in RAM."""
+    try:
+        import openpyxl  # type: ignore
+    except ImportError:
+        raise RuntimeError("openpyxl niet geïnstalleerd. Installeer met 'pip install openpyxl' of exporteer naar CSV.")
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Producten")
+    ws.append(cols)
+    total = len(rows)
+    n = 0
+    for r in rows:
+        ws.append([cell_value(r, c, new_prices) for c in cols])
+        n += 1
+        if n % PROGRESS_EVERY == 0:
+            if progress: progress(n, total)
+            if cancelled and cancelled():
+                logging.info(f"XLSX-export afgebroken na {n} rijen")
+                wb.close()
+                raise ExportCancelled(n)
+    wb.save(path)
+    if progress: progress(n, total)
+    logging.info(f"XLSX geëxporteerd: {path} rijen={n}")
+    return n
+
+# [END: write_xlsx_stream]
+# [FUNC: export_rows]
+def export_rows(rows: Sequence[Dict[str, Any]], cols: List[str], path: Path,
+                progress: Optional[ProgressFn] = None,
+                cancelled: Optional[CancelFn] = None, new_prices: Optional[NewPrices] = None) -> int:
+    """
+    Kies de writer op basis van de extensie (.xlsx, .parquet/.arrow, anders CSV).
+    Geeft het aantal rijen; afbreken via cancelled() geeft ExportCancelled, nooit een kortere telling.
+    """
+    if path.suffix.lower() in COLUMNAR_SUFFIXES:
+        from core.columnar import write_rows_columnar
+        return write_rows_columnar(rows, cols, path, new_prices, progress, cancelled)
+    if path.suffix.lower() == ".xlsx":
+        return write_xlsx_stream(rows, cols, path, progress, cancelled, new_prices)
+    return write_csv_stream(rows, cols, path, progress, cancelled, new_prices=new_prices)
+
+# [END: export_rows]
@@ -0,0 +1,152 @@
+# core/facets.py
+# Bitmap-indexen voor facetfilters op kolommen met weinig verschillende waarden:
+# Kan verkocht/gekocht worden, Productsoort, Productcategorie en Route 1..N.
+#
+# Per waarde één bitset als Python-int (bit i = rij i). Facetten combineren is dan
+# bitwise: OR binnen een veld, AND tussen velden, en het aantal per waarde is een
+# int.bit_count() — onafhankelijk van het aantal rijen in Python-lussen.
+
+# [SECTION: Imports]
+import logging, time
+from collections import deque
+from itertools import compress, repeat
+from typing import List, Dict, Any, Iterable, Optional
+
+from core.formatting import BOOL_COLS, format_bool
+
+# [END: Imports]
+ROUTE_FACET = "Route"
+FACET_FIELDS = ["Kan verkocht worden", "Kan gekocht worden", "Productsoort", "Productcategorie", ROUTE_FACET]
+NONE_LABEL = "(geen)"
+BOOL_LABELS = {"✓": "Ja", "✗": "Nee"}
+
+_ONE = ord("1")
+_BITS = bytes.maketrans(b"01", b"\x00\x01")
+
+# [FUNC: _facet_label]
+def _facet_label(field: str, v: Any) -> str:
+    s = str(v or "").strip()
+    if not s:
+        return NONE_LABEL
+    if field in BOOL_COLS:
+        return BOOL_LABELS.get(format_bool(s), s)
+    return s
+
+# [END: _facet_label]
+# [CLASS: BitmapIndex]
+class BitmapIndex:
+    """
+    Bitsets per facetwaarde over één vaste lijst rijen (catalogus of magazijnpartitie).
+    Selecties zijn {veld: {waarden}}; een veld zonder gekozen waarden filtert niet.
+    """
+# [FUNC: __init__]
+    def __init__(self, rows: List[Dict[str, Any]], route_cols: List[str], fields: Optional[List[str]] = None):
+        t0 = time.perf_counter()
+        self.rows = rows
+        self.n = len(rows)
+        self.all = (1 << self.n) - 1
+        self.bitmaps: Dict[str, Dict[str, int]] = {}
+        for field in (fields or FACET_FIELDS):
+            if field == ROUTE_FACET:
+                if not route_cols:
+                    continue
+                cols = route_cols
+            elif rows and field in rows[0]:
+                cols = [field]
+            else:
+                continue
+            maps: Dict[str, int] = {}
+            for c in cols:
+                # eerst per ruwe waarde (weinig verschillende), dan pas naar label
+                buckets: Dict[Any, List[int]] = {}
+                for i, v in enumerate([r.get(c) for r in rows]):
+                    lst = buckets.get(v)
+                    if lst is None:
+                        buckets[v] = [i]
+                    else:
+                        lst.append(i)
+                for v, pos in buckets.items():
+                    lab = _facet_label(field, v)
+                    if lab == NONE_LABEL and field == ROUTE_FACET:
+                        continue  # lege Route N: "(geen)" = geen enkele route, zie hieronder
+                    maps[lab] = maps.get(lab, 0) | self.from_positions(pos)
+            if field == ROUTE_FACET:
+                covered = 0
+                for bm in maps.values():
+                    covered |= bm
+                if covered != self.all:
+                    maps[NONE_LABEL] = self.all & ~covered
+            self.bitmaps[field] = maps
+        logging.info(f"Facet-bitmaps: {sum(len(v) for v in self.bitmaps.values())} waarden over "
+                     f"{len(self.bitmaps)} velden, {self.n} rijen in {time.perf_counter() - t0:.2f}s")
+
+# [END: __init__]
+# [FUNC: from_positions]
+    def from_positions(self, positions: Iterable[int]) -> int:
+        """Oplopende rijposities → bitset (via een '0'/'1'-buffer en int(..., 2): de lus loopt in C)."""
+        if isinstance(positions, range) and positions.step == 1:
+            return ((1 << len(positions)) - 1) << positions.start if len(positions) else 0
+        positions = positions if isinstance(positions, list) else list(positions)
+        if not positions:
+            return 0
+        lo, hi = positions[0], positions[-1]
+        buf = bytearray(b"0") * (hi - lo + 1)
+        deque(map(buf.__setitem__, [p - lo for p in positions] if lo else positions, repeat(_ONE)), maxlen=0)
+        buf.reverse()
+        return int(buf, 2) << lo
+
+# [END: from_positions]
+# [FUNC: rows_of]
+    def rows_of(self, bits: int) -> List[Dict[str, Any]]:
+        """Rijen waarvan de bit aan staat, in de oorspronkelijke volgorde; alles → de lijst zelf."""
+        if bits == self.all:
+            return self.rows
+        if not bits:
+            return []
+        return list(compress(self.rows, self.flags(bits)))
+
+# [END: rows_of]
+# [FUNC: flags]
+    def flags(self, bits: int) -> bytes:
+        """Bitset → één byte (0/1) per rij, zoals het filtermasker van core/pivot.py."""
+        flags = format(bits, "b").encode("ascii")[::-1].translate(_BITS) if bits else b""
+        return flags + bytes(self.n - len(flags))
+
+# [END: flags]
+# [FUNC: values]
+    def values(self, field: str) -> List[str]:
+        """Waarden van een facet, op label gesorteerd met "(geen)" achteraan."""
+        return sorted(self.bitmaps.get(field, {}), key=lambda v: (v == NONE_LABEL, v.lower()))
+
+# [END: values]
+# [FUNC: select]
+    def select(self, selection: Dict[str, Iterable[str]], skip: Optional[str] = None) -> int:
+        """AND over de velden van (OR over de gekozen waarden); skip = veld buiten beschouwing laten."""
+        bits = self.all
+        for field, chosen in selection.items():
+            if field == skip or field not in self.bitmaps:
+                continue
+            maps = self.bitmaps[field]
+            field_bits = 0
+            for v in chosen:
+                field_bits |= maps.get(v, 0)
+            if chosen:
+                bits &= field_bits
+        return bits
+
+# [END: select]
+# [FUNC: counts]
+    def counts(self, selection: Dict[str, Iterable[str]], base: Optional[int] = None) -> Dict[str, Dict[str, int]]:
+        """
+        Aantal per facetwaarde binnen base (bv. het zoekresultaat) en de selectie van de
+        andere velden — wat de gebruiker zou krijgen door die waarde (erbij) aan te vinken.
+        """
+        base = self.all if base is None else base
+        out: Dict[str, Dict[str, int]] = {}
+        for field, maps in self.bitmaps.items():
+            others = base & self.select(selection, skip=field)
+            out[field] = {v: (bm & others).bit_count() for v, bm in maps.items()}
+        return out
+
+# [END: counts]
+# [END: BitmapIndex]
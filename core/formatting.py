@@ -0,0 +1,128 @@
+# core/formatting.py
+# Weergave-laag: zet celwaarden één keer om naar tekst en onthoudt het resultaat
+
+# [SECTION: Imports]
+from typing import List, Dict, Any, Iterable, Mapping, Optional
+
+# [END: Imports]
+BOOL_COLS = ("Kan verkocht worden", "Kan gekocht worden")
+NUMERIC_COLS = ("Verkoopprijs", "Kostprijs", "Aanwezige voorraad", "Virtuele voorraad")
+# interne (al genormaliseerde) getalvelden die als 0.00 getoond worden
+NUMERIC_KEYS = ("_price", "_cost", "_qty", "_qty_virtual")
+# originele getalkolom → het genormaliseerde veld met dezelfde waarde (sorteren zonder de
+# kolomtekst te parsen; bij luie rijen staat enkel het _-veld in RAM)
+NUMERIC_COL_KEYS = dict(zip(NUMERIC_COLS, NUMERIC_KEYS))
+
+NEW_PRICE_COL = "Nieuwe prijs"
+DELTA_COL = "Δ prijs"
+COMPARE_COLS = (NEW_PRICE_COL, DELTA_COL)
+
+# resultaat van een prijsvergelijking: id(rij) → nieuwe prijs. Een aparte kolom naast de
+# rijen (die niet gewijzigd worden), zie core/snapshot.py
+NewPrices = Mapping[int, float]
+
+# [FUNC: normalize_number]
+def normalize_number(val) -> float:
+    if val is None: return 0.0
+    if isinstance(val, (int, float)): return float(val)
+    s = str(val).replace("€","").replace(" ","").replace("\xa0","").replace(",",".").replace("%","")
+    try: return float(s)
+    except: return 0.0
+
+# [END: normalize_number]
+# [FUNC: format_bool]
+def format_bool(v) -> str:
+    s = str(v).strip().lower()
+    if s in {"waar","true","1","yes","ja"}: return "✓"
+    if s in {"onwaar","false","0","no","nee"}: return "✗"
+    return str(v)
+
+# [END: format_bool]
+# [FUNC: price_delta]
+def price_delta(row: Dict[str, Any], new_prices: Optional[NewPrices] = None) -> Optional[float]:
+    """Verschil nieuwe - huidige prijs, of None als er geen vergelijking is."""
+    new_price = new_prices.get(id(row)) if new_prices else None
+    if new_price is None:
+        return None
+    return float(new_price) - float(row.get("_price", 0))
+
+# [END: price_delta]
+# [FUNC: format_cell]
+def format_cell(row: Dict[str, Any], col: str, new_prices: Optional[NewPrices] = None) -> str:
+    """Tekst zoals ze in de tabel verschijnt (zonder caching)."""
+    if col == NEW_PRICE_COL:
+        new_price = new_prices.get(id(row)) if new_prices else None
+        return "" if new_price is None else f"{new_price:.2f}"
+    if col == DELTA_COL:
+        delta = price_delta(row, new_prices)
+        return "" if delta is None else f"{delta:+.2f}"
+    if col in NUMERIC_KEYS:
+        return f"{float(row.get(col, 0) or 0):.2f}"
+    val = row.get(col, "")
+    if col in BOOL_COLS:
+        val = format_bool(val)
+    elif col in NUMERIC_COLS or isinstance(val, float):
+        # float = al genormaliseerd (bv. voorraad per magazijn)
+        val = f"{normalize_number(val):.2f}"
+    return "" if val is None else str(val)
+
+# [END: format_cell]
+# [CLASS: DisplayCache]
+class DisplayCache:
+    """
+    Memo van weergavetekst per (kolom, rij), voor één versie van de dataset.
+    - rijen worden herkend op identiteit; bij herladen hoort er dus een nieuwe cache bij
+    - na een prijsvergelijking geeft fork() een cache die alle andere kolommen deelt
+    """
+# [FUNC: __init__]
+    def __init__(self, new_prices: Optional[NewPrices] = None):
+        self.new_prices = new_prices
+        self._cols: Dict[str, Dict[int, str]] = {}
+
+# [END: __init__]
+# [FUNC: fork]
+    def fork(self, new_prices: Optional[NewPrices]) -> "DisplayCache":
+        """Nieuwe cache met andere vergelijkingsprijzen; de memo's van de overige kolommen
+        worden gedeeld (ze hangen niet van de vergelijking af)."""
+        other = DisplayCache(new_prices)
+        other._cols = {c: memo for c, memo in self._cols.items() if c not in COMPARE_COLS}
+        return other
+
+# [END: fork]
+# [FUNC: text]
+    def text(self, row: Dict[str, Any], col: str) -> str:
+        memo = self._cols.get(col)
+        if memo is None:
+            memo = self._cols[col] = {}
+        key = id(row)
+        s = memo.get(key)
+        if s is None:
+            s = memo[key] = format_cell(row, col, self.new_prices)
+        return s
+
+# [END: text]
+# [FUNC: texts]
+    def texts(self, row: Dict[str, Any], cols: Iterable[str]) -> List[str]:
+        return [self.text(row, c) for c in cols]
+
+# [END: texts]
+# [FUNC: warm]
+    def warm(self, rows: Iterable[Dict[str, Any]], cols: Iterable[str]):
+        """Bereken een set kolommen vooraf (bv. meteen na het laden)."""
+        cols = list(cols)
+        for r in rows:
+            for c in cols:
+                self.text(r, c)
+
+# [END: warm]
+# [FUNC: invalidate]
+    def invalidate(self, cols: Optional[Iterable[str]] = None):
+        """Alles wissen (cols=None) of enkel de opgegeven kolommen."""
+        if cols is None:
+            self._cols.clear()
+            return
+        for c in cols:
+            self._cols.pop(c, None)
+
+# [END: invalidate]
+# [END: DisplayCache]
@@ -0,0 +1,278 @@
+# core/history.py
+# Prijs-/voorraadhistoriek over opeenvolgende exports.
+# Per snapshot worden enkel de gewijzigde velden per product bewaard (met hun nieuwe waarde),
+# kolomsgewijs en append-only op schijf:
+#
+#   keys.txt        productsleutel per regel (regelnummer = sleutel-index)
+#   snapshots.csv   snapshot-id;datum;bron;rijen;eerste wijziging;aantal wijzigingen
+#   chg_snap.bin    uint32  snapshot-id per wijziging
+#   chg_key.bin     uint32  sleutel-index per wijziging
+#   chg_field.bin   uint8   veld (zie FIELDS)
+#   chg_value.bin   float64 nieuwe (absolute) waarde
+#
+# Absolute waarden i.p.v. verschillen: de toestand na openen is exact de laatst geschreven
+# waarde, zodat dezelfde export opnieuw inlezen geen schijnwijzigingen geeft (een som van
+# float-verschillen drijft af). Een oudere historiek met chg_delta.bin wordt bij het openen
+# eenmalig omgezet.
+#
+# Eerst worden de kolommen aangevuld, daarna pas de snapshotregel; bij openen worden
+# kolommen afgekapt tot de laatste volledige snapshot (onderbroken ingest = genegeerd).
+
+# [SECTION: Imports]
+import csv, logging, time
+from array import array
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+from core.products import DATA_DIR, product_key
+
+# [END: Imports]
+HISTORY_DIR = DATA_DIR / "history"
+
+# veld-id → (naam, rijsleutel); "present" = 1 zolang het product in de export zit
+FIELDS: List[Tuple[str, str]] = [
+    ("price", "_price"),
+    ("cost", "_cost"),
+    ("qty", "_qty"),
+    ("qty_virtual", "_qty_virtual"),
+    ("present", ""),
+]
+FIELD_IDS = {name: i for i, (name, _) in enumerate(FIELDS)}
+PRESENT = FIELD_IDS["present"]
+
+_COLUMNS = (("chg_snap.bin", "I"), ("chg_key.bin", "I"), ("chg_field.bin", "B"), ("chg_value.bin", "d"))
+LEGACY_DELTA = "chg_delta.bin"
+
+# [FUNC: _read_array]
+def _read_array(path: Path, typecode: str, count: int) -> array:
+    a = array(typecode)
+    if path.exists() and count:
+        with path.open("rb") as f:
+            a.fromfile(f, count)
+    return a
+
+# [END: _read_array]
+# [CLASS: HistoryStore]
+class HistoryStore:
+    """Append-only historiek; volledig in RAM na openen (enkel wijzigingen, dus klein)."""
+# [FUNC: __init__]
+    def __init__(self, root: Path = HISTORY_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.keys: List[str] = []
+        self._key_idx: Dict[str, int] = {}
+        self.snapshots: List[Dict[str, Any]] = []
+        self._state: Dict[int, List[float]] = {}   # sleutel-index → huidige waarde per veld
+        self._by_key: Optional[Dict[int, List[int]]] = None  # sleutel → posities (lui)
+        self._load()
+
+# [END: __init__]
+# [FUNC: _load]
+    def _load(self):
+        self._migrate_deltas()
+        kpath = self.root / "keys.txt"
+        if kpath.exists():
+            self.keys = kpath.read_text(encoding="utf-8").split("\n")[:-1]
+        self._key_idx = {k: i for i, k in enumerate(self.keys)}
+
+        spath = self.root / "snapshots.csv"
+        if spath.exists():
+            with spath.open("r", encoding="utf-8", newline="") as f:
+                for rec in csv.reader(f, delimiter=";"):
+                    if len(rec) != 6:
+                        continue  # afgebroken regel
+                    sid, date, source, nrows, start, count = rec
+                    self.snapshots.append({
+                        "id": int(sid), "date": date, "source": source,
+                        "rows": int(nrows), "start": int(start), "count": int(count),
+                    })
+        total = (self.snapshots[-1]["start"] + self.snapshots[-1]["count"]) if self.snapshots else 0
+
+        cols = [_read_array(self.root / name, tc, 0) for name, tc in _COLUMNS]
+        for i, (name, tc) in enumerate(_COLUMNS):
+            path = self.root / name
+            size = path.stat().st_size if path.exists() else 0
+            n = size // cols[i].itemsize
+            if n > total:
+                # onvolledige ingest na de laatste snapshot: afkappen
+                logging.warning(f"Historiek: {name} afgekapt van {n} naar {total} wijzigingen")
+                with path.open("r+b") as f:
+                    f.truncate(total * cols[i].itemsize)
+            cols[i] = _read_array(path, tc, min(n, total))
+        self.chg_snap, self.chg_key, self.chg_field, self.chg_value = cols
+
+        # huidige toestand = laatste waarde per veld
+        state = self._state
+        nf = len(FIELDS)
+        for k, fld, v in zip(self.chg_key, self.chg_field, self.chg_value):
+            st = state.get(k)
+            if st is None:
+                st = state[k] = [0.0] * nf
+            st[fld] = v
+        logging.info(f"Historiek geladen: {len(self.snapshots)} snapshots, {len(self.chg_key)} wijzigingen")
+
+# [END: _load]
+# [FUNC: _migrate_deltas]
+    def _migrate_deltas(self):
+        """Oud formaat (chg_delta.bin, verschillen) → chg_value.bin; het oude bestand blijft staan."""
+        old, new = self.root / LEGACY_DELTA, self.root / "chg_value.bin"
+        if not old.exists() or new.exists():
+            return
+        keys, fields = self.root / "chg_key.bin", self.root / "chg_field.bin"
+        n = min(old.stat().st_size // 8, keys.stat().st_size // 4 if keys.exists() else 0,
+                fields.stat().st_size if fields.exists() else 0)
+        deltas = _read_array(old, "d", n)
+        running: Dict[Tuple[int, int], float] = {}
+        values = array("d")
+        for k, fld, d in zip(_read_array(keys, "I", n), _read_array(fields, "B", n), deltas):
+            # afronden: de opgetelde verschillen zijn al afgedreven, bewaarde waarden hebben ≤ 6 decimalen
+            v = running[(k, fld)] = round(running.get((k, fld), 0.0) + d, 6)
+            values.append(v)
+        tmp = new.with_suffix(".tmp")
+        with tmp.open("wb") as f:
+            values.tofile(f)
+        tmp.replace(new)
+        logging.info(f"Historiek: {n} wijzigingen omgezet van {LEGACY_DELTA} naar {new.name}")
+
+# [END: _migrate_deltas]
+# [FUNC: ingest]
+    def ingest(self, rows: List[Dict[str, Any]], date: Optional[str] = None, source: str = "") -> int:
+        """Voeg een opgeschoonde export toe; schrijft enkel gewijzigde velden. Geeft het aantal wijzigingen."""
+        t0 = time.perf_counter()
+        date = date or datetime.now().isoformat(timespec="seconds")
+        if self.snapshots and date < self.snapshots[-1]["date"]:
+            raise ValueError(f"Snapshotdatum {date} ligt vóór de laatste snapshot ({self.snapshots[-1]['date']}).")
+        sid = len(self.snapshots)
+        nf = len(FIELDS)
+        row_fields = [(i, rk) for i, (_, rk) in enumerate(FIELDS) if rk]
+
+        new_keys: List[str] = []
+        c_key, c_field, c_value = array("I"), array("B"), array("d")
+        state, key_idx = self._state, self._key_idx
+        seen = set()
+        for r in rows:
+            k = product_key(r)
+            if not k or k in seen:
+                continue
+            seen.add(k)
+            idx = key_idx.get(k)
+            if idx is None:
+                idx = key_idx[k] = len(self.keys) + len(new_keys)
+                new_keys.append(k)
+            st = state.get(idx)
+            if st is None:
+                st = state[idx] = [0.0] * nf
+            for fi, rk in row_fields:
+                v = float(r.get(rk, 0) or 0)
+                if v != st[fi]:
+                    c_key.append(idx); c_field.append(fi); c_value.append(v)
+                    st[fi] = v
+            if st[PRESENT] != 1.0:
+                c_key.append(idx); c_field.append(PRESENT); c_value.append(1.0)
+                st[PRESENT] = 1.0
+
+        # producten die uit de export verdwenen zijn
+        for k, idx in key_idx.items():
+            if k not in seen:
+                st = state.get(idx)
+                if st is not None and st[PRESENT] == 1.0:
+                    c_key.append(idx); c_field.append(PRESENT); c_value.append(0.0)
+                    st[PRESENT] = 0.0
+
+        count = len(c_key)
+        c_snap = array("I", [sid]) * count
+        start = len(self.chg_key)
+        if new_keys:
+            with (self.root / "keys.txt").open("a", encoding="utf-8") as f:
+                f.write("\n".join(new_keys) + "\n")
+            self.keys.extend(new_keys)
+        for (name, _), col in zip(_COLUMNS, (c_snap, c_key, c_field, c_value)):
+            with (self.root / name).open("ab") as f:
+                col.tofile(f)
+        snap = {"id": sid, "date": date, "source": source, "rows": len(seen), "start": start, "count": count}
+        with (self.root / "snapshots.csv").open("a", encoding="utf-8", newline="") as f:
+            csv.writer(f, delimiter=";").writerow([sid, date, source, len(seen), start, count])
+
+        self.snapshots.append(snap)
+        self.chg_snap.extend(c_snap); self.chg_key.extend(c_key)
+        self.chg_field.extend(c_field); self.chg_value.extend(c_value)
+        self._by_key = None
+        logging.info(f"Historiek: snapshot {sid} ({date}) rijen={len(seen)} wijzigingen={count} "
+                     f"in {time.perf_counter() - t0:.2f}s")
+        return count
+
+# [END: ingest]
+# [FUNC: _positions]
+    def _positions(self, idx: int) -> List[int]:
+        if self._by_key is None:
+            by_key: Dict[int, List[int]] = {}
+            for pos, k in enumerate(self.chg_key):
+                lst = by_key.get(k)
+                if lst is None:
+                    by_key[k] = [pos]
+                else:
+                    lst.append(pos)
+            self._by_key = by_key
+        return self._by_key.get(idx, [])
+
+# [END: _positions]
+# [FUNC: series]
+    def series(self, key: str, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Tijdreeks van één product: per snapshot waarin iets wijzigde de datum en
+        de volledige waarden van de gevraagde velden op dat moment.
+        """
+        idx = self._key_idx.get(key)
+        if idx is None:
+            return []
+        wanted = [FIELD_IDS[f] for f in (fields or [n for n, _ in FIELDS])]
+        vals = [0.0] * len(FIELDS)
+        out: List[Dict[str, Any]] = []
+        last_sid = -1
+        for pos in self._positions(idx):
+            sid = self.chg_snap[pos]
+            fld = self.chg_field[pos]
+            vals[fld] = self.chg_value[pos]
+            if fld not in wanted:
+                continue
+            entry = {"date": self.snapshots[sid]["date"]}
+            if sid == last_sid:
+                out.pop()
+            entry.update({FIELDS[f][0]: round(vals[f], 6) for f in wanted})
+            out.append(entry)
+            last_sid = sid
+        return out
+
+# [END: series]
+# [FUNC: changed_since]
+    def changed_since(self, since: str, fields: Optional[List[str]] = None) -> Dict[str, List[str]]:
+        """Productsleutel → gewijzigde velden in snapshots met datum > since."""
+        first = next((s for s in self.snapshots if s["date"] > since), None)
+        if first is None:
+            return {}
+        wanted = set(FIELD_IDS[f] for f in (fields or [n for n, _ in FIELDS]))
+        out: Dict[str, List[str]] = {}
+        # snapshots zijn chronologisch → de wijzigingen vormen één aaneengesloten blok
+        for pos in range(first["start"], len(self.chg_key)):
+            fld = self.chg_field[pos]
+            if fld not in wanted:
+                continue
+            names = out.setdefault(self.keys[self.chg_key[pos]], [])
+            name = FIELDS[fld][0]
+            if name not in names:
+                names.append(name)
+        return out
+
+# [END: changed_since]
+# [FUNC: current]
+    def current(self, key: str) -> Optional[Dict[str, float]]:
+        """Laatst gekende waarden van een product."""
+        idx = self._key_idx.get(key)
+        st = self._state.get(idx) if idx is not None else None
+        if st is None:
+            return None
+        return {name: round(st[i], 6) for i, (name, _) in enumerate(FIELDS)}
+
+# [END: current]
+# [END: HistoryStore]
@@ -0,0 +1,301 @@
+# core/lazycsv.py
+# Luie CSV-modus voor grote exports: het bestand wordt gememory-mapt, enkel een
+# offset-index van recordstarts + de sleutel-/zoek-/getalkolommen blijven in RAM.
+# Ook de kolommen met weinig verschillende waarden waarop gegroepeerd wordt (facetten,
+# draaitabel, bestelvoorstel) blijven in RAM, als gedeelde str-objecten. Overige kolommen
+# (Verantwoordelijke, Barcode-omschrijvingen, ...) worden pas gedecodeerd als een rij
+# effectief getoond/geëxporteerd wordt, met een LRU van gedecodeerde rijen.
+
+# [SECTION: Imports]
+import csv, io, logging, mmap, threading, time
+from array import array
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple, Iterator
+
+from core.formatting import normalize_number
+
+# [END: Imports]
+LRU_ROWS = 4096  # aantal volledig gedecodeerde rijen in cache
+
+# rijsleutel → kernveld uit PREF_COLS; deze kolommen blijven altijd in RAM
+# ("_id_raw" = de ID-kolom zelf; _id wordt er zoals in clean_rows van afgeleid)
+RESIDENT_TEXT = {"_id_raw": "id", "_name": "name", "_sku": "default_code", "_barcode": "barcode"}
+RESIDENT_NUM = {"_price": "list_price", "_cost": "standard_price",
+                "_qty": "qty_available", "_qty_virtual": "virtual_available"}
+# originele kolommen die over alle rijen heen gelezen worden (facet-bitmaps bij elke lading,
+# groeperingen); anders zou dat elk record via de LRU decoderen
+RESIDENT_COLS = ["Kan verkocht worden", "Kan gekocht worden", "Productsoort", "Productcategorie", "Leveranciers"]
+
+# [FUNC: _sniff]
+def _sniff(mm: mmap.mmap) -> Tuple[str, str, int]:
+    """(encoding, delimiter, start-offset na BOM) uit de eerste 4 KB, zoals read_csv_smart."""
+    head = mm[:4096]
+    start = 3 if head.startswith(b"\xef\xbb\xbf") else 0
+    # tot de laatste volledige regel, zodat een afgebroken UTF-8-teken geen vals alarm geeft
+    sample_bytes = head[start:] if len(head) < 4096 else head[start:].rsplit(b"\n", 1)[0]
+    try:
+        enc, sample = "utf-8", sample_bytes.decode("utf-8")
+    except UnicodeDecodeError:
+        enc, sample = "cp1252", sample_bytes.decode("cp1252", errors="replace")
+    try:
+        delim = csv.Sniffer().sniff(sample, delimiters=[",",";","|","\t"]).delimiter
+    except Exception:
+        delim = ";"
+    return enc, delim, start
+
+# [END: _sniff]
+# [CLASS: TextColumn]
+class TextColumn:
+    """Tekstkolom als één UTF-8-buffer + eindposities: ~1 byte per teken i.p.v. een str-object per cel."""
+    __slots__ = ("_buf", "_off")
+
+# [FUNC: __init__]
+    def __init__(self):
+        self._buf = bytearray()
+        self._off = array("Q", [0])
+
+# [END: __init__]
+# [FUNC: append]
+    def append(self, s: str):
+        self._buf += s.encode("utf-8")
+        self._off.append(len(self._buf))
+
+# [END: append]
+# [FUNC: __getitem__]
+    def __getitem__(self, i: int) -> str:
+        return self._buf[self._off[i]:self._off[i + 1]].decode("utf-8")
+
+# [END: __getitem__]
+# [FUNC: __len__]
+    def __len__(self) -> int:
+        return len(self._off) - 1
+
+# [END: __len__]
+# [END: TextColumn]
+# [CLASS: LazyCsv]
+class LazyCsv:
+    """
+    Offset-index over een CSV-bestand.
+    - offsets[i] = byte-positie van record i (header niet meegeteld), plus een eindpositie
+    - resident[sleutel] = waarden van de gevraagde kolommen (tekst als TextColumn, getallen als
+      array('d'), extra_cols als list met gedeelde str-objecten);
+      text_cols/num_cols geven per sleutel de kandidaat-kolomnamen (eerste aanwezige telt)
+    - row(i) decodeert één record volledig (LRU)
+    """
+# [FUNC: __init__]
+    def __init__(self, path: Path, text_cols: Dict[str, List[str]], num_cols: Dict[str, List[str]],
+                 extra_cols: Optional[List[str]] = None, lru_size: int = LRU_ROWS):
+        t0 = time.perf_counter()
+        self.path = Path(path)
+        self._f = self.path.open("rb")
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ) if self.path.stat().st_size else None
+        self._lru: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._lru_size = lru_size
+        self._lock = threading.Lock()  # GUI-thread en export-worker delen de LRU
+        self.header: List[str] = []
+        self.offsets = array("Q")
+        self.resident: Dict[str, Any] = {}
+        if self._mm is None:
+            self.encoding, self.delimiter = "utf-8", ";"
+            return
+        self.encoding, self.delimiter, start = _sniff(self._mm)
+        try:
+            self._build(start, text_cols, num_cols, extra_cols or [])
+        except UnicodeDecodeError:
+            logging.warning(f"Luie CSV: {self.path} is geen geldige UTF-8, opnieuw met cp1252")
+            self.encoding = "cp1252"
+            self._build(start, text_cols, num_cols, extra_cols or [])
+        logging.info(f"Luie CSV geïndexeerd: {self.path} encoding={self.encoding}, delimiter='{self.delimiter}', "
+                     f"rijen={len(self)} in {time.perf_counter() - t0:.2f}s")
+
+# [END: __init__]
+# [FUNC: _lines]
+    def _lines(self, start: int, pos: List[int]) -> Iterator[str]:
+        """Regels vanaf start; pos[0] volgt de byte-positie na de laatst gelezen regel."""
+        mm, enc = self._mm, self.encoding
+        mm.seek(start)
+        pos[0] = start
+        readline = mm.readline
+        while True:
+            line = readline()
+            if not line:
+                return
+            pos[0] += len(line)
+            yield line.decode(enc)
+
+# [END: _lines]
+# [FUNC: _build]
+    def _build(self, start: int, text_cols: Dict[str, List[str]], num_cols: Dict[str, List[str]], extra_cols: List[str]):
+        pos = [start]
+        reader = csv.reader(self._lines(start, pos), delimiter=self.delimiter)
+        self.header = next(reader, [])
+        hidx = {h: i for i, h in enumerate(self.header)}
+
+        def col_pos(cands: List[str]) -> int:
+            return next((hidx[c] for c in cands if c in hidx), -1)
+
+        # resident-kolom → positie in het record (kolommen die ontbreken blijven leeg)
+        text_pos = [(k, col_pos(c)) for k, c in text_cols.items()]
+        num_pos = [(k, col_pos(c)) for k, c in num_cols.items()]
+        extra_pos = [(c, hidx.get(c, -1)) for c in extra_cols]
+        texts: Dict[str, Any] = {k: TextColumn() for k, _ in text_pos}
+        texts.update({k: [] for k, _ in extra_pos})
+        nums = {k: array("d") for k, _ in num_pos}
+        interned: Dict[str, str] = {}
+
+        offsets = array("Q")
+        while True:
+            rec_start = pos[0]  # de csv-reader leest niet vooruit
+            rec = next(reader, None)
+            if rec is None:
+                break
+            if not rec:
+                continue  # lege regel, zoals DictReader
+            offsets.append(rec_start)
+            n = len(rec)
+            for k, i in text_pos:
+                texts[k].append(rec[i] if 0 <= i < n else "")
+            for k, i in extra_pos:
+                v = rec[i] if 0 <= i < n else ""
+                # extra kolommen (bv. Routes) hebben weinig verschillende waarden
+                texts[k].append(interned.setdefault(v, v))
+            for k, i in num_pos:
+                nums[k].append(normalize_number(rec[i]) if 0 <= i < n else 0.0)
+        offsets.append(pos[0])
+        self.offsets = offsets
+        self.resident = {**texts, **nums}
+
+# [END: _build]
+# [FUNC: __len__]
+    def __len__(self) -> int:
+        return max(0, len(self.offsets) - 1)
+
+# [END: __len__]
+# [FUNC: row]
+    def row(self, i: int) -> Dict[str, Any]:
+        """Volledig record i als dict (header → waarde), via de LRU."""
+        with self._lock:
+            rec = self._lru.get(i)
+            if rec is not None:
+                self._lru.move_to_end(i)
+                return rec
+        raw = self._mm[self.offsets[i]:self.offsets[i + 1]].decode(self.encoding, errors="replace")
+        vals = next(csv.reader(io.StringIO(raw, newline=""), delimiter=self.delimiter), [])
+        rec = {h: (vals[j] if j < len(vals) else None) for j, h in enumerate(self.header)}
+        with self._lock:
+            self._lru[i] = rec
+            if len(self._lru) > self._lru_size:
+                self._lru.popitem(last=False)
+        return rec
+
+# [END: row]
+# [FUNC: close]
+    def close(self):
+        self._lru.clear()
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._f.close()
+
+# [END: close]
+# [END: LazyCsv]
+# [CLASS: LazyRow]
+class LazyRow(MutableMapping):
+    """
+    Productrij bovenop een LazyCsv-record. Gedraagt zich als de dict-rijen uit clean_rows +
+    group_and_explode_routes: _-velden, RESIDENT_COLS en Route 1..N komen uit RAM, de overige
+    originele kolommen worden pas bij opvragen gedecodeerd. Schrijven gaat naar een overlay.
+    """
+    __slots__ = ("_src", "_i", "_routes", "_overlay")
+
+# [FUNC: __init__]
+    def __init__(self, src: "LazyCatalogSource", i: int, routes: Tuple[str, ...] = ()):
+        self._src = src
+        self._i = i
+        self._routes = routes
+        self._overlay: Optional[Dict[str, Any]] = None
+
+# [END: __init__]
+# [FUNC: __getitem__]
+    def __getitem__(self, key: str) -> Any:
+        ov = self._overlay
+        if ov is not None and key in ov:
+            return ov[key]
+        src = self._src
+        col = src.resident.get(key)
+        if col is not None:
+            return col[self._i]
+        if key == "_id":
+            return src.row_id(self._i)
+        if key in src.route_index:
+            n = src.route_index[key]
+            return self._routes[n] if n < len(self._routes) else ""
+        if key in src.base_cols:
+            return src.csv.row(self._i).get(key)
+        raise KeyError(key)
+
+# [END: __getitem__]
+# [FUNC: __setitem__]
+    def __setitem__(self, key: str, value: Any):
+        if self._overlay is None:
+            self._overlay = {}
+        self._overlay[key] = value
+
+# [END: __setitem__]
+# [FUNC: __delitem__]
+    def __delitem__(self, key: str):
+        if self._overlay is None or key not in self._overlay:
+            raise KeyError(key)
+        del self._overlay[key]
+
+# [END: __delitem__]
+# [FUNC: __contains__]
+    def __contains__(self, key) -> bool:
+        src = self._src
+        return (key in src.key_set
+                or (self._overlay is not None and key in self._overlay))
+
+# [END: __contains__]
+# [FUNC: __iter__]
+    def __iter__(self):
+        yield from self._src.keys
+        if self._overlay:
+            for k in self._overlay:
+                if k not in self._src.key_set:
+                    yield k
+
+# [END: __iter__]
+# [FUNC: __len__]
+    def __len__(self) -> int:
+        extra = sum(1 for k in self._overlay if k not in self._src.key_set) if self._overlay else 0
+        return len(self._src.keys) + extra
+
+# [END: __len__]
+# [END: LazyRow]
+# [CLASS: LazyCatalogSource]
+class LazyCatalogSource:
+    """Gedeelde toestand van alle LazyRow's van één bestand."""
+# [FUNC: __init__]
+    def __init__(self, lazy: LazyCsv, routes_col: Optional[str], route_cols: List[str]):
+        self.csv = lazy
+        self.resident = {k: v for k, v in lazy.resident.items() if k.startswith("_") and k != "_id_raw"}
+        self.resident.update({c: lazy.resident[c] for c in RESIDENT_COLS
+                              if c in lazy.resident and c in lazy.header and c != routes_col})
+        self._id_raw = lazy.resident.get("_id_raw")
+        self.route_index = {c: i for i, c in enumerate(route_cols)}
+        self.base_cols = set(h for h in lazy.header if h != routes_col)
+        self.keys = [h for h in lazy.header if h != routes_col] + route_cols + [
+            "_id", "_name", "_sku", "_barcode", "_price", "_cost", "_qty", "_qty_virtual"]
+        self.key_set = set(self.keys)
+
+# [END: __init__]
+# [FUNC: row_id]
+    def row_id(self, i: int) -> str:
+        """_id zoals clean_rows: ID, anders interne referentie, anders naam."""
+        return ((self._id_raw[i] if self._id_raw else "")
+                or self.resident["_sku"][i] or self.resident["_name"][i])
+
+# [END: row_id]
+# [END: LazyCatalogSource]
@@ -0,0 +1,184 @@
+# core/partitions.py
+# Meerdere exports (één per magazijn/bedrijf) als partities van één productcatalogus.
+# Elk bestand wordt in een eigen worker geladen; daarna worden de rijen samengevoegd per
+# productsleutel (zoals group_and_explode_routes) met voorraad per partitie + totalen.
+#
+# Bestanden: resources/magazijnen/<naam>.csv|.xlsx|.csv.gz|.parquet|... → partitie "<naam>"
+
+# [SECTION: Imports]
+import logging, time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+from core.compression import compression_of, export_stem, inner_suffix
+from core.products import (
+    COLUMNAR_SUFFIXES, DATA_DIR, DEFAULT_CSV, DEFAULT_XLSX, Catalog, load_catalog, load_catalog_file, product_key,
+)
+
+# [END: Imports]
+WAREHOUSE_DIR = DATA_DIR / "magazijnen"
+WAREHOUSE_SUFFIXES = (".csv", ".xlsx") + COLUMNAR_SUFFIXES
+ALL = ""  # sleutel voor "alle partities" in totals/rows_for
+
+# [FUNC: stock_col]
+def stock_col(name: str) -> str:
+    """Kolom met de aanwezige voorraad van één partitie (float)."""
+    return f"Voorraad {name}"
+
+# [END: stock_col]
+# [FUNC: find_partitions]
+def find_partitions(folder: Path = WAREHOUSE_DIR) -> Dict[str, Path]:
+    """Partitienaam → bestand; bij meerdere met dezelfde naam wint een kolombestand (.parquet/.arrow),
+    dan csv, dan gecomprimeerde csv, dan xlsx."""
+    if not folder.is_dir():
+        return {}
+    rank = lambda p: (p.suffix.lower() not in COLUMNAR_SUFFIXES, inner_suffix(p) != ".csv",
+                      compression_of(p) is not None)
+    found: Dict[str, Path] = {}
+    for p in sorted(folder.iterdir()):
+        if inner_suffix(p) in WAREHOUSE_SUFFIXES and p.is_file():
+            name = export_stem(p)
+            if name not in found or rank(p) < rank(found[name]):
+                found[name] = p
+    return found
+
+# [END: find_partitions]
+# [CLASS: PartitionedCatalog]
+class PartitionedCatalog(Catalog):
+    """
+    Catalog met één rij per product over alle partities heen.
+    - rows[i]["_qty"] / ["_qty_virtual"] = totaal over alle partities
+    - rows[i][stock_col(naam)] = aanwezige voorraad in die partitie
+    - qty[naam] / qty_virtual[naam] = dezelfde cijfers kolomsgewijs (array, uitgelijnd op rows)
+    - members[naam] = rijen die in die partitie voorkomen (vooraf berekend → wisselen is gratis)
+    - totals[naam] / totals[ALL] = aantal, voorraad en voorraadwaarde, vooraf berekend
+    """
+# [FUNC: __init__]
+    def __init__(self, rows: List[Dict[str, Any]], header_map: Dict[str, str], route_cols: List[str],
+                 partitions: List[str]):
+        super().__init__(rows, header_map, route_cols)
+        self.partitions = partitions
+        self.qty: Dict[str, array] = {}
+        self.qty_virtual: Dict[str, array] = {}
+        self.members: Dict[str, List[Dict[str, Any]]] = {}
+        self.totals: Dict[str, Dict[str, float]] = {}
+
+# [END: __init__]
+# [FUNC: rows_for]
+    def rows_for(self, name: str = ALL) -> List[Dict[str, Any]]:
+        return self.rows if name == ALL else self.members.get(name, [])
+
+# [END: rows_for]
+# [FUNC: qty_key]
+    def qty_key(self, name: str = ALL) -> str:
+        """Rijsleutel met de aanwezige voorraad voor deze selectie."""
+        return "_qty" if name == ALL else stock_col(name)
+
+# [END: qty_key]
+# [FUNC: available_columns]
+    def available_columns(self) -> List[str]:
+        cols = super().available_columns()
+        return cols + [stock_col(n) for n in self.partitions if stock_col(n) not in cols]
+
+# [END: available_columns]
+# [END: PartitionedCatalog]
+# [FUNC: load_partitions]
+def load_partitions(files: Dict[str, Path], max_workers: Optional[int] = None,
+                    columns: Optional[List[str]] = None) -> PartitionedCatalog:
+    """Laad elke partitie in een eigen thread en voeg samen per productsleutel.
+    columns = projectie voor partities die als kolombestand aangeleverd worden."""
+    t0 = time.perf_counter()
+    names = list(files)
+    with ThreadPoolExecutor(max_workers=max_workers or max(1, len(names)),
+                            thread_name_prefix="partitie") as pool:
+        catalogs = list(pool.map(lambda n: load_catalog_file(files[n], columns=columns), names))
+    for n, c in zip(names, catalogs):
+        logging.info(f"Partitie '{n}': {len(c.rows)} producten")
+
+    route_cols = max((c.route_cols for c in catalogs), key=len, default=[])
+    header_map = next((c.header_map for c in catalogs if c.header_map), {})
+
+    # samenvoegen: eerste partitie waarin een product voorkomt levert de basisrij
+    index: Dict[str, int] = {}
+    rows: List[Dict[str, Any]] = []
+    part_qty: Dict[str, Dict[int, float]] = {}
+    part_vqty: Dict[str, Dict[int, float]] = {}
+    members: Dict[str, List[int]] = {}
+    for n, c in zip(names, catalogs):
+        q, vq, mem = part_qty.setdefault(n, {}), part_vqty.setdefault(n, {}), members.setdefault(n, [])
+        for r in c.rows:
+            k = product_key(r)
+            i = index.get(k) if k else None
+            if i is None:
+                i = len(rows)
+                if k:
+                    index[k] = i
+                rows.append(r)
+            # dubbele regels binnen één partitie tellen op
+            if i not in q:
+                mem.append(i)
+            q[i] = q.get(i, 0.0) + float(r.get("_qty", 0) or 0)
+            vq[i] = vq.get(i, 0.0) + float(r.get("_qty_virtual", 0) or 0)
+
+    n_rows = len(rows)
+    tot_q, tot_vq = array("d", bytes(8 * n_rows)), array("d", bytes(8 * n_rows))
+    cat = PartitionedCatalog(rows, header_map, route_cols, names)
+    for n in names:
+        qa, vqa = array("d", bytes(8 * n_rows)), array("d", bytes(8 * n_rows))
+        for i, v in part_qty[n].items():
+            qa[i] = v; tot_q[i] += v
+        for i, v in part_vqty[n].items():
+            vqa[i] = v; tot_vq[i] += v
+        cat.qty[n], cat.qty_virtual[n] = qa, vqa
+
+    # kolommen op de rijen zelf (tonen/filteren/exporteren zonder extra opzoeking)
+    cols = [(stock_col(n), cat.qty[n]) for n in names]
+    for i, r in enumerate(rows):
+        r["_qty"] = tot_q[i]
+        r["_qty_virtual"] = tot_vq[i]
+        # de originele voorraadkolommen komen uit één bestand; toon het totaal
+        if "Aanwezige voorraad" in r:
+            r["Aanwezige voorraad"] = tot_q[i]
+        if "Virtuele voorraad" in r:
+            r["Virtuele voorraad"] = tot_vq[i]
+        for rc in route_cols:
+            if rc not in r:
+                r[rc] = ""
+        for col, qa in cols:
+            r[col] = qa[i]
+
+    # vooraf berekende totalen per partitie en over alles
+    def totals(idx: List[int], qa: array, vqa: array) -> Dict[str, float]:
+        value = cost = q_sum = vq_sum = 0.0
+        for i in idx:
+            r = rows[i]
+            q = qa[i]
+            q_sum += q; vq_sum += vqa[i]
+            value += float(r.get("_price", 0)) * q
+            cost += float(r.get("_cost", 0)) * q
+        price_sum = sum(float(rows[i].get("_price", 0)) for i in idx)
+        return {"count": len(idx), "avg_price": price_sum / max(1, len(idx)), "qty": q_sum,
+                "qty_virtual": vq_sum, "stock_value": value, "cost_value": cost}
+
+    for n in names:
+        cat.members[n] = [rows[i] for i in members[n]]
+        cat.totals[n] = totals(members[n], cat.qty[n], cat.qty_virtual[n])
+    cat.totals[ALL] = totals(list(range(n_rows)), tot_q, tot_vq)
+    logging.info(f"Partities samengevoegd: {len(names)} bestanden, {n_rows} producten "
+                 f"in {time.perf_counter() - t0:.2f}s")
+    return cat
+
+# [END: load_partitions]
+# [FUNC: load_default_catalog]
+def load_default_catalog(path_csv: Path = DEFAULT_CSV, path_xlsx: Path = DEFAULT_XLSX,
+                         folder: Path = WAREHOUSE_DIR, columns: Optional[List[str]] = None) -> Catalog:
+    """Partities als resources/magazijnen/ bestanden bevat, anders het ene productbestand.
+    columns = projectie voor kolombestanden (.parquet/.arrow), zie core/columnar.read_catalog."""
+    files = find_partitions(folder)
+    if files:
+        return load_partitions(files, columns=columns)
+    return load_catalog(path_csv, path_xlsx, columns=columns)
+
+# [END: load_default_catalog]
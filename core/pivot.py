@@ -0,0 +1,262 @@
+# core/pivot.py
+# Gegroepeerde voorraadrapporten (draaitabel): aantal, aanwezige/virtuele voorraad,
+# voorraadwaarde aan verkoop- en kostprijs en marge per Productcategorie, Productsoort,
+# Route of Leveranciers, ook over meerdere niveaus (bv. categorie → route).
+#
+# Kolomsgewijs: bij het eerste gebruik worden de getallen één keer als array('d') klaargezet
+# (voorraad × prijs al vermenigvuldigd), per groepering herschikt zodat elke groep een
+# aaneengesloten stuk is. Route wordt daarbij gegroepeerd op de combinatie van routes van
+# een product (geen overlap); het uitsplitsen per route gebeurt pas bij het optellen van de
+# groepen, zodat elke aggregatie één doorgang over de rijen is. Een aggregatie is daarna per groep sum(kolom[van:tot]), of met
+# het filterresultaat als bytemasker sum(compress(...)) — de lussen lopen in C, niet per
+# rij in Python. Het masker komt bij voorkeur rechtstreeks uit de facet-bitset van Voorraad
+# (geen rijen terugzoeken via id()); het totaal is de som van de (niet-overlappende) groepen.
+# Resultaten worden gecachet per filtertoestand.
+
+# [SECTION: Imports]
+import logging, time
+from array import array
+from collections import OrderedDict, deque
+from itertools import compress, product, repeat
+from operator import itemgetter, mul
+from typing import List, Dict, Any, Optional, Tuple, Hashable
+
+# [END: Imports]
+# groepering → rijsleutel; "Route" = alle Route 1..N-kolommen (een product telt mee
+# in elke route die het heeft, dus route-groepen kunnen samen meer dan het totaal zijn)
+GROUP_FIELDS: Dict[str, str] = {
+    "Productcategorie": "Productcategorie",
+    "Productsoort": "Productsoort",
+    "Route": "",
+    "Leveranciers": "Leveranciers",
+}
+NONE_LABEL = "(geen)"
+MEASURES = ("count", "qty", "qty_virtual", "value", "cost_value", "margin", "margin_pct")
+CACHE_SIZE = 32
+
+# [FUNC: _measures]
+def _measures(count: int, sums: List[float]) -> Dict[str, float]:
+    qty, vqty, value, cost = sums
+    margin = value - cost
+    return {"count": count, "qty": qty, "qty_virtual": vqty, "value": value, "cost_value": cost,
+            "margin": margin, "margin_pct": (margin / value * 100.0) if value else 0.0}
+
+# [END: _measures]
+# [FUNC: _order]
+def _order(k: Tuple[str, ...]):
+    """Op label, hoofdletterongevoelig; "(geen)" achteraan."""
+    return tuple((l == NONE_LABEL, l.lower()) for l in k)
+
+# [END: _order]
+# [CLASS: _Grouping]
+class _Grouping:
+    """
+    Eén groepering (bv. categorie → route): rijposities gesorteerd per groep, zodat elke
+    groep een aaneengesloten stuk [bounds[g], bounds[g+1]) is, met de getallenkolommen in
+    diezelfde volgorde. Bij Route is het label de tuple van routes van het product: elke rij
+    staat in precies één groep.
+    """
+    __slots__ = ("keys", "bounds", "order", "cols", "_pick")
+
+# [FUNC: __init__]
+    def __init__(self, keys: List[tuple], bounds: array, order: array, cols: List[array]):
+        self.keys = keys
+        self.bounds = bounds
+        self.order = order
+        self.cols = cols
+        self._pick: Optional[itemgetter] = None
+
+# [END: __init__]
+# [FUNC: permute]
+    def permute(self, mask: bytes) -> bytes:
+        """Filtermasker (rijvolgorde) → masker in groepsvolgorde; itemgetter doet de lus in C."""
+        if len(self.order) < 2:
+            return bytes(map(mask.__getitem__, self.order))
+        if self._pick is None:
+            self._pick = itemgetter(*self.order)
+        return bytes(self._pick(mask))
+
+# [END: permute]
+# [END: _Grouping]
+# [CLASS: PivotEngine]
+class PivotEngine:
+    """
+    Aggregaties over één vaste lijst rijen (een catalogus of magazijnpartitie).
+    aggregate() krijgt een deelverzameling van die rijen (het filterresultaat) en
+    geeft de groepen in boomvolgorde: per niveau 1-groep de niveau 2-groepen eronder, enz.
+    """
+# [FUNC: __init__]
+    def __init__(self, rows: List[Dict[str, Any]], route_cols: List[str], qty_key: str = "_qty"):
+        self.rows = rows
+        self.route_cols = route_cols
+        self.qty_key = qty_key
+        self._cols: Optional[List[array]] = None          # qty, qty_virtual, prijs×qty, kost×qty
+        self._pos_of: Optional[Dict[int, int]] = None     # id(rij) → positie
+        self._labels: Dict[str, list] = {}
+        self._groupings: Dict[Tuple[str, ...], _Grouping] = {}
+        self._cache: "OrderedDict[Hashable, Dict[str, Any]]" = OrderedDict()
+
+# [END: __init__]
+# [FUNC: _columns]
+    def _columns(self) -> List[array]:
+        if self._cols is None:
+            t0 = time.perf_counter()
+            rows, qk = self.rows, self.qty_key
+            qty = array("d", [float(r.get(qk, 0) or 0) for r in rows])
+            vqty = array("d", [float(r.get("_qty_virtual", 0) or 0) for r in rows])
+            price = [float(r.get("_price", 0) or 0) for r in rows]
+            cost = [float(r.get("_cost", 0) or 0) for r in rows]
+            self._cols = [qty, vqty, array("d", map(mul, price, qty)), array("d", map(mul, cost, qty))]
+            logging.info(f"Draaitabel: kolommen voor {len(rows)} rijen in {time.perf_counter() - t0:.2f}s")
+        return self._cols
+
+# [END: _columns]
+# [FUNC: _field_labels]
+    def _field_labels(self, field: str) -> list:
+        """Per rij het groepslabel (str), bij Route een tuple van nul of meer routes."""
+        labels = self._labels.get(field)
+        if labels is None:
+            if field not in GROUP_FIELDS:
+                raise ValueError(f"onbekende groepering '{field}' (kies uit {', '.join(GROUP_FIELDS)})")
+            rows = self.rows
+            if field == "Route":
+                cols = self.route_cols
+                labels = [tuple(dict.fromkeys(v for v in (str(r.get(c) or "").strip() for c in cols) if v))
+                          or (NONE_LABEL,) for r in rows]
+            else:
+                key = GROUP_FIELDS[field]
+                labels = [str(r.get(key) or "").strip() or NONE_LABEL for r in rows]
+            self._labels[field] = labels
+        return labels
+
+# [END: _field_labels]
+# [FUNC: _grouping]
+    def _grouping(self, levels: Tuple[str, ...]) -> _Grouping:
+        """Eén keer per groepering opgebouwd (bij het eerste gebruik)."""
+        g = self._groupings.get(levels)
+        if g is not None:
+            return g
+        t0 = time.perf_counter()
+        buckets: Dict[tuple, List[int]] = {}
+        for i, k in enumerate(zip(*[self._field_labels(f) for f in levels])):
+            lst = buckets.get(k)
+            if lst is None:
+                buckets[k] = [i]
+            else:
+                lst.append(i)
+
+        keys = list(buckets)
+        order, bounds = array("I"), array("Q", [0])
+        for k in keys:
+            order.extend(buckets[k])
+            bounds.append(len(order))
+        cols = [array("d", map(c.__getitem__, order)) for c in self._columns()]
+        g = self._groupings[levels] = _Grouping(keys, bounds, order, cols)
+        logging.info(f"Draaitabel: groepering {' → '.join(levels)} ({len(keys)} groepen) "
+                     f"in {time.perf_counter() - t0:.2f}s")
+        return g
+
+# [END: _grouping]
+# [FUNC: _mask]
+    def _mask(self, subset: List[Dict[str, Any]]) -> bytearray:
+        """1 per positie die in het filterresultaat zit."""
+        if self._pos_of is None:
+            self._pos_of = {id(r): i for i, r in enumerate(self.rows)}
+        mask = bytearray(len(self.rows))
+        deque(map(mask.__setitem__, map(self._pos_of.__getitem__, map(id, subset)), repeat(1)), maxlen=0)
+        return mask
+
+# [END: _mask]
+# [FUNC: _group_sums]
+    def _group_sums(self, g: _Grouping, mask: Optional[bytes]) -> Dict[tuple, List[float]]:
+        """Per (niet-lege) groep [aantal, qty, qty_virtual, waarde, kostwaarde]."""
+        out: Dict[tuple, List[float]] = {}
+        b, cols = g.bounds, g.cols
+        pm = g.permute(mask) if mask is not None else None
+        for gi, k in enumerate(g.keys):
+            lo, hi = b[gi], b[gi + 1]
+            if pm is None:
+                n = hi - lo
+            else:
+                m = pm[lo:hi]
+                n = m.count(1)
+                if n == 0:
+                    continue
+                if n < hi - lo:
+                    out[k] = [n] + [sum(compress(c[lo:hi], m)) for c in cols]
+                    continue
+            out[k] = [n] + [sum(c[lo:hi]) for c in cols]
+        return out
+
+# [END: _group_sums]
+# [FUNC: aggregate]
+    def aggregate(self, subset: List[Dict[str, Any]], levels: List[str],
+                  state: Optional[Hashable] = None, flags: Optional[bytes] = None) -> Dict[str, Any]:
+        """
+        Geeft {"levels", "groups": [{"level", "keys", "label", <MEASURES>}, ...], "total", "ms"}.
+        subset = filterresultaat (rijen uit self.rows); state = sleutel van de filtertoestand
+        (zoekterm, lage voorraad, ...) voor de cache; zonder state wordt op de lijst zelf gecachet.
+        flags = hetzelfde filterresultaat als 0/1 per positie (BitmapIndex.flags), als de
+        aanroeper dat al heeft; anders wordt het masker uit subset afgeleid.
+        """
+        levels_t = tuple(levels)
+        ck = (state if state is not None else id(subset), len(subset), levels_t)
+        hit = self._cache.get(ck)
+        if hit is not None and (state is not None or hit["_subset"] is subset):
+            self._cache.move_to_end(ck)
+            return hit
+
+        t0 = time.perf_counter()
+        if subset is self.rows or len(subset) == len(self.rows):
+            mask = None
+        else:
+            mask = flags if flags is not None else self._mask(subset)
+        # één doorgang over de diepste groepering; de groepen overlappen niet, dus het
+        # totaal is hun som
+        sums = self._group_sums(self._grouping(levels_t), mask)
+        tot = [0.0] * 5
+        for a in sums.values():
+            for j in range(5):
+                tot[j] += a[j]
+        total = _measures(int(tot[0]), tot[1:])
+
+        # elk niveau door optellen; een routecombinatie telt mee in elk van haar routes
+        route_at = [f == "Route" for f in levels_t]
+        per_depth: List[Dict[Tuple[str, ...], Dict[str, float]]] = []
+        for d in range(len(levels_t)):
+            acc: Dict[Tuple[str, ...], List[float]] = {}
+            for k, a in sums.items():
+                prefix = k[:d + 1]
+                keys = (product(*(l if r else (l,) for l, r in zip(prefix, route_at)))
+                        if any(route_at[:d + 1]) else (prefix,))
+                for pk in keys:
+                    t = acc.get(pk)
+                    if t is None:
+                        acc[pk] = a[:]
+                    else:
+                        for j in range(5):
+                            t[j] += a[j]
+            per_depth.append({k: _measures(int(t[0]), t[1:]) for k, t in acc.items()})
+
+        # boomvolgorde: ouder, dan kinderen
+        children: Dict[Tuple[str, ...], List[Tuple[str, ...]]] = {}
+        for d, agg in enumerate(per_depth):
+            for k in sorted(agg, key=_order):
+                children.setdefault(k[:d], []).append(k)
+
+        groups: List[Dict[str, Any]] = []
+        def emit(prefix: Tuple[str, ...], d: int):
+            for k in children.get(prefix, ()):
+                groups.append({"level": d, "keys": k, "label": k[-1], **per_depth[d][k]})
+                emit(k, d + 1)
+        emit((), 0)
+
+        result = {"levels": list(levels_t), "groups": groups, "total": total,
+                  "ms": (time.perf_counter() - t0) * 1000.0, "_subset": subset}
+        self._cache[ck] = result
+        if len(self._cache) > CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return result
+
+# [END: aggregate]
+# [END: PivotEngine]
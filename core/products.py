@@ -0,0 +1,443 @@
+# core/products.py
+# Productdata zonder GUI: laden, opschonen, groeperen per product, filters en prijsvergelijking.
+# Wordt gedeeld door de Qt-vensters en de command-line (cli.py); importeert dus nooit PyQt6.
+
+# [SECTION: Imports]
+import csv, logging
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+from core.compression import compression_of, find_export, inner_suffix, read_csv_compressed
+from core.formatting import normalize_number
+
+# [END: Imports]
+DATA_DIR = Path("resources")
+DEFAULT_CSV = DATA_DIR / "products.csv"
+DEFAULT_XLSX = DATA_DIR / "products.xlsx"
+MIN_STOCK = 5
+
+# Herkenbare kernkolommen (mapping NL/EN) voor zoeken/prijs/voorraad
+PREF_COLS: Dict[str, List[str]] = {
+    "id": ["id", "ID"],
+    "name": ["name", "Naam", "Productnaam"],
+    "default_code": ["default_code", "Interne referentie", "Nummer"],
+    "barcode": ["barcode", "Barcode"],
+    "list_price": ["list_price", "Verkoopprijs"],
+    "standard_price": ["standard_price", "Kostprijs"],
+    "qty_available": ["qty_available", "Aantal op voorraad", "Aanwezige voorraad"],
+    "virtual_available": ["virtual_available", "Beschikbaar aantal", "Virtuele voorraad"],
+}
+
+# Volgorde van toonbare kolommen (GUI-checkboxes volgen deze volgorde)
+DISPLAY_ORDER = [
+    "Naam", "Kan verkocht worden", "Kan gekocht worden", "Productsoort",
+    "Facturatiebeleid", "Verkoopprijs", "Verkoop BTW", "Kostprijs",
+    "Productcategorie", "Interne referentie", "Barcode", "Maateenheid",
+    "Inkoop maateenheid/Maateenheid", "Inkoop maateenheid/ID",
+    "Leveranciers", "Inkoop BTW", "Controlebeleid", "Routes",
+    "Verantwoordelijke", "Aanwezige voorraad", "Virtuele voorraad",
+]
+
+ROUTES_FIELD_CANDIDATES = ["Routes"]  # pas aan als kolomnaam anders is
+
+# getypeerde kolombestanden (core/columnar.py, vereist pyarrow)
+COLUMNAR_SUFFIXES = (".parquet", ".arrow", ".feather")
+
+# CSV's vanaf deze grootte worden lui ingelezen (zie core/lazycsv.py)
+LAZY_MIN_BYTES = 200 * 1024 * 1024
+
+# [FUNC: first_present]
+def first_present(cands: List[str], header: List[str]) -> Optional[str]:
+    for c in cands:
+        if c in header:
+            return c
+    return None
+
+# [END: first_present]
+# [FUNC: try_load_xlsx]
+def try_load_xlsx(path: Path) -> List[Dict[str, Any]]:
+    try:
+        import openpyxl  # type: ignore
+    except ImportError:
+        raise RuntimeError("openpyxl niet geïnstalleerd. Installeer met 'pip install openpyxl' of gebruik CSV.")
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    ws = wb.active
+    rows = list(ws.iter_rows(values_only=True))
+    if not rows:
+        return []
+    header = [str(h).strip() if h is not None else "" for h in rows[0]]
+    data = []
+    for r in rows[1:]:
+        rec = {}
+        for i, h in enumerate(header):
+            rec[h] = r[i]
+        data.append(rec)
+    logging.info(f"XLSX geladen: {path} rijen={len(data)}")
+    return data
+
+# [END: try_load_xlsx]
+# [FUNC: read_csv_smart]
+def read_csv_smart(path: Path) -> List[Dict[str, Any]]:
+    encodings = ["utf-8", "utf-8-sig", "cp1252", "latin-1"]
+    for enc in encodings:
+        try:
+            with path.open("r", encoding=enc, newline="") as f:
+                sample = f.read(4096); f.seek(0)
+                try:
+                    dialect = csv.Sniffer().sniff(sample, delimiters=[",",";","|","\t"])
+                    delim = dialect.delimiter
+                except Exception:
+                    delim = ";"
+                rows = list(csv.DictReader(f, delimiter=delim))
+                logging.info(f"CSV geladen met encoding={enc}, delimiter='{delim}', rijen={len(rows)}")
+                return rows
+        except UnicodeDecodeError:
+            continue
+    with path.open("r", encoding="cp1252", errors="replace", newline="") as f:
+        rows = list(csv.DictReader(f, delimiter=";"))
+        logging.warning(f"CSV geladen met cp1252 (met vervangtekens), rijen={len(rows)}")
+        return rows
+
+# [END: read_csv_smart]
+# [FUNC: read_export]
+def read_export(path: Path) -> List[Dict[str, Any]]:
+    """Eén exportbestand inlezen; het formaat volgt uit de extensie (ook .csv.gz, .csv.xz, ...)."""
+    if path.suffix.lower() in COLUMNAR_SUFFIXES:
+        from core.columnar import read_catalog
+        return read_catalog(path).rows
+    if compression_of(path):
+        if inner_suffix(path) == ".xlsx":
+            raise RuntimeError(f"Gecomprimeerde XLSX wordt niet ondersteund ({path.name}); XLSX is zelf al gecomprimeerd.")
+        return read_csv_compressed(path)
+    if path.suffix.lower() == ".xlsx":
+        return try_load_xlsx(path)
+    return read_csv_smart(path)
+
+# [END: read_export]
+# [FUNC: load_any_products]
+def load_any_products(path_csv: Path, path_xlsx: Path) -> List[Dict[str, Any]]:
+    found = find_export(path_csv)  # products.csv, anders products.csv.gz/.bz2/.xz/.zst
+    if found is not None:
+        logging.info(f"CSV laden: {found}")
+        return read_export(found)
+    if path_xlsx.exists():
+        logging.info(f"XLSX laden: {path_xlsx}")
+        return try_load_xlsx(path_xlsx)
+    raise FileNotFoundError(f"Geen productbestand gevonden in {DATA_DIR}. Plaats 'products.csv' (eventueel .gz/.xz) of 'products.xlsx'.")
+
+# [END: load_any_products]
+# [FUNC: build_header_map]
+def build_header_map(header: List[str]) -> Dict[str, str]:
+    """Kernveld → werkelijke kolomnaam in deze export."""
+    hmap: Dict[str, str] = {}
+    for key, cands in PREF_COLS.items():
+        found = first_present(cands, header)
+        if found:
+            hmap[key] = found
+    return hmap
+
+# [END: build_header_map]
+# [FUNC: clean_rows]
+def clean_rows(rows: List[Dict[str, Any]], hmap: Dict[str, str]) -> List[Dict[str, Any]]:
+    """Originele kolommen + genormaliseerde _-velden voor zoeken/prijs/voorraad."""
+    cleaned: List[Dict[str, Any]] = []
+    for r in rows:
+        rec = dict(r)  # originele CSV-kolommen + we voegen _-keys toe
+        id_val = r.get(hmap.get("id",""), None) or r.get(hmap.get("default_code",""), None) or r.get(hmap.get("name",""), "")
+        rec["_id"] = id_val
+        rec["_name"] = r.get(hmap.get("name",""), "")
+        rec["_sku"] = r.get(hmap.get("default_code",""), "")
+        rec["_barcode"] = r.get(hmap.get("barcode",""), "")
+        rec["_price"] = normalize_number(r.get(hmap.get("list_price",""), 0))
+        rec["_cost"]  = normalize_number(r.get(hmap.get("standard_price",""), 0))
+        rec["_qty"]   = normalize_number(r.get(hmap.get("qty_available",""), 0))
+        rec["_qty_virtual"] = normalize_number(r.get(hmap.get("virtual_available",""), 0))
+        cleaned.append(rec)
+    return cleaned
+
+# [END: clean_rows]
+# [FUNC: product_key]
+def product_key(r: Dict[str, Any]) -> str:
+    """Sleutel waarmee rijen van hetzelfde product samengevoegd/vergeleken worden."""
+    return (str(r.get("_id") or "").strip()
+            or str(r.get("_sku") or "").strip()
+            or str(r.get("_name") or "").strip())
+
+# [END: product_key]
+# [FUNC: _split_routes]
+def _split_routes(val: str) -> List[str]:
+    """Splits een routestring in losse items. Werkt ook als Odoo 1 route per rij geeft."""
+    if not val:
+        return []
+    txt = str(val).strip()
+    # meeste exports hebben 1 per rij; soms meerdere met ; of | of ,
+    if any(sep in txt for sep in [";", "|", ","]):
+        parts = []
+        for sep in [";", "|", ","]:
+            if sep in txt:
+                parts = [p.strip() for p in txt.split(sep)]
+                break
+    else:
+        parts = [txt]
+    # uniq + volgorde behouden
+    seen, out = set(), []
+    for p in parts:
+        if p and p not in seen:
+            seen.add(p); out.append(p)
+    return out
+
+# [END: _split_routes]
+# [FUNC: group_and_explode_routes]
+def group_and_explode_routes(rows: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Vouw vervolgregels samen per product en zet Routes naast elkaar als Route 1..N.
+    Geeft (rijen, route-kolommen) terug."""
+    if not rows:
+        return rows, []
+
+    header = list(rows[0].keys())
+    routes_col = next((c for c in ROUTES_FIELD_CANDIDATES if c in header), None)
+    if not routes_col:
+        # geen Routes-kolom aanwezig
+        return rows, []
+
+    # groepeer basisrij + verzamel routes
+    groups: Dict[str, Dict[str, Any]] = {}
+    routes_map: Dict[str, List[str]] = {}
+    for r in rows:
+        k = product_key(r)
+        if not k:
+            # sla rijen zonder sleutel over
+            continue
+        groups.setdefault(k, dict(r))  # eerste rij als basis
+        vals = _split_routes(str(r.get(routes_col) or ""))
+        if vals:
+            acc = routes_map.setdefault(k, [])
+            for v in vals:
+                if v not in acc:
+                    acc.append(v)
+
+    # bepaal max aantal routes over alle producten
+    max_routes = max((len(v) for v in routes_map.values()), default=0)
+    route_cols = [f"Route {i}" for i in range(1, max_routes + 1)]
+
+    # bouw eindrijen: basis + Route 1..N (verwijder originele 'Routes')
+    out: List[Dict[str, Any]] = []
+    for k, base in groups.items():
+        routes = routes_map.get(k, [])
+        row = dict(base)
+        row.pop(routes_col, None)  # oorspronkelijke kolom weghalen
+        for i in range(max_routes):
+            row[f"Route {i+1}"] = routes[i] if i < len(routes) else ""
+        out.append(row)
+
+    return out, route_cols
+
+# [END: group_and_explode_routes]
+# [CLASS: Catalog]
+class Catalog:
+    """Opgeschoonde en gegroepeerde productrijen + bijhorende kolominfo."""
+# [FUNC: __init__]
+    def __init__(self, rows: List[Dict[str, Any]], header_map: Dict[str, str], route_cols: List[str]):
+        self.rows = rows
+        self.header_map = header_map
+        self.route_cols = route_cols
+
+# [END: __init__]
+# [FUNC: available_columns]
+    def available_columns(self) -> List[str]:
+        """Toonbare kolommen in vaste volgorde, daarna Route 1..N."""
+        base = self.rows[0] if self.rows else {}
+        available = [col for col in DISPLAY_ORDER if col in base]
+        for rc in self.route_cols:
+            if rc in base and rc not in available:
+                available.append(rc)
+        return available
+
+# [END: available_columns]
+# [END: Catalog]
+# [FUNC: catalog_from_rows]
+def catalog_from_rows(rows: List[Dict[str, Any]]) -> Catalog:
+    """Opschonen + groeperen van ingelezen exportrijen."""
+    if not rows:
+        return Catalog([], {}, [])
+    hmap = build_header_map(list(rows[0].keys()))
+    grouped, route_cols = group_and_explode_routes(clean_rows(rows, hmap))
+    logging.info(f"Ingeladen rijen (na groeperen): {len(grouped)}")
+    return Catalog(grouped, hmap, route_cols)
+
+# [END: catalog_from_rows]
+# [FUNC: _use_lazy]
+def _use_lazy(path: Path, lazy: Optional[bool]) -> bool:
+    if path.suffix.lower() != ".csv":
+        return False
+    return bool(lazy) or (lazy is None and path.stat().st_size >= LAZY_MIN_BYTES)
+
+# [END: _use_lazy]
+# [FUNC: load_catalog_file]
+def load_catalog_file(path: Path, lazy: Optional[bool] = None,
+                      columns: Optional[List[str]] = None) -> Catalog:
+    """Eén exportbestand (formaat volgens extensie) als Catalog.
+    columns = projectie, enkel voor kolombestanden (zie core/columnar.read_catalog)."""
+    if path.suffix.lower() in COLUMNAR_SUFFIXES:
+        from core.columnar import read_catalog
+        return read_catalog(path, columns)
+    if _use_lazy(path, lazy):
+        return load_catalog_lazy(path)
+    return catalog_from_rows(read_export(path))
+
+# [END: load_catalog_file]
+# [FUNC: load_catalog]
+def load_catalog(path_csv: Path = DEFAULT_CSV, path_xlsx: Path = DEFAULT_XLSX,
+                 lazy: Optional[bool] = None, columns: Optional[List[str]] = None) -> Catalog:
+    """Laden + opschonen + groeperen, zoals het Voorraad-venster het toont.
+    lazy=None kiest automatisch de luie CSV-modus voor bestanden vanaf LAZY_MIN_BYTES.
+    Staat er een products.parquet/.arrow naast de CSV (niet ouder dan de export), dan wordt dat gelezen,
+    met columns als projectie."""
+    from core.columnar import columnar_sibling
+    columnar = path_csv if path_csv.suffix.lower() in COLUMNAR_SUFFIXES else columnar_sibling(path_csv, path_xlsx)
+    if columnar is not None and columnar.exists():
+        return load_catalog_file(columnar, columns=columns)
+    if path_csv.exists() and _use_lazy(path_csv, lazy):
+        return load_catalog_lazy(path_csv)
+    return catalog_from_rows(load_any_products(path_csv, path_xlsx))
+
+# [END: load_catalog]
+# [FUNC: load_catalog_lazy]
+def load_catalog_lazy(path: Path) -> Catalog:
+    """
+    Zelfde resultaat als load_catalog, maar met LazyRow's: enkel offsets, _-velden, routes
+    en RESIDENT_COLS staan in RAM; de overige kolommen worden per rij gedecodeerd bij opvragen.
+    """
+    from core.lazycsv import LazyCsv, LazyRow, LazyCatalogSource, RESIDENT_TEXT, RESIDENT_NUM, RESIDENT_COLS
+
+    logging.info(f"CSV lui laden: {path}")
+    lazy = LazyCsv(
+        path,
+        {k: PREF_COLS[v] for k, v in RESIDENT_TEXT.items()},
+        {k: PREF_COLS[v] for k, v in RESIDENT_NUM.items()},
+        extra_cols=ROUTES_FIELD_CANDIDATES + RESIDENT_COLS,
+    )
+    n = len(lazy)
+    if not n:
+        return Catalog([], {}, [])
+    hmap = build_header_map(lazy.header)
+    routes_col = next((c for c in ROUTES_FIELD_CANDIDATES if c in lazy.header), None)
+    if not routes_col:
+        # geen Routes-kolom: geen groepering (zoals group_and_explode_routes)
+        src = LazyCatalogSource(lazy, None, [])
+        return Catalog([LazyRow(src, i) for i in range(n)], hmap, [])
+
+    skus, names = lazy.resident["_sku"], lazy.resident["_name"]
+    routes_raw = lazy.resident[routes_col]
+    ids = lazy.resident.get("_id_raw")
+    first: Dict[str, int] = {}
+    routes_map: Dict[str, List[str]] = {}
+    for i in range(n):
+        # zelfde sleutel als product_key(clean_rows(...))
+        id_val = (ids[i] if ids else "") or skus[i] or names[i]
+        k = id_val.strip() or skus[i].strip() or names[i].strip()
+        if not k:
+            continue
+        first.setdefault(k, i)
+        vals = _split_routes(routes_raw[i])
+        if vals:
+            acc = routes_map.setdefault(k, [])
+            for v in vals:
+                if v not in acc:
+                    acc.append(v)
+
+    max_routes = max((len(v) for v in routes_map.values()), default=0)
+    route_cols = [f"Route {i}" for i in range(1, max_routes + 1)]
+    src = LazyCatalogSource(lazy, routes_col, route_cols)
+    interned: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+    rows = []
+    for k, i in first.items():
+        rt = tuple(routes_map.get(k, ()))
+        rows.append(LazyRow(src, i, interned.setdefault(rt, rt)))
+    logging.info(f"Ingeladen rijen (lui, na groeperen): {len(rows)}")
+    return Catalog(rows, hmap, route_cols)
+
+# [END: load_catalog_lazy]
+# [FUNC: search_rows]
+def search_rows(rows: List[Dict[str, Any]], needle: str) -> List[Dict[str, Any]]:
+    """Deeltekst (hoofdletterongevoelig) in naam, interne referentie of barcode."""
+    s = needle.strip().lower()
+    if not s:
+        return rows
+    return [
+        r for r in rows
+        if s in str(r.get("_name", "")).lower()
+        or s in str(r.get("_sku", "")).lower()
+        or s in str(r.get("_barcode", "")).lower()
+    ]
+
+# [END: search_rows]
+# [FUNC: low_stock_rows]
+def low_stock_rows(rows: List[Dict[str, Any]], min_stock: float = MIN_STOCK,
+                   qty_key: str = "_qty") -> List[Dict[str, Any]]:
+    """qty_key laat toe op de voorraad van één magazijn te filteren (zie core/partitions.py)."""
+    return [r for r in rows if r.get(qty_key, 0) < min_stock]
+
+# [END: low_stock_rows]
+# [FUNC: has_stock_columns]
+def has_stock_columns(rows: List[Dict[str, Any]]) -> bool:
+    return any(r.get("_qty", 0) > 0 for r in rows) or any(r.get("_qty_virtual", 0) > 0 for r in rows)
+
+# [END: has_stock_columns]
+# [FUNC: stock_stats]
+def stock_stats(rows: List[Dict[str, Any]], qty_key: str = "_qty") -> Dict[str, float]:
+    """Aantal, gemiddelde verkoopprijs, totale voorraad en voorraadwaarde (verkoop- en kostprijs × aanwezig)."""
+    total = len(rows)
+    avg_price = (sum(float(r.get("_price", 0)) for r in rows) / max(1, total)) if rows else 0.0
+    total_qty = sum(float(r.get(qty_key, 0)) for r in rows)
+    total_value = sum(float(r.get("_price", 0)) * float(r.get(qty_key, 0)) for r in rows) if rows else 0.0
+    cost_value = sum(float(r.get("_cost", 0)) * float(r.get(qty_key, 0)) for r in rows) if rows else 0.0
+    return {"count": total, "avg_price": avg_price, "qty": total_qty,
+            "stock_value": total_value, "cost_value": cost_value}
+
+# [END: stock_stats]
+# [FUNC: load_price_map]
+def load_price_map(path: Path) -> Dict[str, float]:
+    """Verkoopprijs per productsleutel uit een tweede export."""
+    rows2 = read_export(path)
+    if not rows2:
+        return {}
+    hmap2 = build_header_map(list(rows2[0].keys()))
+
+    def key_for(rec: Dict[str, Any]) -> str:
+        for k in ("id", "default_code", "name"):
+            col = hmap2.get(k)
+            if col:
+                v = rec.get(col)
+                if v is not None and str(v).strip():
+                    return str(v).strip()
+        return ""
+
+    price_col = hmap2.get("list_price", "")
+    price_by_key: Dict[str, float] = {}
+    for rec in rows2:
+        k = key_for(rec)
+        if not k:
+            continue
+        raw = rec.get(price_col)
+        if raw is None or not str(raw).strip():
+            continue  # vervolgregel (bv. extra route) zonder prijs: geen prijs 0
+        price_by_key[k] = normalize_number(raw)
+    return price_by_key
+
+# [END: load_price_map]
+# [FUNC: new_price_column]
+def new_price_column(rows: List[Dict[str, Any]], price_by_key: Dict[str, float]) -> Dict[int, float]:
+    """
+    Nieuwe prijs per rij die in de tweede export voorkomt, als id(rij) → prijs
+    (zie formatting.NewPrices). De rijen zelf blijven ongewijzigd; het aantal treffers is len().
+    """
+    out: Dict[int, float] = {}
+    get = price_by_key.get
+    for r in rows:
+        new_price = get(product_key(r))
+        if new_price is not None:
+            out[id(r)] = new_price
+    return out
+
+# [END: new_price_column]
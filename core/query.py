@@ -0,0 +1,636 @@
+# core/query.py
+# Kleine zoektaal voor de slimme zoekfunctie (portaal) en het zoekveld van Voorraad.
+#
+#   voorraad < 5 categorie:Gereedschap prijs>100
+#   route:Dropship (soort:Verbruiksartikel OR soort:Opslagproduct)
+#   prijs:10..50 NOT leverancier:acme "black eagle"
+#
+# - veld-vergelijkingen: <, <=, >, >=, =, !=, en veld:waarde (gelijk) / veld:van..tot (bereik)
+# - AND is impliciet (spatie); OR/OF, NOT/NIET, -veld:waarde en -"zin"; haakjes groeperen
+# - losse woorden en "zinnen" zoeken zoals search_rows (naam, interne referentie, barcode)
+# - tekst zonder veld, operator, aanhalingstekens of sleutelwoord blijft één deeltekst over de
+#   volledige tekst, precies zoals search_rows ("inkt zwart", "-3M")
+#
+# De planner kiest binnen elke AND de meest selectieve voorwaarde waarvoor een index bestaat
+# (exacte telling uit de index, niet geschat), haalt daarmee de kandidaten op en test de
+# overige voorwaarden enkel op die kandidaten. Query.run() geeft ook een Explain terug
+# met het gekozen plan en de tijd per stap.
+
+# [SECTION: Imports]
+import re, time
+from bisect import bisect_left, bisect_right
+from typing import List, Dict, Any, Optional, Tuple, Callable, Union
+
+# [END: Imports]
+# veldnaam (kleine letters) → (soort, rijsleutel)
+#   num      getal, vergelijkingen + bereik, gesorteerde index
+#   eq       tekst, gelijk (hoofdletterongevoelig), hash-index
+#   cat      als eq, maar "Gereedschap" matcht ook "All / Gereedschap"
+#   route    gelijk aan één van de Route 1..N-kolommen, hash-index
+#   contains deeltekst, geen index
+FIELDS: Dict[str, Tuple[str, str]] = {}
+for _names, _spec in (
+    (("voorraad", "stock", "qty", "aanwezig"), ("num", "_qty")),
+    (("virtueel", "virtuele", "beschikbaar"), ("num", "_qty_virtual")),
+    (("prijs", "verkoopprijs", "price"), ("num", "_price")),
+    (("kost", "kostprijs", "cost"), ("num", "_cost")),
+    (("categorie", "cat", "category", "productcategorie"), ("cat", "Productcategorie")),
+    (("soort", "type", "productsoort"), ("eq", "Productsoort")),
+    (("route", "routes"), ("route", "")),
+    (("ref", "sku", "referentie"), ("eq", "_sku")),
+    (("barcode", "ean"), ("eq", "_barcode")),
+    (("leverancier", "leveranciers", "supplier"), ("contains", "Leveranciers")),
+    (("naam", "name"), ("contains", "_name")),
+):
+    for _n in _names:
+        FIELDS[_n] = _spec
+
+KEYWORDS_OR = ("OR", "OF")
+KEYWORDS_AND = ("AND", "EN")
+KEYWORDS_NOT = ("NOT", "NIET")
+
+_TOKEN_RE = re.compile(r'\s*(?:"([^"]*)"?|(\(|\))|(<=|>=|!=|<|>|=|:)|([^\s()"<>=!:]+))')
+
+# [CLASS: QueryError]
+class QueryError(ValueError):
+    """Ongeldige zoekopdracht (de GUI valt dan terug op gewoon zoeken op de hele tekst)."""
+
+# [END: QueryError]
+# [CLASS: Pred]
+class Pred:
+    """Eén voorwaarde: veld op waarde, of een vrije zoekterm (kind 'text')."""
+    __slots__ = ("kind", "key", "op", "value", "hi", "quoted")
+
+# [FUNC: __init__]
+    def __init__(self, kind: str, key: str, op: str, value: Any, hi: Any = None, quoted: bool = False):
+        self.kind = kind
+        self.key = key
+        self.op = op          # '<' '<=' '>' '>=' '=' '!=' '..' of 'in' (tekst)
+        self.value = value
+        self.hi = hi
+        self.quoted = quoted
+
+# [END: __init__]
+# [FUNC: __str__]
+    def __str__(self) -> str:
+        if self.kind == "text":
+            return f'tekst ~ "{self.value}"'
+        if self.op == "..":
+            return f"{self.key} in [{self.value:g}, {self.hi:g}]"
+        v = f"{self.value:g}" if isinstance(self.value, float) else f"'{self.value}'"
+        return f"{self.key or 'Route *'} {'~' if self.kind == 'contains' else self.op} {v}"
+
+# [END: __str__]
+# [END: Pred]
+# [CLASS: Node]
+class Node:
+    """AND / OR / NOT over voorwaarden of andere nodes."""
+    __slots__ = ("op", "children")
+
+# [FUNC: __init__]
+    def __init__(self, op: str, children: List["Expr"]):
+        self.op = op
+        self.children = children
+
+# [END: __init__]
+# [FUNC: __str__]
+    def __str__(self) -> str:
+        if self.op == "NOT":
+            return f"NOT ({self.children[0]})"
+        return f" {self.op} ".join(f"({c})" if isinstance(c, Node) else str(c) for c in self.children)
+
+# [END: __str__]
+# [END: Node]
+Expr = Union[Pred, Node]
+
+# [FUNC: _tokenize]
+def _tokenize(text: str) -> List[Tuple[str, str]]:
+    """(soort, tekst) met soort 'str' (tussen aanhalingstekens), 'paren', 'op' of 'word'."""
+    tokens: List[Tuple[str, str]] = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        m = _TOKEN_RE.match(text, pos)
+        if not m or m.end() == pos:
+            raise QueryError(f"onverwacht teken op positie {pos}: {text[pos]!r}")
+        pos = m.end()
+        quoted, paren, op, word = m.groups()
+        if quoted is not None:
+            tokens.append(("str", quoted))
+        elif paren:
+            tokens.append(("paren", paren))
+        elif op:
+            tokens.append(("op", op))
+        elif word:
+            tokens.append(("word", word))
+    return tokens
+
+# [END: _tokenize]
+# [CLASS: _Parser]
+class _Parser:
+    """Recursive descent: or := and (OR and)* ; and := unary (AND? unary)* ; unary := NOT unary | atom."""
+# [FUNC: __init__]
+    def __init__(self, tokens: List[Tuple[str, str]]):
+        self.toks = tokens
+        self.i = 0
+
+# [END: __init__]
+# [FUNC: peek]
+    def peek(self, ahead: int = 0) -> Optional[Tuple[str, str]]:
+        j = self.i + ahead
+        return self.toks[j] if j < len(self.toks) else None
+
+# [END: peek]
+# [FUNC: parse]
+    def parse(self) -> Optional[Expr]:
+        if not self.toks:
+            return None
+        expr = self.parse_or()
+        if self.peek() is not None:
+            raise QueryError(f"onverwacht '{self.peek()[1]}'")
+        return expr
+
+# [END: parse]
+# [FUNC: parse_or]
+    def parse_or(self) -> Expr:
+        parts = [self.parse_and()]
+        while self.peek() is not None and self.peek()[0] == "word" and self.peek()[1] in KEYWORDS_OR:
+            self.i += 1
+            parts.append(self.parse_and())
+        return parts[0] if len(parts) == 1 else Node("OR", parts)
+
+# [END: parse_or]
+# [FUNC: parse_and]
+    def parse_and(self) -> Expr:
+        parts = [self.parse_unary()]
+        while True:
+            t = self.peek()
+            if t is None or t == ("paren", ")") or (t[0] == "word" and t[1] in KEYWORDS_OR):
+                break
+            if t[0] == "word" and t[1] in KEYWORDS_AND:
+                self.i += 1
+            parts.append(self.parse_unary())
+        return parts[0] if len(parts) == 1 else Node("AND", parts)
+
+# [END: parse_and]
+# [FUNC: parse_unary]
+    def parse_unary(self) -> Expr:
+        t = self.peek()
+        if t is None:
+            raise QueryError("onvolledige zoekopdracht")
+        if t[0] == "word" and t[1] in KEYWORDS_NOT:
+            self.i += 1
+            return Node("NOT", [self.parse_unary()])
+        if t[0] == "word" and t[1].startswith("-"):
+            # enkel -veld:waarde en -"zin" / -(...) zijn NOT; "-3M" is gewoon een zoekterm
+            nxt = self.peek(1)
+            if len(t[1]) > 1 and nxt is not None and nxt[0] == "op":
+                self.toks[self.i] = ("word", t[1][1:])
+                return Node("NOT", [self.parse_unary()])
+            if t[1] == "-" and nxt is not None and (nxt[0] == "str" or nxt == ("paren", "(")):
+                self.i += 1
+                return Node("NOT", [self.parse_unary()])
+        return self.parse_atom()
+
+# [END: parse_unary]
+# [FUNC: parse_atom]
+    def parse_atom(self) -> Expr:
+        kind, text = self.toks[self.i]
+        self.i += 1
+        if (kind, text) == ("paren", "("):
+            expr = self.parse_or()
+            if self.peek() != ("paren", ")"):
+                raise QueryError("ontbrekend ')'")
+            self.i += 1
+            return expr
+        if kind == "paren":
+            raise QueryError("onverwacht ')'")
+        if kind == "op":
+            raise QueryError(f"operator '{text}' zonder veld")
+        if kind == "str":
+            return Pred("text", "", "in", text.strip().lower(), quoted=True)
+
+        nxt = self.peek()
+        if nxt is not None and nxt[0] == "op":
+            return self.parse_field(text, nxt[1])
+        return Pred("text", "", "in", text.lower())
+
+# [END: parse_atom]
+# [FUNC: parse_field]
+    def parse_field(self, name: str, op: str) -> Expr:
+        spec = FIELDS.get(name.lower())
+        if spec is None:
+            raise QueryError(f"onbekend veld '{name}' (bekend: {', '.join(sorted(set(FIELDS)))})")
+        kind, key = spec
+        self.i += 1
+        val_tok = self.peek()
+        if val_tok is None or val_tok[0] not in ("word", "str"):
+            raise QueryError(f"waarde ontbreekt na '{name}{op}'")
+        self.i += 1
+        raw = val_tok[1]
+
+        if kind == "num":
+            if op == ":" and ".." in raw:
+                lo_s, hi_s = raw.split("..", 1)
+                lo = _number(lo_s) if lo_s else float("-inf")
+                hi = _number(hi_s) if hi_s else float("inf")
+                return Pred(kind, key, "..", min(lo, hi), max(lo, hi))
+            if op == "!=":
+                return Node("NOT", [Pred(kind, key, "=", _number(raw))])
+            return Pred(kind, key, "=" if op == ":" else op, _number(raw))
+
+        if op in ("<", "<=", ">", ">="):
+            raise QueryError(f"'{name}' is geen getal; gebruik {name}:waarde")
+        pred = Pred(kind, key, "=", raw.strip().lower())
+        return Node("NOT", [pred]) if op == "!=" else pred
+
+# [END: parse_field]
+# [END: _Parser]
+# [FUNC: _number]
+def _number(s: str) -> float:
+    """
+    Getal met komma of punt als decimaalteken en eventueel duizendtallen: "1.234,56",
+    "1,234.56", "1.000.000" en "12,5" worden 1234.56, 1234.56, 1000000 en 12.5.
+    """
+    text = s.strip()
+    if not re.fullmatch(r"-?[\d.,]+", text):
+        raise QueryError(f"'{text}' is geen getal")
+    num = text
+    if "," in num and "." in num:
+        # het laatste scheidingsteken is het decimaalteken, het andere groepeert duizendtallen
+        dec, group = (",", ".") if num.rfind(",") > num.rfind(".") else (".", ",")
+        num = num.replace(group, "").replace(dec, ".")
+    elif num.count(".") > 1:
+        num = num.replace(".", "")
+    elif num.count(",") > 1:
+        num = num.replace(",", "")
+    else:
+        num = num.replace(",", ".")
+    try:
+        return float(num)
+    except ValueError:
+        raise QueryError(f"'{text}' is geen getal")
+
+# [END: _number]
+# [FUNC: _drop_bare]
+def _drop_bare(expr: Optional[Expr]) -> Optional[Expr]:
+    """Verwijder losse (niet-geciteerde) woorden; wat overblijft zijn velden en "zinnen"."""
+    if expr is None or isinstance(expr, Pred):
+        return None if expr is None or (expr.kind == "text" and not expr.quoted) else expr
+    kept = [c for c in (_drop_bare(c) for c in expr.children) if c is not None]
+    if not kept:
+        return None
+    if expr.op == "NOT":
+        return Node("NOT", kept)
+    return kept[0] if len(kept) == 1 else Node(expr.op, kept)
+
+# [END: _drop_bare]
+# [CLASS: Query]
+class Query:
+    """Geparste zoekopdracht; run() voert ze uit tegen een QueryIndex."""
+# [FUNC: __init__]
+    def __init__(self, text: str, root: Optional[Expr]):
+        self.text = text
+        self.root = root
+
+# [END: __init__]
+# [FUNC: __str__]
+    def __str__(self) -> str:
+        return str(self.root) if self.root is not None else "(alles)"
+
+# [END: __str__]
+# [FUNC: positions]
+    def positions(self, index: "QueryIndex") -> Tuple[Union[List[int], range], "Explain"]:
+        """Oplopende rijposities in index.rows (voor facetten/bitmaps), plus het plan."""
+        ex = Explain(str(self))
+        t0 = time.perf_counter()
+        if self.root is None:
+            positions: Union[List[int], range] = range(len(index.rows))
+        else:
+            positions = _Executor(index, ex).eval(self.root)
+            if not isinstance(positions, range):
+                positions = sorted(positions)  # index-volgorde → oorspronkelijke volgorde
+        ex.total = time.perf_counter() - t0
+        ex.result = len(positions)
+        return positions, ex
+
+# [END: positions]
+# [FUNC: run]
+    def run(self, index: "QueryIndex") -> Tuple[List[Dict[str, Any]], "Explain"]:
+        positions, ex = self.positions(index)
+        rows = index.rows
+        if self.root is None:
+            return rows, ex
+        return [rows[p] for p in positions], ex
+
+# [END: run]
+# [END: Query]
+# [FUNC: parse_query]
+def parse_query(text: str, qty_key: str = "_qty", bare_words: bool = True) -> Optional[Query]:
+    """
+    Parse een zoekopdracht. qty_key vervangt de rijsleutel van 'voorraad' (magazijnpartitie).
+    bare_words=False (portaal): losse woorden zijn vultekst ("kijk hoeveel ... van");
+    None als er dan geen veld of "zin" overblijft.
+    """
+    tokens = _tokenize(text)
+    if bare_words and _plain_text(tokens):
+        return text_query(text)
+    root = _Parser(tokens).parse()
+    if not bare_words:
+        root = _drop_bare(root)
+        if root is None:
+            return None
+    if qty_key != "_qty":
+        _rekey(root, "_qty", qty_key)
+    return Query(text, root)
+
+# [END: parse_query]
+# [FUNC: _plain_text]
+def _plain_text(tokens: List[Tuple[str, str]]) -> bool:
+    """Enkel losse woorden, geen sleutelwoorden: geen zoektaal, dus de hele tekst als deeltekst."""
+    keywords = KEYWORDS_OR + KEYWORDS_AND + KEYWORDS_NOT
+    return all(kind == "word" and w not in keywords for kind, w in tokens)
+
+# [END: _plain_text]
+# [FUNC: text_query]
+def text_query(text: str) -> Query:
+    """De volledige tekst als één deeltekst-term (zelfde resultaat als search_rows)."""
+    needle = text.strip().lower()
+    return Query(text, Pred("text", "", "in", needle, quoted=True) if needle else None)
+
+# [END: text_query]
+# [FUNC: _rekey]
+def _rekey(expr: Optional[Expr], old: str, new: str):
+    if isinstance(expr, Pred):
+        if expr.key == old:
+            expr.key = new
+    elif expr is not None:
+        for c in expr.children:
+            _rekey(c, old, new)
+
+# [END: _rekey]
+# [CLASS: QueryIndex]
+class QueryIndex:
+    """
+    Indexen over één vaste lijst rijen, per veld lui opgebouwd bij het eerste gebruik:
+    - num: rijposities gesorteerd op waarde (bisect voor bereik/vergelijking)
+    - eq/cat/route: waarde (kleine letters) → rijposities
+    Hoort bij precies één lijst; bij herladen of andere partitie een nieuwe maken.
+    """
+# [FUNC: __init__]
+    def __init__(self, rows: List[Dict[str, Any]], route_cols: Optional[List[str]] = None):
+        self.rows = rows
+        if route_cols is None:
+            route_cols = [k for k in (rows[0].keys() if rows else []) if re.fullmatch(r"Route \d+", str(k))]
+        self.route_cols = route_cols
+        self._num: Dict[str, Tuple[List[float], List[int]]] = {}
+        self._eq: Dict[Tuple[str, str], Dict[str, List[int]]] = {}
+        self.build_time = 0.0  # opbouwtijd van de laatst gebruikte nieuwe index (voor explain)
+
+# [END: __init__]
+# [FUNC: _num_index]
+    def _num_index(self, key: str) -> Tuple[List[float], List[int]]:
+        idx = self._num.get(key)
+        if idx is None:
+            t0 = time.perf_counter()
+            vals = [float(r.get(key, 0) or 0) for r in self.rows]
+            order = sorted(range(len(vals)), key=vals.__getitem__)
+            idx = self._num[key] = ([vals[i] for i in order], order)
+            self.build_time += time.perf_counter() - t0
+        return idx
+
+# [END: _num_index]
+# [FUNC: _eq_index]
+    def _eq_index(self, kind: str, key: str) -> Dict[str, List[int]]:
+        idx = self._eq.get((kind, key))
+        if idx is None:
+            t0 = time.perf_counter()
+            idx = {}
+            cols = self.route_cols if kind == "route" else [key]
+            for i, r in enumerate(self.rows):
+                seen = set()
+                for c in cols:
+                    v = str(r.get(c) or "").strip().lower()
+                    if not v:
+                        continue
+                    seen.add(v)
+                    if kind == "cat" and " / " in v:
+                        seen.add(v.rsplit(" / ", 1)[1])  # laatste niveau van "All / Saleable / X"
+                for v in seen:
+                    lst = idx.get(v)
+                    if lst is None:
+                        idx[v] = [i]
+                    else:
+                        lst.append(i)
+            self._eq[(kind, key)] = idx
+            self.build_time += time.perf_counter() - t0
+        return idx
+
+# [END: _eq_index]
+# [FUNC: _num_bounds]
+    def _num_bounds(self, p: Pred) -> Tuple[int, int]:
+        vals, _ = self._num_index(p.key)
+        v = p.value
+        if p.op == "<":
+            return 0, bisect_left(vals, v)
+        if p.op == "<=":
+            return 0, bisect_right(vals, v)
+        if p.op == ">":
+            return bisect_right(vals, v), len(vals)
+        if p.op == ">=":
+            return bisect_left(vals, v), len(vals)
+        if p.op == "..":
+            return bisect_left(vals, v), bisect_right(vals, p.hi)
+        return bisect_left(vals, v), bisect_right(vals, v)  # '='
+
+# [END: _num_bounds]
+# [FUNC: indexable]
+    def indexable(self, p: Pred) -> bool:
+        return p.kind in ("num", "eq", "cat") or (p.kind == "route" and bool(self.route_cols))
+
+# [END: indexable]
+# [FUNC: estimate]
+    def estimate(self, p: Pred) -> Optional[int]:
+        """Exact aantal treffers volgens de index, of None als er geen index voor is."""
+        if not self.indexable(p):
+            return None
+        if p.kind == "num":
+            lo, hi = self._num_bounds(p)
+            return max(0, hi - lo)
+        return len(self._eq_index(p.kind, p.key).get(p.value, ()))
+
+# [END: estimate]
+# [FUNC: lookup]
+    def lookup(self, p: Pred) -> List[int]:
+        if p.kind == "num":
+            lo, hi = self._num_bounds(p)
+            return self._num_index(p.key)[1][lo:hi]
+        return self._eq_index(p.kind, p.key).get(p.value, [])
+
+# [END: lookup]
+# [FUNC: matcher]
+    def matcher(self, expr: Expr) -> Callable[[Dict[str, Any]], bool]:
+        """Rij → bool voor een voorwaarde of boom (voor kandidaten en volledige scans)."""
+        if isinstance(expr, Node):
+            subs = [self.matcher(c) for c in expr.children]
+            if expr.op == "NOT":
+                m = subs[0]
+                return lambda r: not m(r)
+            if expr.op == "AND":
+                return lambda r: all(m(r) for m in subs)
+            return lambda r: any(m(r) for m in subs)
+        p = expr
+        v, key = p.value, p.key
+        if p.kind == "text":
+            return lambda r: (v in str(r.get("_name", "")).lower()
+                              or v in str(r.get("_sku", "")).lower()
+                              or v in str(r.get("_barcode", "")).lower())
+        if p.kind == "contains":
+            return lambda r: v in str(r.get(key) or "").lower()
+        if p.kind == "eq":
+            return lambda r: str(r.get(key) or "").strip().lower() == v
+        if p.kind == "cat":
+            def cat(r):
+                s = str(r.get(key) or "").strip().lower()
+                return s == v or s.endswith(" / " + v)
+            return cat
+        if p.kind == "route":
+            cols = self.route_cols
+            return lambda r: any(str(r.get(c) or "").strip().lower() == v for c in cols)
+        hi = p.hi
+        num = lambda r: float(r.get(key, 0) or 0)
+        return {
+            "<": lambda r: num(r) < v, "<=": lambda r: num(r) <= v,
+            ">": lambda r: num(r) > v, ">=": lambda r: num(r) >= v,
+            "=": lambda r: num(r) == v, "..": lambda r: v <= num(r) <= hi,
+        }[p.op]
+
+# [END: matcher]
+# [END: QueryIndex]
+# [CLASS: Explain]
+class Explain:
+    """Gekozen plan + tijd per stap; str() geeft een leesbaar overzicht."""
+# [FUNC: __init__]
+    def __init__(self, query: str):
+        self.query = query
+        self.steps: List[Dict[str, Any]] = []
+        self.total = 0.0
+        self.result = 0
+
+# [END: __init__]
+# [FUNC: add]
+    def add(self, depth: int, action: str, what: str, rows_in: Optional[int], rows_out: int,
+            seconds: float, note: str = ""):
+        self.steps.append({"depth": depth, "action": action, "what": what, "in": rows_in,
+                           "out": rows_out, "ms": seconds * 1000.0, "note": note})
+
+# [END: add]
+# [FUNC: __str__]
+    def __str__(self) -> str:
+        lines = [f"Zoekopdracht: {self.query}"]
+        for n, s in enumerate(self.steps, 1):
+            flow = f"{s['in']} → {s['out']}" if s["in"] is not None else f"→ {s['out']}"
+            line = f"{'  ' * s['depth']}{n}. {s['action']:<6} {s['what']}  [{flow} rijen, {s['ms']:.2f} ms]"
+            if s["note"]:
+                line += f"  ({s['note']})"
+            lines.append(line)
+        lines.append(f"Resultaat: {self.result} rijen in {self.total * 1000.0:.2f} ms")
+        return "\n".join(lines)
+
+# [END: __str__]
+# [END: Explain]
+# [CLASS: _Executor]
+class _Executor:
+    """Voert een boom uit: index-toegang waar mogelijk, anders filteren/scannen."""
+# [FUNC: __init__]
+    def __init__(self, index: QueryIndex, explain: Explain):
+        self.index = index
+        self.ex = explain
+
+# [END: __init__]
+# [FUNC: estimate]
+    def estimate(self, expr: Expr) -> Optional[int]:
+        """Bovengrens van het aantal treffers via indexen (None = enkel via scan)."""
+        if isinstance(expr, Pred):
+            return self.index.estimate(expr)
+        if expr.op == "AND":
+            ests = [e for e in (self.estimate(c) for c in expr.children) if e is not None]
+            return min(ests) if ests else None
+        if expr.op == "OR":
+            ests = [self.estimate(c) for c in expr.children]
+            return None if any(e is None for e in ests) else min(len(self.index.rows), sum(ests))
+        return None
+
+# [END: estimate]
+# [FUNC: _timed_estimate]
+    def _timed_estimate(self, expr: Expr) -> Optional[int]:
+        # opbouw van een nieuwe index apart tonen, niet meetellen als zoektijd
+        before = self.index.build_time
+        est = self.estimate(expr)
+        built = self.index.build_time - before
+        if built > 0:
+            self.ex.add(0, "index", f"opbouw voor {expr}", None, len(self.index.rows), built)
+        return est
+
+# [END: _timed_estimate]
+# [FUNC: eval]
+    def eval(self, expr: Expr, depth: int = 0) -> Union[List[int], range]:
+        index, ex = self.index, self.ex
+        n_all = len(index.rows)
+
+        if isinstance(expr, Pred) and self._timed_estimate(expr) is not None:
+            t0 = time.perf_counter()
+            pos = index.lookup(expr)
+            ex.add(depth, "index", str(expr), None, len(pos), time.perf_counter() - t0)
+            return pos
+
+        if isinstance(expr, Node) and expr.op == "AND":
+            ests = [(self._timed_estimate(c), i) for i, c in enumerate(expr.children)]
+            usable = [(e, i) for e, i in ests if e is not None]
+            if usable:
+                best_est, best = min(usable)
+                others = ", ".join(f"{expr.children[i]} ~{e}" for e, i in usable if i != best)
+                ex.add(depth, "kies", str(expr.children[best]), None, best_est, 0.0,
+                       f"meest selectief; alternatieven: {others}" if others else "enige index")
+                pos = self.eval(expr.children[best], depth + 1)
+                rest = [c for i, c in enumerate(expr.children) if i != best]
+            else:
+                pos, rest = range(n_all), list(expr.children)
+            # goedkope voorwaarden eerst: getallen/gelijkheid vóór deeltekst
+            rest.sort(key=lambda c: 0 if isinstance(c, Pred) and c.kind in ("num", "eq", "cat", "route")
+                      else 1 if isinstance(c, Pred) else 2)
+            rows = index.rows
+            for c in rest:
+                t0 = time.perf_counter()
+                m = index.matcher(c)
+                n_in = len(pos)
+                pos = [p for p in pos if m(rows[p])]
+                ex.add(depth, "filter" if n_in < n_all or usable else "scan", str(c), n_in, len(pos),
+                       time.perf_counter() - t0)
+            return pos
+
+        if isinstance(expr, Node) and expr.op == "OR" and self._timed_estimate(expr) is not None:
+            t0 = time.perf_counter()
+            merged: set = set()
+            for c in expr.children:
+                merged.update(self.eval(c, depth + 1))
+            ex.add(depth, "union", str(expr), None, len(merged), time.perf_counter() - t0)
+            return list(merged)
+
+        # geen bruikbare index: volledige scan
+        t0 = time.perf_counter()
+        m = index.matcher(expr)
+        rows = index.rows
+        pos = [i for i in range(n_all) if m(rows[i])]
+        ex.add(depth, "scan", str(expr), n_all, len(pos), time.perf_counter() - t0)
+        return pos
+
+# [END: eval]
+# [END: _Executor]
+# [FUNC: run_query]
+def run_query(index: QueryIndex, text: str, qty_key: str = "_qty") -> Tuple[List[Dict[str, Any]], Explain]:
+    """Parse + uitvoeren in één stap; QueryError bij een ongeldige opdracht."""
+    q = parse_query(text, qty_key)
+    return q.run(index)
+
+# [END: run_query]
@@ -0,0 +1,316 @@
+# core/replenish.py
+# Bestelvoorstellen (aanvulplanning) over de hele catalogus: per product een voorgestelde
+# bestelhoeveelheid uit aanwezige en virtuele voorraad en een min/max per Productcategorie
+# en route, gegroepeerd per leverancier met de bestelwaarde aan Kostprijs.
+#
+# Regel zoals een Odoo-aanvulregel: zakt de verwachte voorraad (virtueel = aanwezig + in -
+# uit) onder min, dan bestellen tot max (naar boven afgerond op hele stuks). Producten met
+# een productieroute komen onder "(productie)" i.p.v. een leverancier; diensten en producten
+# met enkel dropship/maken-op-order worden niet aangevuld.
+#
+# Zoals core/pivot.py kolomsgewijs: bij het eerste gebruik worden voorraad, virtuele voorraad
+# en kostprijs één keer als array('d') klaargezet, gesorteerd per blok (leverancier,
+# categorie, route). Binnen een blok geldt één min/max, dus een planning is per blok een paar
+# map/compress-doorgangen in C; parameters wijzigen herrekent enkel die doorgangen.
+
+# [SECTION: Imports]
+import json, logging, time
+from array import array
+from collections import deque
+from itertools import compress, repeat
+from math import ceil
+from operator import and_, mul
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple, Sequence, Hashable
+
+from core.formatting import format_bool
+from core.products import DATA_DIR, MIN_STOCK
+
+# [END: Imports]
+DEFAULT_POLICY_PATH = DATA_DIR / "replenish.json"
+DEFAULT_MAX = 2 * MIN_STOCK
+ANY = "*"                                   # jokerteken voor categorie of route in een regel
+CATEGORY_SEP = " / "
+
+# routenamen (Odoo NL/EN), hoofdletterongevoelig
+BUY_ROUTES = ("kopen", "buy", "inkopen")
+MANUFACTURE_ROUTES = ("produceren", "manufacture", "productie")
+ON_DEMAND_ROUTES = ("dropship", "maken op order", "make to order", "replenish on order (mto)")
+SKIP_TYPES = ("dienst", "service")
+
+NO_SUPPLIER = "(geen leverancier)"
+PRODUCTION = "(productie)"
+NO_CATEGORY = "(geen)"
+
+PROPOSAL_COLUMNS = [
+    "Leverancier", "Interne referentie", "Naam", "Productcategorie", "Route",
+    "Aanwezige voorraad", "Virtuele voorraad", "Min", "Max", "Te bestellen", "Kostprijs", "Bestelwaarde",
+]
+SUMMARY_COLUMNS = ["Leverancier", "Regels", "Te bestellen", "Bestelwaarde"]
+
+# [CLASS: ReplenishPolicy]
+class ReplenishPolicy:
+    """
+    Min/max per (categorie, route) met een standaard voor de rest. Een regel voor een
+    categorie geldt ook voor haar subcategorieën ("All / Inkt" → "All / Inkt / Zwart");
+    de meest specifieke categorie wint, en binnen een categorie een exacte route boven ANY.
+    use_virtual = verwachte (virtuele) voorraad als basis, anders enkel de aanwezige.
+    """
+# [FUNC: __init__]
+    def __init__(self, default_min: float = MIN_STOCK, default_max: float = DEFAULT_MAX,
+                 rules: Optional[Dict[Tuple[str, str], Tuple[float, float]]] = None, use_virtual: bool = True):
+        self.default_min = float(default_min)
+        self.default_max = float(default_max)
+        self.rules: Dict[Tuple[str, str], Tuple[float, float]] = {
+            k: (float(mn), float(mx)) for k, (mn, mx) in (rules or {}).items()}
+        self.use_virtual = use_virtual
+
+# [END: __init__]
+# [FUNC: rule_for]
+    def rule_for(self, category: str, route: str) -> Tuple[float, float]:
+        """(min, max) voor een categorie en route; max is nooit kleiner dan min."""
+        rules = self.rules
+        if rules:
+            parts = category.split(CATEGORY_SEP) if category else []
+            for cat in [CATEGORY_SEP.join(parts[:i]) for i in range(len(parts), 0, -1)] + [ANY]:
+                hit = rules.get((cat, route)) or rules.get((cat, ANY))
+                if hit is not None:
+                    return hit[0], max(hit[0], hit[1])
+        return self.default_min, max(self.default_min, self.default_max)
+
+# [END: rule_for]
+# [FUNC: key]
+    def key(self) -> Hashable:
+        return (self.default_min, self.default_max, self.use_virtual, tuple(sorted(self.rules.items())))
+
+# [END: key]
+# [FUNC: to_dict]
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "default": {"min": self.default_min, "max": self.default_max},
+            "use_virtual": self.use_virtual,
+            "rules": [{"category": c, "route": r, "min": mn, "max": mx}
+                      for (c, r), (mn, mx) in sorted(self.rules.items())],
+        }
+
+# [END: to_dict]
+# [FUNC: from_dict]
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ReplenishPolicy":
+        default = data.get("default") or {}
+        rules: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        for r in data.get("rules") or []:
+            mn = float(r.get("min", 0))
+            rules[(str(r.get("category") or ANY), str(r.get("route") or ANY))] = (mn, float(r.get("max", mn)))
+        return cls(float(default.get("min", MIN_STOCK)), float(default.get("max", DEFAULT_MAX)),
+                   rules, bool(data.get("use_virtual", True)))
+
+# [END: from_dict]
+# [END: ReplenishPolicy]
+# [FUNC: load_policy]
+def load_policy(path: Path = DEFAULT_POLICY_PATH) -> ReplenishPolicy:
+    """Regels uit JSON (zie ReplenishPolicy.to_dict); ontbreekt het bestand → standaardregel."""
+    if not path.exists():
+        return ReplenishPolicy()
+    return ReplenishPolicy.from_dict(json.loads(path.read_text(encoding="utf-8")))
+
+# [END: load_policy]
+# [FUNC: save_policy]
+def save_policy(policy: ReplenishPolicy, path: Path = DEFAULT_POLICY_PATH):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(policy.to_dict(), ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+
+# [END: save_policy]
+# [FUNC: _supply]
+def _supply(row: Dict[str, Any], route_cols: List[str]) -> Optional[Tuple[str, str]]:
+    """(leverancier, route) waarlangs het product aangevuld wordt, of None (niet aanvullen)."""
+    if str(row.get("Productsoort") or "").strip().lower() in SKIP_TYPES:
+        return None
+    routes = [v for v in (str(row.get(c) or "").strip() for c in route_cols) if v]
+    on_demand = False
+    for route in routes:
+        low = route.lower()
+        if low in MANUFACTURE_ROUTES:
+            return PRODUCTION, route
+        if low in BUY_ROUTES:
+            break
+        on_demand = on_demand or low in ON_DEMAND_ROUTES
+    else:
+        route = routes[0] if routes else ""
+        if on_demand and all(r.lower() in ON_DEMAND_ROUTES for r in routes):
+            return None
+    if format_bool(row.get("Kan gekocht worden", "")) == "✗":
+        return None
+    supplier = str(row.get("Leveranciers") or "").split(",")[0].strip() or NO_SUPPLIER
+    return supplier, route
+
+# [END: _supply]
+# [CLASS: ReplenishPlan]
+class ReplenishPlan:
+    """
+    Resultaat van één planning. Kolomsgewijs (posities in planner.rows en hoeveelheden);
+    rows()/summary_rows() maken er pas rijen van voor tabel of export.
+    """
+# [FUNC: __init__]
+    def __init__(self, planner: "ReplenishPlanner", policy: ReplenishPolicy, positions: array,
+                 quantities: array, segments: List[Tuple[Tuple[str, str, str], int, int, float, float]],
+                 suppliers: Dict[str, Dict[str, float]], considered: int, ms: float):
+        self.planner = planner
+        self.policy = policy
+        self.positions = positions
+        self.quantities = quantities
+        self.segments = segments              # (blok, van, tot, min, max) in positions
+        self.suppliers = suppliers            # leverancier → {"lines", "qty", "value"}
+        self.considered = considered          # producten die aangevuld kunnen worden
+        self.ms = ms
+
+# [END: __init__]
+# [FUNC: totals]
+    @property
+    def totals(self) -> Dict[str, float]:
+        s = self.suppliers.values()
+        return {"lines": sum(v["lines"] for v in s), "qty": sum(v["qty"] for v in s),
+                "value": sum(v["value"] for v in s)}
+
+# [END: totals]
+# [FUNC: rows]
+    def rows(self, supplier: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Bestelregels (PROPOSAL_COLUMNS), per leverancier en binnen een blok in catalogusvolgorde."""
+        p = self.planner
+        out: List[Dict[str, Any]] = []
+        pos, qty = self.positions, self.quantities
+        for (sup, cat, route), lo, hi, mn, mx in self.segments:
+            if supplier is not None and sup != supplier:
+                continue
+            for j in range(lo, hi):
+                i = pos[j]
+                r = p.rows[i]
+                q = qty[j]
+                out.append({
+                    "Leverancier": sup, "Interne referentie": r.get("_sku", ""), "Naam": r.get("_name", ""),
+                    "Productcategorie": cat, "Route": route,
+                    "Aanwezige voorraad": p.qty[i], "Virtuele voorraad": p.qty_virtual[i],
+                    "Min": mn, "Max": mx, "Te bestellen": q, "Kostprijs": p.cost[i],
+                    "Bestelwaarde": q * p.cost[i],
+                })
+        return out
+
+# [END: rows]
+# [FUNC: summary_rows]
+    def summary_rows(self) -> List[Dict[str, Any]]:
+        """Eén regel per leverancier (SUMMARY_COLUMNS)."""
+        return [{"Leverancier": s, "Regels": int(v["lines"]), "Te bestellen": v["qty"], "Bestelwaarde": v["value"]}
+                for s, v in self.suppliers.items()]
+
+# [END: summary_rows]
+# [END: ReplenishPlan]
+# [CLASS: ReplenishPlanner]
+class ReplenishPlanner:
+    """
+    Aanvulplanning over één vaste lijst rijen (een catalogus of magazijnpartitie).
+    qty_key = aanwezige voorraad; virtual = virtuele voorraad uitgelijnd op rows (standaard
+    rij["_qty_virtual"], bij een magazijnpartitie de cijfers van dat magazijn).
+    """
+# [FUNC: __init__]
+    def __init__(self, rows: List[Dict[str, Any]], route_cols: List[str], qty_key: str = "_qty",
+                 virtual: Optional[Sequence[float]] = None):
+        self.rows = rows
+        self.route_cols = route_cols
+        self.qty_key = qty_key
+        t0 = time.perf_counter()
+        self.qty = array("d", [float(r.get(qty_key, 0) or 0) for r in rows])
+        self.qty_virtual = array("d", virtual if virtual is not None
+                                 else [float(r.get("_qty_virtual", 0) or 0) for r in rows])
+        self.cost = array("d", [float(r.get("_cost", 0) or 0) for r in rows])
+
+        # blokken (leverancier, categorie, route), elk een aaneengesloten stuk in order
+        buckets: Dict[Tuple[str, str, str], List[int]] = {}
+        route_cols = self.route_cols
+        for i, r in enumerate(rows):
+            sup = _supply(r, route_cols)
+            if sup is None:
+                continue
+            k = (sup[0], str(r.get("Productcategorie") or "").strip() or NO_CATEGORY, sup[1])
+            lst = buckets.get(k)
+            if lst is None:
+                buckets[k] = [i]
+            else:
+                lst.append(i)
+        self.keys = sorted(buckets, key=lambda k: ((k[0] == NO_SUPPLIER, k[0] == PRODUCTION, k[0].lower()),
+                                                   k[1].lower(), k[2].lower()))
+        self.order, self.bounds = array("I"), array("Q", [0])
+        for k in self.keys:
+            self.order.extend(buckets[k])
+            self.bounds.append(len(self.order))
+        self._cols = {
+            "qty": array("d", map(self.qty.__getitem__, self.order)),
+            "qty_virtual": array("d", map(self.qty_virtual.__getitem__, self.order)),
+            "cost": array("d", map(self.cost.__getitem__, self.order)),
+        }
+        self._pos_of: Optional[Dict[int, int]] = None
+        logging.info(f"Aanvulplanning: {len(self.order)}/{len(rows)} producten in {len(self.keys)} blokken "
+                     f"in {time.perf_counter() - t0:.2f}s")
+
+# [END: __init__]
+# [FUNC: _mask]
+    def _mask(self, subset: List[Dict[str, Any]]) -> bytes:
+        """1 per blokpositie die in het filterresultaat zit (zelfde volgorde als self.order)."""
+        if self._pos_of is None:
+            self._pos_of = {id(r): i for i, r in enumerate(self.rows)}
+        mask = bytearray(len(self.rows))
+        deque(map(mask.__setitem__, map(self._pos_of.__getitem__, map(id, subset)), repeat(1)), maxlen=0)
+        return bytes(map(mask.__getitem__, self.order))
+
+# [END: _mask]
+# [FUNC: plan]
+    def plan(self, policy: ReplenishPolicy, subset: Optional[List[Dict[str, Any]]] = None) -> ReplenishPlan:
+        """
+        Bestelvoorstel voor alle rijen of enkel subset (rijen uit self.rows, bv. het
+        filterresultaat): te bestellen = ceil(max - verwacht) waar verwacht < min.
+        """
+        t0 = time.perf_counter()
+        forecast = self._cols["qty_virtual" if policy.use_virtual else "qty"]
+        cost = self._cols["cost"]
+        order, b = self.order, self.bounds
+        pm = None if subset is None or subset is self.rows or len(subset) == len(self.rows) else self._mask(subset)
+
+        positions, quantities = array("I"), array("d")
+        segments: List[Tuple[Tuple[str, str, str], int, int, float, float]] = []
+        suppliers: Dict[str, Dict[str, float]] = {}
+        rules: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        considered = 0
+        for gi, k in enumerate(self.keys):
+            lo, hi = b[gi], b[gi + 1]
+            rule = rules.get(k[1:])
+            if rule is None:
+                rule = rules[k[1:]] = policy.rule_for(k[1], k[2])
+            mn, mx = rule
+            f = forecast[lo:hi]
+            m = bytes(map(mn.__gt__, f))                       # verwacht < min
+            if pm is not None:
+                sel = pm[lo:hi]
+                considered += sel.count(1)
+                m = bytes(map(and_, m, sel))
+            else:
+                considered += hi - lo
+            n = m.count(1)
+            if not n:
+                continue
+            q = array("d", map(ceil, map(mx.__sub__, compress(f, m))))
+            start = len(positions)
+            positions.extend(compress(order[lo:hi], m))
+            quantities.extend(q)
+            segments.append((k, start, len(positions), mn, mx))
+            s = suppliers.get(k[0])
+            if s is None:
+                s = suppliers[k[0]] = {"lines": 0, "qty": 0.0, "value": 0.0}
+            s["lines"] += n
+            s["qty"] += sum(q)
+            s["value"] += sum(map(mul, q, compress(cost[lo:hi], m)))
+
+        ms = (time.perf_counter() - t0) * 1000.0
+        logging.info(f"Aanvulplanning: {len(positions)} bestelregels bij {len(suppliers)} leveranciers in {ms:.1f} ms")
+        return ReplenishPlan(self, policy, positions, quantities, segments, suppliers, considered, ms)
+
+# [END: plan]
+# [END: ReplenishPlanner]
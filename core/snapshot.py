@@ -0,0 +1,212 @@
+# core/snapshot.py
+# Onveranderlijke, genummerde versies van de dataset.
+#
+# Een Snapshot bundelt de catalogus, het resultaat van een prijsvergelijking (een aparte
+# kolom id(rij) → nieuwe prijs; de rijen zelf worden nooit gewijzigd) en alles wat daaruit
+# afgeleid wordt: zoekindexen, facet-bitmaps, draaitabel, aanvulplanning en weergavetekst,
+# per partitie en lui opgebouwd. Lezers (filters, tabelmodel, slim zoeken, statistieken)
+# nemen één keer een referentie en zien zo altijd één consistente versie.
+#
+# Laden en vergelijken maken in een worker een nieuwe Snapshot; SnapshotStore.publish()
+# wisselt die in één toewijzing in. Een vergelijking deelt de catalogus en alle afgeleide
+# structuren met de vorige versie (enkel de vergelijkingskolommen zijn nieuw), dus ook
+# de weergavetekst van de overige kolommen blijft hergebruikt.
+
+# [SECTION: Imports]
+import logging, threading, time
+from array import array
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Callable
+
+from core.formatting import DisplayCache
+from core.products import Catalog, load_price_map, new_price_column
+from core.partitions import ALL, PartitionedCatalog, load_default_catalog
+from core.query import QueryIndex
+from core.facets import BitmapIndex
+from core.pivot import PivotEngine
+from core.replenish import ReplenishPlanner
+
+# [END: Imports]
+# [CLASS: Snapshot]
+class Snapshot:
+    """
+    Eén versie van de dataset. Niets hierin wordt na publicatie nog gewijzigd, behalve de
+    luie caches van afgeleide structuren (die hangen enkel van deze versie af).
+    """
+# [FUNC: __init__]
+    def __init__(self, catalog: Optional[Catalog], version: int = 0,
+                 price_by_key: Optional[Dict[str, float]] = None, compare_source: str = "",
+                 new_prices: Optional[Dict[int, float]] = None, fmt: Optional[DisplayCache] = None,
+                 derived: Optional[Dict[tuple, Any]] = None):
+        self.catalog = catalog if catalog is not None else Catalog([], {}, [])
+        self.version = version
+        self.price_by_key = price_by_key            # tweede export (om opnieuw toe te passen)
+        self.compare_source = compare_source
+        self.new_prices: Dict[int, float] = new_prices or {}
+        self.fmt = fmt if fmt is not None else DisplayCache(self.new_prices)
+        self._derived: Dict[tuple, Any] = derived if derived is not None else {}
+        self._lock = threading.Lock()
+
+# [END: __init__]
+# [FUNC: rows]
+    @property
+    def rows(self) -> List[Dict[str, Any]]:
+        return self.catalog.rows
+
+# [END: rows]
+# [FUNC: route_cols]
+    @property
+    def route_cols(self) -> List[str]:
+        return self.catalog.route_cols
+
+# [END: route_cols]
+# [FUNC: partitions]
+    @property
+    def partitions(self) -> List[str]:
+        return self.catalog.partitions if isinstance(self.catalog, PartitionedCatalog) else []
+
+# [END: partitions]
+# [FUNC: rows_for]
+    def rows_for(self, partition: str = ALL) -> List[Dict[str, Any]]:
+        if isinstance(self.catalog, PartitionedCatalog):
+            return self.catalog.rows_for(partition)
+        return self.catalog.rows
+
+# [END: rows_for]
+# [FUNC: qty_key]
+    def qty_key(self, partition: str = ALL) -> str:
+        if isinstance(self.catalog, PartitionedCatalog):
+            return self.catalog.qty_key(partition)
+        return "_qty"
+
+# [END: qty_key]
+# [FUNC: totals]
+    def totals(self, partition: str = ALL) -> Optional[Dict[str, float]]:
+        """Vooraf berekende totalen van een volledige partitie (enkel bij magazijnpartities)."""
+        if isinstance(self.catalog, PartitionedCatalog):
+            return self.catalog.totals.get(partition)
+        return None
+
+# [END: totals]
+# [FUNC: _derive]
+    def _derive(self, kind: str, partition: str, build: Callable[[], Any]) -> Any:
+        key = (kind, partition)
+        obj = self._derived.get(key)
+        if obj is None:
+            # één bouwer tegelijk: een worker die vooraf opbouwt en de GUI-thread delen de uitkomst
+            with self._lock:
+                obj = self._derived.get(key)
+                if obj is None:
+                    obj = self._derived[key] = build()
+        return obj
+
+# [END: _derive]
+# [FUNC: query_index]
+    def query_index(self, partition: str = ALL) -> QueryIndex:
+        return self._derive("query", partition, lambda: QueryIndex(self.rows_for(partition), self.route_cols))
+
+# [END: query_index]
+# [FUNC: facets]
+    def facets(self, partition: str = ALL) -> BitmapIndex:
+        return self._derive("facets", partition, lambda: BitmapIndex(self.rows_for(partition), self.route_cols))
+
+# [END: facets]
+# [FUNC: pivot_engine]
+    def pivot_engine(self, partition: str = ALL) -> PivotEngine:
+        return self._derive("pivot", partition, lambda: PivotEngine(
+            self.rows_for(partition), self.route_cols, self.qty_key(partition)))
+
+# [END: pivot_engine]
+# [FUNC: replenish_planner]
+    def replenish_planner(self, partition: str = ALL) -> ReplenishPlanner:
+        return self._derive("replenish", partition, lambda: ReplenishPlanner(
+            self.rows_for(partition), self.route_cols, self.qty_key(partition), self._virtual(partition)))
+
+# [END: replenish_planner]
+# [FUNC: _virtual]
+    def _virtual(self, partition: str) -> Optional[array]:
+        """Virtuele voorraad van één magazijn, uitgelijnd op rows_for(partition); None = rij["_qty_virtual"]."""
+        cat = self.catalog
+        if not isinstance(cat, PartitionedCatalog) or partition == ALL:
+            return None
+        pos = {id(r): i for i, r in enumerate(cat.rows)}
+        vq = cat.qty_virtual[partition]
+        return array("d", [vq[pos[id(r)]] for r in cat.rows_for(partition)])
+
+# [END: _virtual]
+# [FUNC: with_prices]
+    def with_prices(self, price_by_key: Optional[Dict[str, float]], source: str = "") -> "Snapshot":
+        """
+        Nieuwe versie met (of zonder, bij None) een prijsvergelijking. Catalogus, indexen en de
+        weergavetekst van alle andere kolommen worden gedeeld, niet gekopieerd.
+        """
+        new_prices = new_price_column(self.rows, price_by_key) if price_by_key else {}
+        return Snapshot(self.catalog, self.version + 1, price_by_key, source, new_prices,
+                        self.fmt.fork(new_prices), self._derived)
+
+# [END: with_prices]
+# [END: Snapshot]
+# [CLASS: SnapshotStore]
+class SnapshotStore:
+    """
+    Houdt de actuele Snapshot bij. current() is één attribuutlezing; publish() vervangt de
+    versie in één toewijzing, dus een lezer ziet nooit een half ingewisselde dataset.
+    """
+# [FUNC: __init__]
+    def __init__(self, snapshot: Optional[Snapshot] = None):
+        self._lock = threading.Lock()
+        self._current = snapshot if snapshot is not None else Snapshot(None)
+
+# [END: __init__]
+# [FUNC: current]
+    def current(self) -> Snapshot:
+        return self._current
+
+# [END: current]
+# [FUNC: publish]
+    def publish(self, snapshot: Snapshot, base: Optional[Snapshot] = None) -> Snapshot:
+        """
+        Wissel snapshot in. base = de versie waarop snapshot gebaseerd is; is er intussen een
+        andere gepubliceerd (bv. herladen tijdens een vergelijking), dan wordt de vergelijking
+        op die nieuwere versie opnieuw toegepast i.p.v. ze terug te draaien.
+        """
+        with self._lock:
+            cur = self._current
+            if base is not None and cur is not base and snapshot.catalog is base.catalog:
+                snapshot = cur.with_prices(snapshot.price_by_key, snapshot.compare_source)
+            snapshot.version = max(snapshot.version, cur.version + 1)
+            self._current = snapshot
+        logging.info(f"Dataset versie {snapshot.version}: {len(snapshot.rows)} producten"
+                     + (f", vergeleken met {snapshot.compare_source}" if snapshot.compare_source else ""))
+        return snapshot
+
+# [END: publish]
+# [END: SnapshotStore]
+# [FUNC: load_snapshot]
+def load_snapshot(previous: Optional[Snapshot] = None, prebuild: bool = True, **kwargs) -> Snapshot:
+    """
+    Catalogus laden (load_default_catalog) als nieuwe versie; een lopende prijsvergelijking
+    van previous blijft behouden. prebuild = facet-bitmaps van de volledige set meteen
+    opbouwen (in de worker, niet bij de eerste filter in de GUI-thread).
+    """
+    t0 = time.perf_counter()
+    catalog = load_default_catalog(**kwargs)
+    version = previous.version + 1 if previous is not None else 1
+    snap = Snapshot(catalog, version)
+    if previous is not None and previous.price_by_key:
+        snap = snap.with_prices(previous.price_by_key, previous.compare_source)
+    if prebuild and catalog.rows:
+        snap.facets(ALL)
+    logging.info(f"Snapshot opgebouwd in {time.perf_counter() - t0:.2f}s")
+    return snap
+
+# [END: load_snapshot]
+# [FUNC: compare_snapshot]
+def compare_snapshot(base: Snapshot, path: Path) -> Snapshot:
+    """Tweede export inlezen en als vergelijking bovenop base zetten (zonder base te wijzigen)."""
+    price_by_key = load_price_map(path)
+    if not price_by_key:
+        raise ValueError("Geen rijen in tweede export.")
+    return base.with_prices(price_by_key, path.name)
+
+# [END: compare_snapshot]
@@ -0,0 +1,57 @@
+# tests/test_api.py
+# API: een trage cache-miss houdt andere verbindingen niet tegen.
+
+# [SECTION: Imports]
+import asyncio, threading, time
+
+from core.api import CatalogAPI, serve
+
+# [END: Imports]
+# [FUNC: _get]
+async def _get(port: int, target: str) -> bytes:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET {target} HTTP/1.1\r\nConnection: close\r\n\r\n".encode("latin-1"))
+    data = await reader.read()
+    writer.close()
+    return data
+
+# [END: _get]
+# [FUNC: test_slow_request_does_not_block_others]
+def test_slow_request_does_not_block_others():
+    api = CatalogAPI([{"_id": "1", "_name": "Hamer", "_sku": "H1", "_price": 5.0}])
+    release = threading.Event()
+    route = api._route
+
+    def slow_route(target, state):
+        if target.startswith("/stats"):
+            release.wait(5)
+        return route(target, state)
+
+    api._route = slow_route
+
+    async def run():
+        server = await serve(api, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            slow = asyncio.ensure_future(_get(port, "/stats"))
+            t0 = time.perf_counter()
+            health = await asyncio.wait_for(_get(port, "/health"), 2)
+            fast = time.perf_counter() - t0
+            release.set()
+            return health, await slow, fast
+
+    health, stats, fast = asyncio.run(run())
+    assert health.startswith(b"HTTP/1.1 200") and stats.startswith(b"HTTP/1.1 200")
+    assert fast < 2
+
+# [END: test_slow_request_does_not_block_others]
+# [FUNC: test_cached_only_answers_hits]
+def test_cached_only_answers_hits():
+    api = CatalogAPI([{"_id": "1", "_name": "Hamer", "_sku": "H1"}])
+    assert api.cached("GET", "/products?q=hamer") is None
+    status, body, etag = api.handle("GET", "/products?q=hamer")
+    assert api.cached("GET", "/products?q=hamer") == (status, body, etag)
+    assert api.cached("GET", "/products?q=hamer", etag)[0] == 304
+    assert api.cached("POST", "/health")[0] == 405
+
+# [END: test_cached_only_answers_hits]
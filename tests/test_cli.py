@@ -0,0 +1,24 @@
+# tests/test_cli.py
+# Headless CLI: een afgebroken pipe (`| head -1`) stopt stil, zonder traceback.
+
+# [SECTION: Imports]
+import subprocess, sys
+from pathlib import Path
+
+# [END: Imports]
+ROOT = Path(__file__).resolve().parent.parent
+
+# [FUNC: test_broken_pipe_exits_quietly]
+def test_broken_pipe_exits_quietly(tmp_path):
+    csv_path = tmp_path / "big.csv"
+    lines = ["ID;Naam;Interne referentie;Verkoopprijs"] + [f"{i};Product {i};SKU{i};{i % 100},50" for i in range(50000)]
+    csv_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    proc = subprocess.Popen([sys.executable, str(ROOT / "cli.py"), "search", "", "--csv", str(csv_path)],
+                            cwd=tmp_path, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    assert proc.stdout.readline().startswith(b"Naam;")
+    proc.stdout.close()
+    err = proc.stderr.read().decode("utf-8", "replace")
+    assert proc.wait(timeout=60) == 1
+    assert "Traceback" not in err
+
+# [END: test_broken_pipe_exits_quietly]
@@ -0,0 +1,41 @@
+# tests/test_columnar.py
+# Een verouderd products.parquet mag een nieuwere (gecomprimeerde) CSV of XLSX niet verbergen.
+
+# [SECTION: Imports]
+import gzip, os
+
+import pytest
+
+from core.columnar import columnar_sibling
+
+# [END: Imports]
+OLD = 1577836800  # 2020-01-01
+
+# [FUNC: _touch]
+def _touch(path, mtime=None):
+    path.write_bytes(b"")
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+# [END: _touch]
+# [FUNC: test_older_columnar_ignored]
+@pytest.mark.parametrize("export", ["products.csv", "products.csv.gz", "products.xlsx"])
+def test_older_columnar_ignored(tmp_path, export):
+    _touch(tmp_path / "products.parquet", OLD)
+    if export.endswith(".gz"):
+        with gzip.open(tmp_path / export, "wb") as f:
+            f.write(b"Naam\n")
+    else:
+        _touch(tmp_path / export)
+    assert columnar_sibling(tmp_path / "products.csv", tmp_path / "products.xlsx") is None
+
+# [END: test_older_columnar_ignored]
+# [FUNC: test_newer_columnar_used]
+def test_newer_columnar_used(tmp_path):
+    _touch(tmp_path / "products.csv.gz", OLD)
+    _touch(tmp_path / "products.parquet")
+    assert columnar_sibling(tmp_path / "products.csv", tmp_path / "products.xlsx") == tmp_path / "products.parquet"
+    (tmp_path / "products.csv.gz").unlink()
+    assert columnar_sibling(tmp_path / "products.csv") == tmp_path / "products.parquet"
+
+# [END: test_newer_columnar_used]
@@ -0,0 +1,54 @@
+# tests/test_compression.py
+# Gecomprimeerde exports: extensies herkennen, encoding/scheidingsteken snuffelen en
+# terugvallen op een andere encoding als die pas na het gesnuffelde begin fout blijkt.
+
+# [SECTION: Imports]
+import bz2, gzip, lzma
+from pathlib import Path
+
+import pytest
+
+from core.compression import (
+    SNIFF_BYTES, compression_of, export_stem, inner_suffix, read_csv_compressed, sniff_prefix,
+)
+
+# [END: Imports]
+# [FUNC: test_suffixes]
+@pytest.mark.parametrize("name, comp, inner, stem", [
+    ("oost.csv.gz", ".gz", ".csv", "oost"),
+    ("oost.CSV.XZ", ".xz", ".csv", "oost"),
+    ("oost.csv.zst", ".zst", ".csv", "oost"),
+    ("oost.csv", None, ".csv", "oost"),
+    ("oost.xlsx", None, ".xlsx", "oost"),
+])
+def test_suffixes(name, comp, inner, stem):
+    p = Path(name)
+    assert (compression_of(p), inner_suffix(p), export_stem(p)) == (comp, inner, stem)
+
+# [END: test_suffixes]
+# [FUNC: test_sniff_prefix]
+def test_sniff_prefix():
+    assert sniff_prefix("ID;Naam\n1;Café\n".encode("utf-8")) == {"encoding": "utf-8", "delimiter": ";"}
+    assert sniff_prefix(b"\xef\xbb\xbfID,Naam\n1,Hamer\n") == {"encoding": "utf-8-sig", "delimiter": ","}
+    assert sniff_prefix("ID;Naam\n1;Café\n".encode("cp1252"))["encoding"] == "cp1252"
+    # een UTF-8-teken dat op de grens van het snuffelblok afgebroken wordt, is geen vals alarm
+    prefix = ("ID;Naam\n" + "1;é\n" * SNIFF_BYTES).encode("utf-8")[:SNIFF_BYTES]
+    assert prefix.endswith(b"\xc3")
+    assert sniff_prefix(prefix)["encoding"] == "utf-8"
+
+# [END: test_sniff_prefix]
+# [FUNC: test_encoding_fallback_after_sniff]
+@pytest.mark.parametrize("suffix, opener", [(".gz", gzip.open), (".bz2", bz2.open), (".xz", lzma.open)])
+@pytest.mark.parametrize("threaded", [True, False])
+def test_encoding_fallback_after_sniff(tmp_path, suffix, opener, threaded):
+    # het begin is zuiver ASCII (gesnuffeld als utf-8), de cp1252-bytes komen pas verderop
+    lines = ["ID;Naam"] + [f"{i};Product {i}" for i in range(2 * SNIFF_BYTES // 10)] + ["9999;Café crème"]
+    path = tmp_path / f"products.csv{suffix}"
+    with opener(path, "wb") as f:
+        f.write(("\n".join(lines) + "\n").encode("cp1252"))
+    rows = read_csv_compressed(path, threaded=threaded)
+    assert len(rows) == len(lines) - 1
+    assert rows[0] == {"ID": "0", "Naam": "Product 0"}
+    assert rows[-1] == {"ID": "9999", "Naam": "Café crème"}
+
+# [END: test_encoding_fallback_after_sniff]
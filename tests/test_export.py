@@ -0,0 +1,44 @@
+# tests/test_export.py
+# Export: afbreken wordt expliciet gemeld (ook precies op de laatste rij), ook voor Parquet/Arrow.
+
+# [SECTION: Imports]
+import pytest
+
+from core.export import PROGRESS_EVERY, ExportCancelled, export_rows
+
+# [END: Imports]
+# [FUNC: test_cancel_on_last_row_is_reported]
+def test_cancel_on_last_row_is_reported(tmp_path):
+    rows = [{"_name": f"P{i}", "Naam": f"P{i}"} for i in range(PROGRESS_EVERY)]
+    out = tmp_path / "export.csv"
+    with pytest.raises(ExportCancelled) as exc:
+        export_rows(rows, ["Naam"], out, cancelled=lambda: True)
+    assert exc.value.rows == PROGRESS_EVERY
+    assert not out.exists()
+
+    assert export_rows(rows, ["Naam"], out, cancelled=lambda: False) == PROGRESS_EVERY
+    assert len(out.read_text(encoding="utf-8-sig").splitlines()) == PROGRESS_EVERY + 1
+
+# [END: test_cancel_on_last_row_is_reported]
+# [FUNC: test_columnar_export_streams_and_cancels]
+@pytest.mark.parametrize("suffix", [".parquet", ".arrow"])
+def test_columnar_export_streams_and_cancels(tmp_path, suffix):
+    pytest.importorskip("pyarrow")
+    from core.columnar import read_catalog
+
+    rows = [{"_name": f"P{i}", "Naam": f"P{i}", "Verkoopprijs": float(i)} for i in range(2 * PROGRESS_EVERY + 10)]
+    out = tmp_path / f"export{suffix}"
+    seen = []
+    with pytest.raises(ExportCancelled) as exc:
+        export_rows(rows, ["Naam", "Verkoopprijs"], out, progress=lambda n, t: seen.append(n),
+                    cancelled=lambda: len(seen) >= 2)
+    assert exc.value.rows == 2 * PROGRESS_EVERY and seen == [PROGRESS_EVERY, 2 * PROGRESS_EVERY]
+    assert not out.exists()
+
+    assert export_rows(rows, ["Naam", "Verkoopprijs"], out) == len(rows)
+    back = read_catalog(out).rows
+    assert len(back) == len(rows)
+    last = len(rows) - 1
+    assert (back[-1]["Naam"], back[-1]["_price"]) == (f"P{last}", float(last))
+
+# [END: test_columnar_export_streams_and_cancels]
@@ -0,0 +1,48 @@
+# tests/test_facets.py
+# Facet-bitmaps: rijposities ↔ bitset heen en terug, en tellen per waarde.
+
+# [SECTION: Imports]
+import pytest
+
+from core.facets import NONE_LABEL, ROUTE_FACET, BitmapIndex
+
+# [END: Imports]
+# [FUNC: _index]
+def _index(n: int = 70) -> BitmapIndex:
+    rows = [{"Productsoort": "Dienst" if i % 3 == 0 else "Goed", "Route 1": "Kopen" if i % 2 else "",
+             "Route 2": "Dropship" if i % 5 == 0 else ""} for i in range(n)]
+    return BitmapIndex(rows, ["Route 1", "Route 2"])
+
+# [END: _index]
+# [FUNC: test_positions_round_trip]
+@pytest.mark.parametrize("positions", [
+    [], [0], [69], [0, 1, 2], [3, 64, 65, 69], list(range(0, 70, 7)), range(10, 20), range(70),
+])
+def test_positions_round_trip(positions):
+    idx = _index()
+    bits = idx.from_positions(positions)
+    assert [i for i in range(idx.n) if bits >> i & 1] == list(positions)
+    assert idx.rows_of(bits) == [idx.rows[i] for i in positions]
+    assert list(idx.flags(bits)) == [1 if i in positions else 0 for i in range(idx.n)]
+
+# [END: test_positions_round_trip]
+# [FUNC: test_all_rows_is_the_list_itself]
+def test_all_rows_is_the_list_itself():
+    idx = _index()
+    assert idx.rows_of(idx.from_positions(range(idx.n))) is idx.rows
+    assert idx.rows_of(0) == []
+
+# [END: test_all_rows_is_the_list_itself]
+# [FUNC: test_select_and_counts]
+def test_select_and_counts():
+    idx = _index()
+    routes = idx.bitmaps[ROUTE_FACET]
+    # (geen) = rijen zonder enige route
+    assert routes[NONE_LABEL] == idx.from_positions([i for i in range(70) if i % 2 == 0 and i % 5])
+    bits = idx.select({ROUTE_FACET: {"Kopen", "Dropship"}, "Productsoort": {"Goed"}})
+    assert idx.rows_of(bits) == [r for i, r in enumerate(idx.rows) if (i % 2 or i % 5 == 0) and i % 3]
+    counts = idx.counts({"Productsoort": {"Goed"}})
+    assert counts["Productsoort"] == {"Dienst": 24, "Goed": 46}
+    assert counts[ROUTE_FACET]["Kopen"] == len([i for i in range(70) if i % 2 and i % 3])
+
+# [END: test_select_and_counts]
@@ -0,0 +1,25 @@
+# tests/test_formatting.py
+# Weergavecache: fork() deelt de gewone kolommen maar niet de vergelijkingskolommen.
+
+# [SECTION: Imports]
+from core.formatting import DELTA_COL, NEW_PRICE_COL, DisplayCache
+
+# [END: Imports]
+# [FUNC: test_fork_does_not_share_compare_cols]
+def test_fork_does_not_share_compare_cols():
+    row = {"_price": 10.0, "Naam": "Hamer"}
+    cache = DisplayCache({id(row): 12.5})
+    assert cache.texts(row, ["Naam", NEW_PRICE_COL, DELTA_COL]) == ["Hamer", "12.50", "+2.50"]
+
+    forked = cache.fork({id(row): 8.0})
+    assert forked.texts(row, [NEW_PRICE_COL, DELTA_COL]) == ["8.00", "-2.00"]
+    # de oorspronkelijke cache houdt haar eigen vergelijking
+    assert cache.texts(row, [NEW_PRICE_COL, DELTA_COL]) == ["12.50", "+2.50"]
+    # gewone kolommen: hetzelfde memo
+    assert forked._cols["Naam"] is cache._cols["Naam"]
+    assert forked._cols[NEW_PRICE_COL] is not cache._cols[NEW_PRICE_COL]
+
+    # zonder vergelijking: lege vergelijkingskolommen
+    assert cache.fork(None).texts(row, [NEW_PRICE_COL, DELTA_COL]) == ["", ""]
+
+# [END: test_fork_does_not_share_compare_cols]
@@ -0,0 +1,29 @@
+# tests/test_history.py
+# Historiek: na heropenen is de toestand exact, dus dezelfde export opnieuw = 0 wijzigingen.
+
+# [SECTION: Imports]
+import random
+
+from core.history import HistoryStore
+
+# [END: Imports]
+# [FUNC: _rows]
+def _rows(rnd: random.Random, n: int):
+    return [{"_id": f"p{i}", "_price": round(rnd.uniform(1, 500), 2), "_cost": round(rnd.uniform(1, 300), 2),
+             "_qty": float(rnd.randint(0, 40)), "_qty_virtual": float(rnd.randint(-5, 50))} for i in range(n)]
+
+# [END: _rows]
+# [FUNC: test_reopen_and_reingest_writes_no_changes]
+def test_reopen_and_reingest_writes_no_changes(tmp_path):
+    rnd = random.Random(7)
+    store = HistoryStore(tmp_path)
+    rows = []
+    for day in range(1, 20):
+        rows = _rows(rnd, 2000)
+        store.ingest(rows, f"2026-01-{day:02d}", "test")
+
+    reopened = HistoryStore(tmp_path)
+    assert reopened.ingest(rows, "2026-02-01", "test") == 0
+    assert reopened.current("p0")["price"] == rows[0]["_price"]
+
+# [END: test_reopen_and_reingest_writes_no_changes]
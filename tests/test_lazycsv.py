@@ -0,0 +1,74 @@
+# tests/test_lazycsv.py
+# Luie CSV: de facetkolommen komen uit RAM, zonder records via de LRU te decoderen;
+# schrijven gaat naar een overlay per rij en de LRU houdt de recentst gebruikte records.
+
+# [SECTION: Imports]
+import pytest
+
+from core.lazycsv import LazyCsv
+from core.products import load_catalog_lazy
+
+# [END: Imports]
+# [FUNC: test_facet_columns_are_resident]
+def test_facet_columns_are_resident(tmp_path, monkeypatch):
+    path = tmp_path / "products.csv"
+    lines = ["ID;Naam;Kan verkocht worden;Productcategorie;Routes;Verantwoordelijke"]
+    lines += [f"{i};Product {i};True;Cat {i % 3};Kopen;Jan" for i in range(50)]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    rows = load_catalog_lazy(path).rows
+
+    decoded = []
+    real_row = LazyCsv.row
+    monkeypatch.setattr(LazyCsv, "row", lambda self, i: decoded.append(i) or real_row(self, i))
+    assert [r["Productcategorie"] for r in rows[:4]] == ["Cat 0", "Cat 1", "Cat 2", "Cat 0"]
+    assert all(r["Kan verkocht worden"] == "True" for r in rows)
+    assert decoded == []
+    assert rows[7]["Verantwoordelijke"] == "Jan" and decoded == [7]
+
+# [END: test_facet_columns_are_resident]
+# [FUNC: _write_csv]
+def _write_csv(path, n: int = 10):
+    lines = ["ID;Naam;Verkoopprijs;Verantwoordelijke"]
+    lines += [f"{i};Product {i};{i},50;Jan" for i in range(n)]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+# [END: _write_csv]
+# [FUNC: test_lazy_row_overlay]
+def test_lazy_row_overlay(tmp_path):
+    path = tmp_path / "products.csv"
+    _write_csv(path)
+    rows = load_catalog_lazy(path).rows
+    row = rows[3]
+    n = len(row)
+
+    row["Verantwoordelijke"] = "Piet"
+    row["_price"] = 9.0
+    row["_extra"] = 1
+    assert row["Verantwoordelijke"] == "Piet" and row["_price"] == 9.0 and row["_extra"] == 1
+    assert "_extra" in row and list(row)[-1] == "_extra" and len(row) == n + 1
+    # enkel de overlay van deze rij: het record en de andere rijen blijven ongewijzigd
+    assert row._src.csv.row(3)["Verantwoordelijke"] == "Jan"
+    assert rows[4]["Verantwoordelijke"] == "Jan" and rows[4]["_price"] == 4.5
+
+    del row["Verantwoordelijke"]
+    assert row["Verantwoordelijke"] == "Jan"
+    with pytest.raises(KeyError):
+        del row["Naam"]
+
+# [END: test_lazy_row_overlay]
+# [FUNC: test_lru_evicts_least_recent]
+def test_lru_evicts_least_recent(tmp_path):
+    path = tmp_path / "products.csv"
+    _write_csv(path)
+    lazy = LazyCsv(path, {"_name": ["Naam"]}, {}, lru_size=2)
+    first = lazy.row(0)
+    lazy.row(1)
+    assert lazy.row(0) is first          # uit de LRU, niet opnieuw gedecodeerd
+    lazy.row(2)                          # 1 is het langst niet gebruikt
+    assert list(lazy._lru) == [0, 2]
+    assert lazy.row(0) is first
+    assert lazy.row(1) == {"ID": "1", "Naam": "Product 1", "Verkoopprijs": "1,50", "Verantwoordelijke": "Jan"}
+    assert list(lazy._lru) == [0, 1]
+    lazy.close()
+
+# [END: test_lru_evicts_least_recent]
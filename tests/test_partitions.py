@@ -0,0 +1,46 @@
+# tests/test_partitions.py
+# Magazijnpartities: samenvoegen per product, voorraad per partitie en de vooraf berekende totalen.
+
+# [SECTION: Imports]
+from core.partitions import ALL, find_partitions, load_partitions, stock_col
+
+# [END: Imports]
+HEADER = "ID;Naam;Verkoopprijs;Kostprijs;Aanwezige voorraad;Virtuele voorraad;Routes"
+
+# [FUNC: _write]
+def _write(path, lines):
+    path.write_text("\n".join([HEADER] + lines) + "\n", encoding="utf-8")
+
+# [END: _write]
+# [FUNC: test_merge_and_totals]
+def test_merge_and_totals(tmp_path):
+    _write(tmp_path / "Gent.csv", ["1;Hamer;10;4;2;3;Kopen", "2;Zaag;20;8;1;1;Kopen"])
+    _write(tmp_path / "Brugge.csv", ["2;Zaag;20;8;4;5;Kopen", "3;Tang;5;2;6;6;Kopen"])
+    files = find_partitions(tmp_path)
+    assert list(files) == ["Brugge", "Gent"]
+    cat = load_partitions(files)
+
+    # één rij per product; de eerste partitie levert de basisrij
+    by_id = {r["_id"]: r for r in cat.rows}
+    assert sorted(by_id) == ["1", "2", "3"]
+    assert [r["_id"] for r in cat.rows] == ["2", "3", "1"]
+    assert [r["_id"] for r in cat.rows_for("Gent")] == ["1", "2"]
+    assert [r["_id"] for r in cat.rows_for("Brugge")] == ["2", "3"]
+
+    # voorraad per partitie, _qty = het totaal over de partities
+    zaag, tang = by_id["2"], by_id["3"]
+    assert (zaag[stock_col("Gent")], zaag[stock_col("Brugge")], zaag["_qty"]) == (1.0, 4.0, 5.0)
+    assert zaag["_qty_virtual"] == 6.0 and zaag["Aanwezige voorraad"] == 5.0
+    assert (tang[stock_col("Gent")], tang[stock_col("Brugge")]) == (0.0, 6.0)
+    assert cat.qty_key("Gent") == stock_col("Gent") and cat.qty_key(ALL) == "_qty"
+    assert stock_col("Gent") in cat.available_columns()
+
+    gent = cat.totals["Gent"]
+    assert (gent["count"], gent["qty"], gent["qty_virtual"]) == (2, 3.0, 4.0)
+    assert gent["stock_value"] == 2 * 10 + 1 * 20 and gent["cost_value"] == 2 * 4 + 1 * 8
+    assert gent["avg_price"] == 15.0
+    total = cat.totals[ALL]
+    assert (total["count"], total["qty"]) == (3, 13.0)
+    assert total["stock_value"] == 2 * 10 + 5 * 20 + 6 * 5
+
+# [END: test_merge_and_totals]
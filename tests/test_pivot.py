@@ -0,0 +1,75 @@
+# tests/test_pivot.py
+# Draaitabel: optellen naar bovenliggende niveaus, overlappende routegroepen en totalen met filter.
+
+# [SECTION: Imports]
+from core.pivot import NONE_LABEL, PivotEngine
+
+# [END: Imports]
+ROUTES = ["Route 1", "Route 2"]
+
+# [FUNC: _rows]
+def _rows():
+    return [
+        {"_qty": 2.0, "_price": 10.0, "_cost": 4.0, "Productcategorie": "Inkt", "Route 1": "Kopen", "Route 2": "Dropship"},
+        {"_qty": 1.0, "_price": 5.0, "_cost": 1.0, "Productcategorie": "Inkt", "Route 1": "Kopen"},
+        {"_qty": 3.0, "_price": 2.0, "_cost": 1.0, "Productcategorie": "Papier"},
+        {"_qty": 0.0, "_price": 7.0, "_cost": 3.0, "Productcategorie": "", "Route 1": "Dropship"},
+    ]
+
+# [END: _rows]
+# [FUNC: _summary]
+def _summary(result):
+    return [(g["level"], g["keys"], g["count"], g["value"]) for g in result["groups"]]
+
+# [END: _summary]
+# [FUNC: test_parent_levels_roll_up]
+def test_parent_levels_roll_up():
+    rows = _rows()
+    result = PivotEngine(rows, ROUTES).aggregate(rows, ["Productcategorie", "Route"])
+    assert _summary(result) == [
+        (0, ("Inkt",), 2, 25.0),
+        (1, ("Inkt", "Dropship"), 1, 20.0),
+        (1, ("Inkt", "Kopen"), 2, 25.0),
+        (0, ("Papier",), 1, 6.0),
+        (1, ("Papier", NONE_LABEL), 1, 6.0),
+        (0, (NONE_LABEL,), 1, 0.0),
+        (1, (NONE_LABEL, "Dropship"), 1, 0.0),
+    ]
+    inkt = result["groups"][0]
+    assert inkt["qty"] == 3.0 and inkt["cost_value"] == 9.0 and inkt["margin"] == 16.0
+    assert result["total"]["count"] == 4 and result["total"]["value"] == 31.0
+
+# [END: test_parent_levels_roll_up]
+# [FUNC: test_route_groups_overlap]
+def test_route_groups_overlap():
+    rows = _rows()
+    result = PivotEngine(rows, ROUTES).aggregate(rows, ["Route"])
+    assert _summary(result) == [
+        (0, ("Dropship",), 2, 20.0),
+        (0, ("Kopen",), 2, 25.0),
+        (0, (NONE_LABEL,), 1, 6.0),
+    ]
+    # een product met twee routes telt in beide, maar één keer in het totaal
+    assert sum(g["count"] for g in result["groups"]) == 5
+    assert result["total"]["count"] == 4 and result["total"]["value"] == 31.0
+
+# [END: test_route_groups_overlap]
+# [FUNC: test_filtered_totals]
+def test_filtered_totals():
+    rows = _rows()
+    engine = PivotEngine(rows, ROUTES)
+    full = engine.aggregate(rows, ["Route"])
+    subset = [rows[0], rows[2]]
+    filtered = engine.aggregate(subset, ["Route"])
+    assert full["total"]["count"] == 4
+    assert filtered["total"]["count"] == 2 and filtered["total"]["value"] == 26.0
+    assert _summary(filtered) == [
+        (0, ("Dropship",), 1, 20.0),
+        (0, ("Kopen",), 1, 20.0),
+        (0, (NONE_LABEL,), 1, 6.0),
+    ]
+    # hetzelfde filter als 0/1 per positie (zoals BitmapIndex.flags) geeft hetzelfde resultaat
+    flagged = PivotEngine(rows, ROUTES).aggregate(subset, ["Route"], state="f", flags=bytes([1, 0, 1, 0]))
+    assert _summary(flagged) == _summary(filtered) and flagged["total"] == filtered["total"]
+
+# [END: test_filtered_totals]
@@ -0,0 +1,17 @@
+# tests/test_products.py
+# Prijsvergelijking: vervolgregels zonder prijs overschrijven de prijs van het product niet.
+
+# [SECTION: Imports]
+from core.products import load_price_map
+
+# [END: Imports]
+# [FUNC: test_price_map_skips_empty_prices]
+def test_price_map_skips_empty_prices(tmp_path):
+    path = tmp_path / "nieuw.csv"
+    path.write_text("ID;Naam;Verkoopprijs;Routes\n"
+                    "1;Hamer;12,50;Kopen\n"
+                    "1;Hamer;;Maken\n"
+                    "2;Zaag;0;Kopen\n", encoding="utf-8")
+    assert load_price_map(path) == {"1": 12.5, "2": 0.0}
+
+# [END: test_price_map_skips_empty_prices]
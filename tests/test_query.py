@@ -0,0 +1,67 @@
+# tests/test_query.py
+# Zoektaal: numerieke !=, getallen met duizendtallen en gewone tekst zoals search_rows.
+
+# [SECTION: Imports]
+import pytest
+
+from core.query import QueryError, QueryIndex, run_query
+
+# [END: Imports]
+# [FUNC: _index]
+def _index() -> QueryIndex:
+    rows = [{"_name": f"p{i}", "_sku": "", "_barcode": "", "_qty": float(i % 5), "_price": 10.0 * i}
+            for i in range(200)]
+    return QueryIndex(rows, [])
+
+# [END: _index]
+# [FUNC: test_numeric_not_equal]
+def test_numeric_not_equal():
+    idx = _index()
+    rows, _ = run_query(idx, "voorraad != 3")
+    assert len(rows) == 160 and all(r["_qty"] != 3 for r in rows)
+    rows, _ = run_query(idx, "prijs != 10")
+    assert len(rows) == 199
+
+# [END: test_numeric_not_equal]
+# [FUNC: test_thousands_separators]
+@pytest.mark.parametrize("text", ["prijs > 1.234,56", "prijs > 1,234.56"])
+def test_thousands_separators(text):
+    rows, _ = run_query(_index(), text)
+    assert rows and all(r["_price"] > 1234.56 for r in rows)
+    assert len(rows) == 200 - 124
+
+# [END: test_thousands_separators]
+# [FUNC: test_invalid_number]
+def test_invalid_number():
+    with pytest.raises(QueryError):
+        run_query(_index(), "prijs > 1,2,3.4.5")
+
+# [END: test_invalid_number]
+# [FUNC: _text_index]
+def _text_index() -> QueryIndex:
+    rows = [{"_name": n, "_sku": sku, "_barcode": "", "_qty": 1.0, "_price": 1.0}
+            for n, sku in (("Tape", "A-1"), ("Lijm", "B"), ("Plakband", "-3M"),
+                           ("Inkt zwart 50ml", "I1"), ("inkt voor Canon, zwart", "I2"))]
+    return QueryIndex(rows, [])
+
+# [END: _text_index]
+# [FUNC: test_leading_dash_is_a_search_term]
+def test_leading_dash_is_a_search_term():
+    idx = _text_index()
+    rows, _ = run_query(idx, "-3M")
+    assert [r["_sku"] for r in rows] == ["-3M"]
+    rows, _ = run_query(idx, "-ref:B")
+    assert "B" not in [r["_sku"] for r in rows] and len(rows) == 4
+    rows, _ = run_query(idx, '-"inkt" -ref:B')
+    assert [r["_sku"] for r in rows] == ["A-1", "-3M"]
+
+# [END: test_leading_dash_is_a_search_term]
+# [FUNC: test_plain_text_is_one_phrase]
+def test_plain_text_is_one_phrase():
+    idx = _text_index()
+    rows, _ = run_query(idx, "inkt zwart")
+    assert [r["_sku"] for r in rows] == ["I1"]
+    rows, _ = run_query(idx, "inkt AND zwart")
+    assert [r["_sku"] for r in rows] == ["I1", "I2"]
+
+# [END: test_plain_text_is_one_phrase]
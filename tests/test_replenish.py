@@ -0,0 +1,85 @@
+# tests/test_replenish.py
+# Aanvulplanning: regel per (sub)categorie en route, aanvulroute per product en ceil(max - verwacht).
+
+# [SECTION: Imports]
+import pytest
+
+from core.replenish import ANY, NO_SUPPLIER, PRODUCTION, ReplenishPlanner, ReplenishPolicy, _supply
+
+# [END: Imports]
+ROUTES = ["Route 1", "Route 2"]
+
+# [FUNC: test_rule_for]
+def test_rule_for():
+    policy = ReplenishPolicy(5, 10, {
+        ("All / Inkt", ANY): (2, 8),
+        ("All / Inkt", "Kopen"): (3, 9),
+        ("All / Inkt / Zwart", ANY): (4, 1),
+        (ANY, "Produceren"): (1, 6),
+    })
+    # subcategorie erft de regel van haar ouder; een exacte route wint van ANY
+    assert policy.rule_for("All / Inkt / Kleur", "Dropship") == (2, 8)
+    assert policy.rule_for("All / Inkt / Kleur", "Kopen") == (3, 9)
+    # de meest specifieke categorie wint, en max is nooit kleiner dan min
+    assert policy.rule_for("All / Inkt / Zwart", "Kopen") == (4, 4)
+    assert policy.rule_for("All / Papier", "Produceren") == (1, 6)
+    assert policy.rule_for("All / Papier", "Kopen") == (5, 10)
+    assert policy.rule_for("", "Kopen") == (5, 10)
+
+# [END: test_rule_for]
+# [FUNC: test_supply]
+@pytest.mark.parametrize("row, expected", [
+    ({"Route 1": "Produceren", "Leveranciers": "Acme"}, (PRODUCTION, "Produceren")),
+    ({"Route 1": "Dropship", "Route 2": "Kopen", "Leveranciers": "Acme, Beta"}, ("Acme", "Kopen")),
+    ({"Route 1": "Kopen"}, (NO_SUPPLIER, "Kopen")),
+    ({"Route 1": "Dropship", "Leveranciers": "Acme"}, None),
+    ({"Route 1": "Dropship", "Route 2": "Maken op order"}, None),
+    ({"Productsoort": "Dienst", "Route 1": "Kopen", "Leveranciers": "Acme"}, None),
+    ({"Route 1": "Kopen", "Kan gekocht worden": "Onwaar"}, None),
+])
+def test_supply(row, expected):
+    assert _supply(row, ROUTES) == expected
+
+# [END: test_supply]
+# [FUNC: _planner]
+def _planner() -> ReplenishPlanner:
+    rows = [
+        {"_sku": "A", "_qty": 0.0, "_qty_virtual": 1.5, "_cost": 2.0, "Productcategorie": "Inkt",
+         "Route 1": "Kopen", "Leveranciers": "Acme"},
+        {"_sku": "B", "_qty": 9.0, "_qty_virtual": 9.0, "_cost": 3.0, "Productcategorie": "Inkt",
+         "Route 1": "Kopen", "Leveranciers": "Acme"},
+        {"_sku": "C", "_qty": 4.0, "_qty_virtual": 0.0, "_cost": 1.0, "Productcategorie": "Papier",
+         "Route 1": "Kopen", "Leveranciers": "Beta"},
+        {"_sku": "D", "_qty": 0.0, "_qty_virtual": 0.0, "_cost": 5.0, "Productcategorie": "Inkt",
+         "Route 1": "Produceren"},
+        {"_sku": "E", "_qty": 0.0, "_qty_virtual": 0.0, "_cost": 5.0, "Productsoort": "Dienst",
+         "Route 1": "Kopen", "Leveranciers": "Acme"},
+    ]
+    return ReplenishPlanner(rows, ROUTES)
+
+# [END: _planner]
+# [FUNC: test_plan_orders_up_to_max]
+def test_plan_orders_up_to_max():
+    planner = _planner()
+    plan = planner.plan(ReplenishPolicy(5, 10))
+    assert {r["Interne referentie"]: r["Te bestellen"] for r in plan.rows()} == {"A": 9, "C": 10, "D": 10}
+    assert plan.considered == 4
+    assert plan.suppliers["Acme"] == {"lines": 1, "qty": 9.0, "value": 18.0}
+    assert plan.totals == {"lines": 3, "qty": 29.0, "value": 78.0}
+    assert [r["Leverancier"] for r in plan.rows()] == ["Acme", "Beta", PRODUCTION]
+
+    # aanwezige i.p.v. virtuele voorraad: C heeft er 4 (< 5) en vult aan tot 10
+    plan = planner.plan(ReplenishPolicy(5, 10, use_virtual=False))
+    assert {r["Interne referentie"]: r["Te bestellen"] for r in plan.rows()} == {"A": 10, "C": 6, "D": 10}
+
+# [END: test_plan_orders_up_to_max]
+# [FUNC: test_plan_subset]
+def test_plan_subset():
+    planner = _planner()
+    subset = [r for r in planner.rows if r["_sku"] in ("A", "B", "E")]
+    plan = planner.plan(ReplenishPolicy(5, 10), subset)
+    assert [(r["Interne referentie"], r["Te bestellen"]) for r in plan.rows()] == [("A", 9)]
+    assert plan.considered == 2
+    assert list(plan.suppliers) == ["Acme"]
+
+# [END: test_plan_subset]
@@ -0,0 +1,47 @@
+# tests/test_snapshot.py
+# Snapshots: een vergelijking die na een herlaad gepubliceerd wordt, komt bovenop de nieuwe versie.
+
+# [SECTION: Imports]
+from core.formatting import NEW_PRICE_COL
+from core.products import Catalog
+from core.snapshot import Snapshot, SnapshotStore
+
+# [END: Imports]
+# [FUNC: _catalog]
+def _catalog(*prices: float) -> Catalog:
+    return Catalog([{"_id": str(i), "_name": f"p{i}", "_price": p} for i, p in enumerate(prices)], {}, [])
+
+# [END: _catalog]
+# [FUNC: test_publish_rebases_compare_on_newer_base]
+def test_publish_rebases_compare_on_newer_base():
+    base = Snapshot(_catalog(10.0, 20.0), version=1)
+    store = SnapshotStore(base)
+    compared = base.with_prices({"0": 12.0, "1": 25.0}, "nieuw.csv")   # in een worker
+
+    # intussen herladen: een nieuwe catalogus, met een product minder
+    reloaded = store.publish(Snapshot(_catalog(11.0), version=2), base)
+    assert store.current() is reloaded
+
+    published = store.publish(compared, base)
+    assert published is not compared and store.current() is published
+    assert published.catalog is reloaded.catalog
+    assert published.version == 3 and published.compare_source == "nieuw.csv"
+    row = published.rows[0]
+    assert published.new_prices == {id(row): 12.0}
+    assert published.fmt.text(row, NEW_PRICE_COL) == "12.00"
+    # de vorige versie zelf blijft ongewijzigd
+    assert reloaded.new_prices == {} and reloaded.fmt.text(row, NEW_PRICE_COL) == ""
+
+# [END: test_publish_rebases_compare_on_newer_base]
+# [FUNC: test_publish_on_unchanged_base]
+def test_publish_on_unchanged_base():
+    base = Snapshot(_catalog(10.0, 20.0), version=1)
+    store = SnapshotStore(base)
+    compared = base.with_prices({"1": 25.0}, "nieuw.csv")
+    assert store.publish(compared, base) is compared
+    assert compared.version == 2 and compared.new_prices == {id(base.rows[1]): 25.0}
+    # vergelijking wissen deelt catalogus en afgeleide structuren
+    cleared = store.publish(compared.with_prices(None), compared)
+    assert cleared.new_prices == {} and cleared.catalog is base.catalog and cleared._derived is base._derived
+
+# [END: test_publish_on_unchanged_base]